@@ -0,0 +1,85 @@
+"""
+Patch engine on generated manifests mixing every workload kind (with init
+containers and a share of namespaced objects), single pass vs. one
+traversal per rule.
+
+    python benchmarks/bench_patch_rules.py --workloads 5000
+"""
+import argparse
+import copy
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.patch_rules import DEFAULT_RULES, PatchEngine  # noqa: E402
+
+POD = {
+    "initContainers": [{"name": "init", "image": "busybox:1.36"}],
+    "containers": [
+        {"name": "app", "image": "nginx:1.25"},
+        {"name": "sidecar", "image": "envoy:1.29", "resources": {"limits": {"cpu": "100m"}}},
+    ],
+}
+
+TEMPLATES = {
+    "Deployment": lambda pod: {"apiVersion": "apps/v1", "spec": {"template": {"spec": pod}}},
+    "StatefulSet": lambda pod: {"apiVersion": "apps/v1", "spec": {"template": {"spec": pod}}},
+    "DaemonSet": lambda pod: {"apiVersion": "apps/v1", "spec": {"template": {"spec": pod}}},
+    "Job": lambda pod: {"apiVersion": "batch/v1", "spec": {"template": {"spec": pod}}},
+    "CronJob": lambda pod: {"apiVersion": "batch/v1", "spec": {"jobTemplate": {"spec": {"template": {"spec": pod}}}}},
+    "Pod": lambda pod: {"apiVersion": "v1", "spec": pod},
+    "ConfigMap": lambda pod: {"apiVersion": "v1", "data": {"key": "value"}},
+}
+
+
+def generate(count: int) -> list:
+    kinds = list(TEMPLATES)
+    docs = []
+    for i in range(count):
+        kind = kinds[i % len(kinds)]
+        doc = TEMPLATES[kind](copy.deepcopy(POD))
+        doc["kind"] = kind
+        doc["metadata"] = {"name": f"{kind.lower()}-{i}", "namespace": "batch" if i % 3 == 0 else "default"}
+        docs.append(doc)
+    return docs
+
+
+def best_of(fn, docs, repeat):
+    best = float("inf")
+    changed = 0
+    for _ in range(repeat):
+        batch = copy.deepcopy(docs)  # every run patches pristine documents
+        start = time.perf_counter()
+        changed = fn(batch)
+        best = min(best, time.perf_counter() - start)
+    return best, changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workloads", type=int, default=5000, help="number of documents to generate")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per variant; best time is reported")
+    args = parser.parse_args()
+
+    docs = generate(args.workloads)
+    overrides = {"batch": {"resources": {"limits": {"cpu": "2", "memory": "4Gi"}, "requests": {"cpu": "1", "memory": "2Gi"}}}}
+    engine = PatchEngine(namespaces=overrides)
+    per_rule = [PatchEngine(rules=(rule,), namespaces={"batch": overrides["batch"]} if rule.name in overrides["batch"] else None)
+                for rule in DEFAULT_RULES]
+    print(f"{len(docs)} documents across {', '.join(TEMPLATES)}")
+
+    single, changed = best_of(lambda batch: sum(engine.patch(doc) for doc in batch), docs, args.repeat)
+    print(f"single pass : {single * 1000:9.1f} ms  ({changed} patched, {len(docs) / single:,.0f} docs/s)")
+
+    def multi(batch):
+        return sum(any([e.patch(doc) for e in per_rule]) for doc in batch)
+
+    multi_time, _ = best_of(multi, docs, args.repeat)
+    print(f"per rule    : {multi_time * 1000:9.1f} ms  ({len(docs) / multi_time:,.0f} docs/s)")
+    print(f"speedup     : {multi_time / single:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
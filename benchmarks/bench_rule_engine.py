@@ -0,0 +1,83 @@
+"""
+Native rule engine vs. the kube-linter subprocess path on the k8s/ samples,
+scaled to thousands of documents.
+
+    python benchmarks/bench_rule_engine.py --docs 5000
+    KUBE_LINTER_PATH="python tests/fixtures/fake_kube_linter.py" python benchmarks/bench_rule_engine.py
+
+The subprocess run bypasses the lint cache so both sides do the full work.
+"""
+import argparse
+import copy
+import glob
+import os
+import sys
+import time
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import linter_runner, rule_engine  # noqa: E402
+
+
+def load_samples(pattern):
+    docs = []
+    for path in sorted(glob.glob(pattern)):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                docs.extend(d for d in yaml.safe_load_all(f) if isinstance(d, dict))
+        except yaml.YAMLError:
+            continue  # broken_yaml.yaml is there on purpose
+    return docs
+
+
+def scale(samples, count):
+    docs = []
+    for i in range(count):
+        doc = copy.deepcopy(samples[i % len(samples)])
+        meta = doc.setdefault("metadata", {})
+        meta["name"] = f"{meta.get('name', 'obj')}-{i}"
+        docs.append(doc)
+    return docs
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=2000, help="number of documents to generate")
+    parser.add_argument("--samples", default="k8s/*.yaml", help="glob of sample manifests")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per engine; best time is reported")
+    parser.add_argument("--skip-subprocess", action="store_true", help="only time the native engine")
+    args = parser.parse_args()
+
+    docs = scale(load_samples(args.samples), args.docs)
+    print(f"{len(docs)} documents from {args.samples}")
+
+    native_time, native = timed(lambda: rule_engine.evaluate(docs), args.repeat)
+    native_issues = sum(len(i) for i in native)
+    print(f"native      : {native_time * 1000:9.1f} ms  ({native_issues} issues, {len(docs) / native_time:,.0f} docs/s)")
+
+    if args.skip_subprocess:
+        return
+    payload = yaml.safe_dump_all(docs, sort_keys=False).encode("utf-8")
+    try:
+        sub_time, issues = timed(lambda: linter_runner.lint_issues(payload), args.repeat)
+    except (OSError, linter_runner.LintError) as e:
+        print(f"kube-linter : unavailable ({e})")
+        return
+    print(f"kube-linter : {sub_time * 1000:9.1f} ms  ({len(issues)} issues, {len(docs) / sub_time:,.0f} docs/s)")
+    print(f"speedup     : {sub_time / native_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Deterministic stand-in for the LLM backends, for benchmarks and load tests.
+
+Serves the two shapes llm_handler talks to:
+  POST /api/chat           Ollama chat     -> {"message": {"role": "assistant", "content": ...}}
+  POST /models/<model-id>  HF Inference    -> [{"generated_text": ...}]
+
+Replies are fixed text (passing every response validator) with a short
+digest of the prompt, so identical prompts always get identical answers.
+
+    python benchmarks/fake_llm_server.py --port 11434 --latency-ms 200
+    OLLAMA_HOST=http://127.0.0.1:11434 python main.py
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = (
+    "I recommend setting resources: requests and limits (cpu: 250m, memory: 256Mi) on all containers, "
+    "and a securityContext with runAsNonRoot: true and readOnlyRootFilesystem: true. "
+    "Add a readinessProbe and use a pinned image tag.\n"
+    "Event: KubeCon. Tool: kube-linter in CI/CD. Security: DevSecOps review with GitOps."
+)
+
+
+def reply_for(prompt: str) -> str:
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+    return f"{REPLY}\n(ref {digest})"
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    latency_ms = 0.0
+    jitter_ms = 0.0
+    rng = random.Random(0)
+    rng_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _delay(self):
+        with self.rng_lock:
+            jitter = self.rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        time.sleep(max(0.0, self.latency_ms + jitter) / 1000)
+
+    def _send(self, status: int, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send(400, {"error": "invalid JSON"})
+
+        path = self.path.split("?", 1)[0]
+        if path == "/api/chat":
+            prompt = "\n".join(m.get("content", "") for m in body.get("messages", []))
+            self._delay()
+            return self._send(200, {
+                "model": body.get("model", ""),
+                "created_at": "1970-01-01T00:00:00Z",
+                "message": {"role": "assistant", "content": reply_for(prompt)},
+                "done": True,
+            })
+        if path.startswith("/models/"):
+            self._delay()
+            return self._send(200, [{"generated_text": reply_for(str(body.get("inputs", "")))}])
+        return self._send(404, {"error": f"unknown path {path}"})
+
+
+def serve(host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0):
+    """Start the server on a background thread; returns the ThreadingHTTPServer."""
+    handler = type("Handler", (FakeLLMHandler,), {"latency_ms": latency_ms, "jitter_ms": jitter_ms})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-llm", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay before every reply")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="uniform +/- jitter on the delay (seeded)")
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.latency_ms, args.jitter_ms)
+    print(f"Fake LLM listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Load test of the HTTP API against a fake LLM and a stub kube-linter.
+
+Starts benchmarks/fake_llm_server.py and the stub Qloo server
+(tests/fixtures/stub_qloo_server.py) in-process and the API with uvicorn
+(scratch memory/jobs paths, rate limits off), drives each scenario at a
+fixed concurrency and writes throughput and p50/p95/p99 latency as JSON.
+
+    python benchmarks/load_test.py --concurrency 16 --requests 200
+    python benchmarks/load_test.py --baseline benchmarks/results/<old>.json
+
+With --baseline, exits non-zero when any scenario's p95 is more than
+--threshold slower than the baseline run. Use --url to target a server you
+started yourself (it must already point at a fake or real LLM).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_llm_server  # noqa: E402
+
+sys.path.insert(0, os.path.join(ROOT, "tests", "fixtures"))
+
+import stub_qloo_server  # noqa: E402
+
+SAMPLE = os.path.join(ROOT, "k8s", "sample_deployment.yaml")
+
+GRAPHQL_QUERY = '{ searchMemory(q: "security", k: 3) { prompt response } }'
+
+SCENARIOS = ("analyze", "patch", "suggest", "memory", "graphql", "recommend")
+
+PERSONAS = ("junior dev in berlin", "sre", "startup founder", "platform engineer in tokyo")
+
+
+def build_request(client: httpx.AsyncClient, scenario: str, manifest: bytes):
+    files = {"file": ("sample_deployment.yaml", manifest, "application/x-yaml")}
+    if scenario == "analyze":
+        return client.post("/analyze", files=files)
+    if scenario == "patch":
+        return client.post("/patch", files=files)
+    if scenario == "suggest":
+        return client.post("/suggest", files=files)
+    if scenario == "memory":
+        return client.get("/memory", params={"q": "security"})
+    if scenario == "graphql":
+        return client.post("/graphql", json={"query": GRAPHQL_QUERY})
+    if scenario == "recommend":
+        return client.get("/recommend", params={"q": random.choice(PERSONAS)})
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+async def run_scenario(base_url, scenario, total, concurrency, manifest, timeout):
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as client:
+        async def worker():
+            nonlocal errors
+            while True:
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                start = time.perf_counter()
+                try:
+                    response = await build_request(client, scenario, manifest)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda v: round(v * 1000, 2) if v is not None else None  # noqa: E731
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1] if latencies else None),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url, proc, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"API server exited with code {proc.returncode}")
+        try:
+            # /ready answers 200 once start-up warm-up is done, so runs measure a warm server.
+            if httpx.get(url + "/ready", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"API server at {url} did not come up within {timeout}s")
+
+
+def start_api(args, llm_url, qloo_url, scratch):
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        "LLM_PROVIDER": args.provider,
+        "OLLAMA_HOST": llm_url,
+        "HF_INFERENCE_URL": llm_url + "/models",
+        "LLM_API_KEY": env.get("LLM_API_KEY") or "bench",
+        "KUBE_LINTER_PATH": f'"{sys.executable}" "{os.path.join(ROOT, "benchmarks", "stub_kube_linter.py")}"',
+        "STUB_LINT_LATENCY_MS": str(args.lint_latency_ms),
+        "RATE_LIMIT_ENABLED": "false",
+        "MEMORY_PATH": os.path.join(scratch, "memory.pkl"),
+        "JOBS_DB_PATH": os.path.join(scratch, "jobs.db"),
+        "MANIFEST_DB_PATH": os.path.join(scratch, "manifests.db"),
+        "RATE_LIMIT_DB_PATH": os.path.join(scratch, "ratelimit.db"),
+        "EMBEDDING_BACKEND": env.get("EMBEDDING_BACKEND") or "hashing",
+        "REQUEST_CAPTURE_PATH": "",
+        "QLOO_API_KEY": "stub",
+        "QLOO_BASE_URL": qloo_url,
+    })
+    if args.cold:
+        env.update({"EXPLAIN_CACHE_SIZE": "0", "LINT_CACHE_SIZE": "0"})
+    cmd = shlex.split(args.server_cmd.format(python=sys.executable, port=port))
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return f"http://127.0.0.1:{port}", proc
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(report, baseline, threshold) -> list:
+    """Scenarios whose p95 regressed by more than threshold (a fraction) against baseline."""
+    regressions = []
+    for name, result in report["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old or not old.get("p95_ms") or result.get("p95_ms") is None:
+            continue
+        change = result["p95_ms"] / old["p95_ms"] - 1
+        print(f"  {name:<10} p95 {old['p95_ms']:>9.2f} -> {result['p95_ms']:>9.2f} ms ({change:+.1%})")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests per scenario")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--lint-latency-ms", type=float, default=20.0)
+    parser.add_argument("--qloo-latency-ms", type=float, default=100.0)
+    parser.add_argument("--provider", choices=("ollama", "hf"), default="ollama", help="LLM API shape to exercise")
+    parser.add_argument("--cold", action="store_true", help="disable the explain and lint caches")
+    parser.add_argument("--manifest", default=SAMPLE, help="manifest uploaded to the file endpoints")
+    parser.add_argument("--url", help="use an already running API instead of starting one")
+    parser.add_argument("--server-cmd", default="{python} -m uvicorn main:app --host 127.0.0.1 --port {port}")
+    parser.add_argument("--startup-timeout", type=float, default=180.0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout in seconds")
+    parser.add_argument("--output", help="report path (default benchmarks/results/load-<commit>.json)")
+    parser.add_argument("--baseline", help="earlier report to compare p95 against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed p95 slowdown vs baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+    with open(args.manifest, "rb") as f:
+        manifest = f.read()
+
+    random.seed(0)
+    llm = fake_llm_server.serve(latency_ms=args.llm_latency_ms)
+    llm_url = f"http://127.0.0.1:{llm.server_address[1]}"
+    qloo = stub_qloo_server.serve(latency_ms=args.qloo_latency_ms)
+    qloo_url = f"http://127.0.0.1:{qloo.server_address[1]}"
+    proc = None
+    with tempfile.TemporaryDirectory(prefix="genkube-load-") as scratch:
+        try:
+            if args.url:
+                base_url = args.url.rstrip("/")
+            else:
+                base_url, proc = start_api(args, llm_url, qloo_url, scratch)
+            wait_until_up(base_url, proc, args.startup_timeout)
+
+            results = {}
+            for scenario in scenarios:
+                if args.warmup:
+                    asyncio.run(run_scenario(base_url, scenario, args.warmup, 1, manifest, args.timeout))
+                results[scenario] = asyncio.run(
+                    run_scenario(base_url, scenario, args.requests, args.concurrency, manifest, args.timeout)
+                )
+                r = results[scenario]
+                print(f"{scenario:<10} {r['throughput_rps']:>8} req/s  p50 {r['p50_ms']} ms  "
+                      f"p95 {r['p95_ms']} ms  p99 {r['p99_ms']} ms  errors {r['errors']}")
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait(timeout=30)
+            llm.shutdown()
+            qloo.shutdown()
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "llm_latency_ms": args.llm_latency_ms,
+            "lint_latency_ms": args.lint_latency_ms,
+            "qloo_latency_ms": args.qloo_latency_ms,
+            "provider": args.provider,
+            "cold": args.cold,
+        },
+        "scenarios": results,
+    }
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"load-{commit}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"p95 regression over {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""
+Replay a request capture (see src/request_capture.py) against a local API
+backed by the fake LLM, stub kube-linter and stub Qloo used by load_test.py.
+
+    python benchmarks/replay.py memory-data/captures/capture.jsonl*
+    python benchmarks/replay.py capture.jsonl --speed 10        # 10x faster than recorded
+    python benchmarks/replay.py capture.jsonl --speed 0         # as fast as --max-inflight allows
+
+Requests keep their recorded spacing divided by --speed. Requests whose body
+was over the capture cap (hash only) are skipped. The report compares replayed
+latency and status per endpoint with what was recorded.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import (  # noqa: E402
+    ROOT, fake_llm_server, git_commit, percentile, start_api, stub_qloo_server, wait_until_up,
+)
+
+
+def load_trace(paths: list) -> list:
+    """Captured records from every file, in time order (rotated files may be passed in any order)."""
+    records = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    records.append(json.loads(line))
+    records.sort(key=lambda r: r["ts"])
+    return records
+
+
+async def replay(base_url: str, records: list, speed: float, max_inflight: int, timeout: float) -> list:
+    """Fire each record at its (scaled) offset; returns (record, status, seconds) per replayed request."""
+    slots = asyncio.Semaphore(max_inflight)
+    results = []
+    t0 = records[0]["ts"] if records else 0.0
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as client:
+        async def fire(record):
+            url = record["path"] + (f"?{record['query']}" if record["query"] else "")
+            body = base64.b64decode(record["body_b64"]) if record.get("body_b64") else None
+            async with slots:
+                start = time.perf_counter()
+                try:
+                    response = await client.request(record["method"], url, content=body, headers=record.get("headers") or {})
+                    status = response.status_code
+                except httpx.HTTPError:
+                    status = None
+                results.append((record, status, time.perf_counter() - start))
+
+        started = time.perf_counter()
+        tasks = []
+        for record in records:
+            if speed > 0:
+                delay = (record["ts"] - t0) / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(fire(record)))
+        await asyncio.gather(*tasks)
+    return results
+
+
+def summarize(results: list) -> dict:
+    ms = lambda v: round(v * 1000, 2) if v is not None else None  # noqa: E731
+    by_endpoint = {}
+    for record, status, seconds in results:
+        endpoint = f"{record['method']} {record.get('route') or record['path']}"
+        by_endpoint.setdefault(endpoint, []).append((record, status, seconds))
+
+    summary = {}
+    for endpoint, rows in sorted(by_endpoint.items()):
+        replayed = sorted(seconds for _, _, seconds in rows)
+        recorded = sorted(record["seconds"] for record, _, _ in rows)
+        summary[endpoint] = {
+            "requests": len(rows),
+            "errors": sum(1 for _, status, _ in rows if status is None or status >= 500),
+            "status_mismatches": sum(1 for record, status, _ in rows if status != record["status"]),
+            "recorded_p50_ms": ms(percentile(recorded, 50)),
+            "recorded_p95_ms": ms(percentile(recorded, 95)),
+            "p50_ms": ms(percentile(replayed, 50)),
+            "p95_ms": ms(percentile(replayed, 95)),
+            "p99_ms": ms(percentile(replayed, 99)),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("captures", nargs="+", help="capture JSONL file(s), including rotated ones")
+    parser.add_argument("--speed", type=float, default=1.0, help="pacing factor (1 = as recorded, 0 = no pacing)")
+    parser.add_argument("--max-inflight", type=int, default=64, help="cap on concurrent requests")
+    parser.add_argument("--limit", type=int, help="replay only the first N requests")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--lint-latency-ms", type=float, default=20.0)
+    parser.add_argument("--qloo-latency-ms", type=float, default=100.0)
+    parser.add_argument("--provider", choices=("ollama", "hf"), default="ollama", help="LLM API shape to exercise")
+    parser.add_argument("--cold", action="store_true", help="disable the explain and lint caches")
+    parser.add_argument("--url", help="use an already running API instead of starting one")
+    parser.add_argument("--server-cmd", default="{python} -m uvicorn main:app --host 127.0.0.1 --port {port}")
+    parser.add_argument("--startup-timeout", type=float, default=180.0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout in seconds")
+    parser.add_argument("--output", help="report path (default benchmarks/results/replay-<commit>.json)")
+    args = parser.parse_args()
+
+    records = load_trace(args.captures)
+    skipped = [r for r in records if r["body_bytes"] and "body_b64" not in r]
+    records = [r for r in records if not (r["body_bytes"] and "body_b64" not in r)][:args.limit]
+    if not records:
+        parser.error("no replayable requests in the capture")
+    recorded_span = records[-1]["ts"] - records[0]["ts"]
+    print(f"Replaying {len(records)} request(s) spanning {recorded_span:.1f}s "
+          f"({len(skipped)} skipped: body over the capture cap)")
+
+    random.seed(0)
+    llm = fake_llm_server.serve(latency_ms=args.llm_latency_ms)
+    qloo = stub_qloo_server.serve(latency_ms=args.qloo_latency_ms)
+    proc = None
+    with tempfile.TemporaryDirectory(prefix="genkube-replay-") as scratch:
+        try:
+            if args.url:
+                base_url = args.url.rstrip("/")
+            else:
+                base_url, proc = start_api(
+                    args, f"http://127.0.0.1:{llm.server_address[1]}", f"http://127.0.0.1:{qloo.server_address[1]}", scratch
+                )
+            wait_until_up(base_url, proc, args.startup_timeout)
+            started = time.perf_counter()
+            results = asyncio.run(replay(base_url, records, args.speed, args.max_inflight, args.timeout))
+            elapsed = time.perf_counter() - started
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait(timeout=30)
+            llm.shutdown()
+            qloo.shutdown()
+
+    endpoints = summarize(results)
+    for endpoint, r in endpoints.items():
+        print(f"{endpoint:<28} {r['requests']:>5} req  p50 {r['p50_ms']} ms (recorded {r['recorded_p50_ms']})  "
+              f"p95 {r['p95_ms']} ms (recorded {r['recorded_p95_ms']})  errors {r['errors']}  "
+              f"status mismatches {r['status_mismatches']}")
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "captures": args.captures,
+            "requests": len(records),
+            "skipped": len(skipped),
+            "speed": args.speed,
+            "recorded_seconds": round(recorded_span, 3),
+            "replay_seconds": round(elapsed, 3),
+            "llm_latency_ms": args.llm_latency_ms,
+            "lint_latency_ms": args.lint_latency_ms,
+            "provider": args.provider,
+            "cold": args.cold,
+        },
+        "endpoints": endpoints,
+    }
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"replay-{commit}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
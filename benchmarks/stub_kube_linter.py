@@ -0,0 +1,18 @@
+#!/usr/bin/env python
+"""
+kube-linter stand-in for load tests: the tests' fake linter plus a fixed
+per-invocation delay (STUB_LINT_LATENCY_MS) to model the real binary's cost.
+
+    KUBE_LINTER_PATH="python benchmarks/stub_kube_linter.py" STUB_LINT_LATENCY_MS=30 python main.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "fixtures"))
+
+from fake_kube_linter import main  # noqa: E402
+
+if __name__ == "__main__":
+    time.sleep(float(os.getenv("STUB_LINT_LATENCY_MS", "0")) / 1000)
+    sys.exit(main(sys.argv[1:]))
@@ -1,6 +1,5 @@
-from src.api import app
-import uvicorn
 import logging
+import sys
 
 # Setup structured logging (production-friendly)
 logging.basicConfig(
@@ -12,7 +11,19 @@ logging.basicConfig(
 )
 
 logger = logging.getLogger(__name__)
-logger.info(" Starting GenKube Guard...")
 
-if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+# `python main.py scan ...` runs the offline scanner without importing the API
+# (and with it the embedding model). Scan worker processes started with
+# "spawn" re-import this file as __mp_main__ and must not load it either.
+if sys.argv[1:2] == ["scan"] and __name__ in ("__main__", "__mp_main__"):
+    if __name__ == "__main__":
+        from src.cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+else:
+    from src.api import app
+    import uvicorn
+
+    logger.info(" Starting GenKube Guard...")
+
+    if __name__ == "__main__":
+        uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,26 +1,42 @@
 from fastapi import FastAPI, UploadFile, File, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.exceptions import RequestValidationError
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 import strawberry
 from strawberry.fastapi import GraphQLRouter
-import yaml
 import asyncio
-import faiss
+import copy
+import difflib
 import logging
+import os
+import time
+from typing import List, Optional
+
+import yaml
 
-from src import linter_runner, llm_handler
-from src.schema import Query as GQLQuery, Mutation as GQLMutation
+from src import batch_analyzer, json_patch, linter_runner, llm_handler, metrics, profiler, request_capture, rule_engine
+from src.lint_cache import document_hash, lint_cache
+from src.cache import LRUCache
+from src.cost_limiter import RATE_LIMIT_ENABLED, BudgetExceeded, budget, retry_after_header, units_for_text
+from src.job_queue import JobQueue
+from src.manifest_store import ManifestStore, normalize_manifest_id
+from src.request_context import (
+    RequestContext, UploadLimitMiddleware, UploadTooLarge, dump, iter_documents, read_upload, spool_upload,
+)
+from src.warmup import warmup
+from src.schema import Query as GQLQuery, Mutation as GQLMutation, get_context as graphql_context
 from src import qloo_handler
 from src.llm_handler import explain_with_qloo, memory
 
 logger = logging.getLogger("genkube")
 
 app = FastAPI()
-limiter = Limiter(key_func=get_remote_address)
+# Coarse per-process request caps; LLM work is budgeted across workers by
+# src/cost_limiter.py. RATE_LIMIT_ENABLED=false turns both off (e.g. for load tests).
+limiter = Limiter(key_func=get_remote_address, enabled=RATE_LIMIT_ENABLED)
 app.state.limiter = limiter
 
 # Enable CORS
@@ -31,92 +47,328 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(UploadLimitMiddleware)
 
-@app.post("/analyze")
-@limiter.limit("5/minute")
-async def analyze_yaml(request: Request, file: UploadFile = File(...)):
-    try:
-        content = await file.read()
-        logger.info("Received file for analysis: %s", file.filename)
+manifests = ManifestStore()
 
-        # ✅ Step 1: Pre-validate YAML syntax
-        try:
-          list(yaml.safe_load_all(content))  # <-- force parse!
-        except yaml.YAMLError as e:
+metrics.register_cache(llm_handler.explain_cache, lint_cache.entries, qloo_handler.client.cache)
+metrics.register_collector(memory.metric_lines)
 
-            logger.warning("Broken YAML file: %s", file.filename)
-            return {
-                "issues": ["Invalid or unparseable YAML."],
-                "explanations": [
-                    "The provided file could not be parsed due to syntax errors. Please ensure it is valid Kubernetes YAML."
-                ],
-            }
-        try:
-           yaml.safe_load_all(content)
-        except yaml.YAMLError:
-           return {
-        "issues": ["Invalid or unparseable YAML."],
-        "explanations": [
-            "The provided file could not be parsed due to syntax errors. Please ensure it is valid Kubernetes YAML."
-        ]
-    }
-
-        # Step 2: Proceed with linting if YAML is valid
-        issues = linter_runner.run_kube_linter(content)
-
-        if len(issues) == 1 and issues[0].strip().lower() == "no lint issues found.":
-            logger.info("No issues found by kube-linter.")
-            return {
-                "issues": issues,
-                "explanations": ["No issues, so no explanations needed."]
-            }
 
-        loop = asyncio.get_event_loop()
+@app.middleware("http")
+async def observe_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template so /jobs/{job_id} stays one series.
+    route = request.scope.get("route")
+    endpoint = getattr(route, "path", "unmatched")
+    metrics.request_seconds.observe(
+        time.perf_counter() - start, endpoint=endpoint, method=request.method, status=response.status_code
+    )
+    return response
+
+
+@app.middleware("http")
+async def profile_opted_in_requests(request: Request, call_next):
+    # Admin-only: "X-Profile: 1" plus a valid X-Admin-Token logs the top functions of the
+    # work this request ran in executor threads (parsing, linting, patching, LLM calls).
+    if not request.headers.get("x-profile") or not profiler.authorized(request.headers.get("x-admin-token")):
+        return await call_next(request)
+    with profiler.profile_request() as profile:
+        response = await call_next(request)
+    if profile is not None:
+        logger.info("Profile of executor work for %s %s:\n%s", request.method, request.url.path, profile.top())
+    return response
+
+
+# Opt-in (REQUEST_CAPTURE_PATH); added after the middlewares above so it is outermost.
+app.add_middleware(request_capture.RequestCaptureMiddleware)
+
+
+@app.on_event("startup")
+async def propagate_context_for_capture():
+    # Stage timings are collected through a contextvar; carry it into executor threads.
+    if request_capture.recorder.enabled:
+        asyncio.get_running_loop().set_default_executor(request_capture.ContextThreadPoolExecutor())
+
+
+@app.get("/metrics")
+def get_metrics():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/admin/profile")
+async def sampling_profile(
+    request: Request,
+    seconds: float = Query(10, gt=0, description="How long to sample"),
+    interval_ms: float = Query(10, gt=0, description="Time between samples"),
+    idle: bool = Query(False, description="Include threads parked in waits"),
+):
+    """Sample all threads and return collapsed stacks for flamegraph.pl / speedscope."""
+    if not profiler.enabled():
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    if not profiler.authorized(request.headers.get("x-admin-token")):
+        return JSONResponse(status_code=403, content={"detail": "Invalid admin token."})
+    loop = asyncio.get_event_loop()
+    stacks = await loop.run_in_executor(None, profiler.sample_collapsed, seconds, interval_ms / 1000, idle)
+    if stacks is None:
+        return JSONResponse(status_code=409, content={"detail": "A profile is already running."})
+    return PlainTextResponse(stacks)
+
+INVALID_YAML_ANALYSIS = {
+    "issues": ["Invalid or unparseable YAML."],
+    "explanations": [
+        "The provided file could not be parsed due to syntax errors. Please ensure it is valid Kubernetes YAML."
+    ],
+}
+NO_ISSUES_EXPLANATION = "No issues, so no explanations needed."
+
+
+def _too_large(e: UploadTooLarge) -> JSONResponse:
+    logger.warning("Upload rejected: %s", e)
+    return JSONResponse(status_code=413, content={"error": str(e)})
+
+
+def _over_budget(e: BudgetExceeded) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"error": "Rate limit exceeded. Try again later.", "retry_after": round(e.retry_after, 1)},
+        headers={"Retry-After": retry_after_header(e.retry_after)},
+    )
+
+
+async def _spend(request: Request, cost: float):
+    """Take cost units from the client's LLM budget (off the loop: another worker may hold the store)."""
+    await asyncio.get_running_loop().run_in_executor(None, budget.take, get_remote_address(request), cost)
+
+
+def _llm_cost(issues) -> int:
+    """Units for explaining issues: one per issue the LLM has to answer (cache hits are free)."""
+    return sum(1 for issue in issues if llm_handler.explain_needs_llm(issue))
+
 
-        async def run_explain(issue):
-            return await loop.run_in_executor(None, llm_handler.explain, issue)
+def _no_issues(issues) -> bool:
+    return len(issues) == 1 and issues[0].strip().lower() == "no lint issues found."
 
-        explanations = await asyncio.gather(*(run_explain(issue) for issue in issues))
-        return {"issues": issues, "explanations": explanations}
 
+@app.post("/analyze")
+@limiter.limit("5/minute")
+async def analyze_yaml(
+    request: Request,
+    file: UploadFile = File(...),
+    engine: str = Query("kube-linter", description="Lint engine: kube-linter, native or hybrid"),
+    manifest_id: Optional[str] = Query(None, description="Stable manifest name; unchanged documents reuse the last results"),
+):
+    try:
+        spool = await spool_upload(file)
+        logger.info("Received file for analysis: %s | engine=%s", file.filename, engine)
+
+        if engine not in rule_engine.ENGINES:
+            spool.close()
+            return {"error": f"Invalid engine. Choose from: {', '.join(rule_engine.ENGINES)}."}
+
+        loop = asyncio.get_running_loop()
+        manifest_id = normalize_manifest_id(manifest_id or request.headers.get("x-manifest-id"))
+        previous = None
+        if manifest_id:
+            context = await loop.run_in_executor(None, _analysis_context, engine)
+            previous = await loop.run_in_executor(None, manifests.load, manifest_id, "analyze", context)
+
+        # Documents are parsed incrementally and the whole manifest is linted;
+        # issues already explained in the last snapshot are not explained again.
+        # New issues are paid for from the client's budget once linted, before any LLM call.
+        explain_fn = profiler.in_thread(llm_handler.explain)
+
+        async def admit(issues):
+            await _spend(request, _llm_cost(issues))
+
+        with spool:
+            try:
+                documents = await batch_analyzer.lint_incrementally(
+                    iter_documents(spool), engine, explain_fn=explain_fn, previous=previous, admit=admit
+                )
+            except yaml.YAMLError:
+                logger.warning("Broken YAML file: %s", file.filename)
+                return INVALID_YAML_ANALYSIS
+            except (UploadTooLarge, BudgetExceeded):
+                raise
+            except Exception as e:
+                logger.exception("Error running %s lint engine", engine)
+                issue = f"Error running kube-linter: {str(e)}"
+                await admit([issue])
+                return {"issues": [issue], "explanations": [await loop.run_in_executor(None, explain_fn, issue)]}
+
+        issues = [issue for doc in documents for issue in doc["issues"]]
+        explanations = [text for doc in documents for text in doc["explanations"]]
+        if not issues:
+            logger.info("No issues found by kube-linter.")
+            result = {"issues": [linter_runner.NO_ISSUES_MESSAGE], "explanations": [NO_ISSUES_EXPLANATION]}
+        else:
+            result = {"issues": issues, "explanations": explanations}
+
+        if manifest_id:
+            # Fallback texts are not stored, so those issues get explained again next time.
+            snapshot = {
+                doc["hash"]: {
+                    "issues": doc["issues"],
+                    "explanations": {
+                        issue: text for issue, text in zip(doc["issues"], doc["explanations"])
+                        if llm_handler.is_valid_explanation(text)
+                    },
+                }
+                for doc in documents
+            }
+            await loop.run_in_executor(None, manifests.save, manifest_id, "analyze", context, snapshot)
+            result["manifest_id"] = manifest_id
+            result["reused_documents"] = [i for i, doc in enumerate(documents) if doc["reused"]]
+            result["changed_documents"] = [i for i, doc in enumerate(documents) if not doc["reused"]]
+            logger.info("Manifest %s: reused %d of %d document(s)",
+                        manifest_id, len(result["reused_documents"]), len(documents))
+        return result
+
+    except UploadTooLarge as e:
+        return _too_large(e)
+    except BudgetExceeded as e:
+        return _over_budget(e)
     except Exception as e:
         logger.exception("Error during /analyze endpoint")
         return {"error": "Internal Server Error during analysis."}
 
 
+def _analysis_context(engine: str) -> str:
+    """What besides the documents decides an /analyze result; snapshots from another context are not reused."""
+    parts = [engine, llm_handler.prompt_registry.version, llm_handler.active_model("mistral")]
+    if engine != "native":
+        extra_args = rule_engine.remaining_checks_args() if engine == "hybrid" else None
+        parts.append(linter_runner.linter_fingerprint(extra_args))
+    return "|".join(parts)
 
-@app.post("/patch")
-async def patch_yaml(file: UploadFile = File(...)):
+
+
+@app.post("/analyze-batch")
+@limiter.limit("2/minute")
+async def analyze_batch(
+    request: Request,
+    archive: Optional[UploadFile] = File(None, description="tar, tar.gz or zip of manifests"),
+    files: Optional[List[UploadFile]] = File(None, description="Or several manifest files"),
+    engine: str = Query("kube-linter", description="Lint engine: kube-linter, native or hybrid"),
+    explain: bool = Query(False, description="Also explain each distinct issue (LLM)")
+):
     try:
-        raw_bytes = await file.read()
-        try:
-            raw = raw_bytes.decode("utf-8")
-        except UnicodeDecodeError:
-            return {"error": "Uploaded file is not valid UTF-8."}
+        if engine not in rule_engine.ENGINES:
+            return {"error": f"Invalid engine. Choose from: {', '.join(rule_engine.ENGINES)}."}
+
+        if archive is not None:
+            if not batch_analyzer.is_archive(archive.file):
+                return {"error": "Uploaded archive must be a tar, tar.gz or zip file."}
+            items = batch_analyzer.iter_archive(archive.file)
+            logger.info("Batch analysis of archive %s | engine=%s", archive.filename, engine)
+        elif files:
+            items = batch_analyzer.iter_uploads(files)
+            logger.info("Batch analysis of %d uploaded files | engine=%s", len(files), engine)
+        else:
+            return {"error": "Upload an archive or one or more files."}
+
+        explain_fn = None
+        if explain:
+            # Taken per LLM call as issues turn up; once short, the rest are left unexplained.
+            explain_fn = budget.metered(get_remote_address(request), llm_handler.explain,
+                                        free=lambda issue: not llm_handler.explain_needs_llm(issue))
+        return StreamingResponse(
+            batch_analyzer.analyze_batch(items, engine=engine, explain_fn=explain_fn),
+            media_type="application/x-ndjson",
+        )
 
-        if not raw.strip():
-            return {"error": "Uploaded YAML is empty or unreadable."}
+    except BudgetExceeded as e:
+        return _over_budget(e)
+    except Exception as e:
+        logger.exception("Error during /analyze-batch endpoint")
+        return {"error": "Internal Server Error during batch analysis."}
 
-        logger.info("Received file for patching: %s", file.filename)
 
-        try:
-            docs = list(yaml.safe_load_all(raw))
-        except yaml.YAMLError as e:
-            logger.warning("YAML parsing failed: %s", e)
-            return {"patched_yaml": "# Skipped: Invalid or unparseable YAML content."}
+PATCH_FORMATS = ("yaml", "json-patch")
+
+
+def _document_name(doc: dict) -> str:
+    meta = doc.get("metadata") if isinstance(doc.get("metadata"), dict) else {}
+    return meta.get("name", "")
 
-        has_patchable_kind = any(
-            doc and doc.get("kind") in {"Deployment", "StatefulSet"} for doc in docs
-        )
 
-        if not has_patchable_kind:
-            logger.info("No patchable resources found in YAML; skipping patch.")
+def _patch_stream(spool, output: str = "yaml", with_diff: bool = False) -> dict:
+    """
+    Patch documents as they are parsed. "yaml" keeps only the emitted YAML;
+    "json-patch" keeps only RFC 6902 operations for the documents that
+    changed (plus a unified diff of each when with_diff is set).
+    """
+    pieces = []
+    patches = []
+    diffs = []
+    patched_any = False
+    try:
+        for index, doc in enumerate(iter_documents(spool)):
+            patchable = isinstance(doc, dict) and doc.get("kind") in llm_handler.PATCHABLE_KINDS
+            patched_any = patched_any or patchable
+            if output == "yaml":
+                pieces.append(dump(llm_handler.patch_document(doc)))
+                continue
+            if not patchable:
+                continue
+            original = copy.deepcopy(doc)
+            ops = json_patch.diff(original, llm_handler.patch_document(doc))
+            if not ops:
+                continue
+            name = _document_name(doc)
+            patches.append({"document": index, "kind": doc.get("kind"), "name": name, "patch": ops})
+            if with_diff:
+                label = f"{index}:{doc.get('kind')}/{name}"
+                diffs.extend(difflib.unified_diff(
+                    dump(original).splitlines(keepends=True),
+                    dump(doc).splitlines(keepends=True),
+                    fromfile=f"a/{label}",
+                    tofile=f"b/{label}",
+                ))
+    except yaml.reader.ReaderError:
+        return {"error": "Uploaded file is not valid UTF-8."}
+    except yaml.YAMLError as e:
+        logger.warning("YAML parsing failed: %s", e)
+        return {"patched_yaml": "# Skipped: Invalid or unparseable YAML content."}
+
+    if not patched_any:
+        spool.seek(0)
+        raw = spool.read().decode("utf-8")
+        if not raw.strip():
+            return {"error": "Uploaded YAML is empty or unreadable."}
+        logger.info("No patchable resources found in YAML; skipping patch.")
+        if output == "yaml":
             return {"patched_yaml": raw}
 
-        patched = llm_handler.generate_patch(raw)
-        logger.info("Patch generation complete.")
-        return {"patched_yaml": patched}
+    logger.info("Patch generation complete.")
+    if output == "yaml":
+        return {"patched_yaml": "---\n".join(pieces)}
+    result = {"format": output, "patches": patches}
+    if with_diff:
+        result["diff"] = "".join(diffs)
+    return result
+
 
+@app.post("/patch")
+async def patch_yaml(
+    file: UploadFile = File(...),
+    format: str = Query("yaml", description="yaml (whole patched file) or json-patch (RFC 6902 per changed document)"),
+    diff: bool = Query(False, description="With json-patch, also return a unified diff per changed document"),
+):
+    try:
+        if format not in PATCH_FORMATS:
+            return {"error": f"Invalid format. Choose from: {', '.join(PATCH_FORMATS)}."}
+        spool = await spool_upload(file)
+        logger.info("Received file for patching: %s | format=%s", file.filename, format)
+        with spool:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, profiler.in_thread(_patch_stream), spool, format, diff
+            )
+
+    except UploadTooLarge as e:
+        return _too_large(e)
     except Exception as e:
         logger.exception("Error during /patch endpoint")
         return {"error": "Internal Server Error during patching."}
@@ -124,27 +376,50 @@ async def patch_yaml(file: UploadFile = File(...)):
 
 @app.post("/suggest")
 @limiter.limit("5/minute")
-async def suggest_improvements(request: Request, file: UploadFile = File(...)):
+async def suggest_improvements(
+    request: Request,
+    file: UploadFile = File(...),
+    manifest_id: Optional[str] = Query(None, description="Stable manifest name; an unchanged manifest reuses the last suggestions"),
+):
     try:
-        raw_bytes = await file.read()
-        try:
-            yaml_str = raw_bytes.decode("utf-8")
-        except UnicodeDecodeError:
+        ctx = await RequestContext.from_upload(file)
+        if ctx.decode_error:
             return {"error": "Uploaded file is not valid UTF-8."}
 
-        if not yaml_str.strip():
+        if ctx.is_empty:
             return {"error": "Uploaded YAML is empty or unreadable."}
 
         logger.info("Suggest request received: %s", file.filename)
 
         # NEW: Validate YAML syntax before calling LLM
-        try:
-            list(yaml.safe_load_all(yaml_str))
-        except yaml.YAMLError:
+        if ctx.parse_error:
             return {"suggestions": "Invalid YAML. Could not parse structure. Please fix formatting or indentation."}
 
-        suggestions = llm_handler.suggest(yaml_str)
-        return {"suggestions": suggestions}
+        manifest_id = normalize_manifest_id(manifest_id or request.headers.get("x-manifest-id"))
+        if not manifest_id:
+            await _spend(request, units_for_text(ctx.text))
+            return {"suggestions": llm_handler.suggest(ctx.text, docs=ctx.docs)}
+
+        # Suggestions cover the whole file, so they are reused only if no document changed.
+        loop = asyncio.get_running_loop()
+        content = ",".join(document_hash(doc) for doc in ctx.docs or [])
+        context = f"{llm_handler.prompt_registry.version}|{llm_handler.active_model('mistral')}"
+        stored = await loop.run_in_executor(None, manifests.load, manifest_id, "suggest", context)
+        if stored.get("content") == content:
+            logger.info("Manifest %s unchanged; reusing suggestions", manifest_id)
+            return {"suggestions": stored["suggestions"], "manifest_id": manifest_id, "reused": True}
+
+        await _spend(request, units_for_text(ctx.text))
+        suggestions = llm_handler.suggest(ctx.text, docs=ctx.docs)
+        if llm_handler.is_valid_response(suggestions):
+            await loop.run_in_executor(
+                None, manifests.save, manifest_id, "suggest", context, {"content": content, "suggestions": suggestions}
+            )
+        return {"suggestions": suggestions, "manifest_id": manifest_id, "reused": False}
+    except UploadTooLarge as e:
+        return _too_large(e)
+    except BudgetExceeded as e:
+        return _over_budget(e)
     except Exception as e:
         logger.exception("Error in /suggest")
         return {"error": "Internal Server Error during suggestion generation."}
@@ -153,27 +428,141 @@ async def suggest_improvements(request: Request, file: UploadFile = File(...)):
 
 @app.post("/suggest-persona")
 async def suggest_for_persona(
+    request: Request,
     file: UploadFile = File(...),
     persona: str = Query("junior")
 ):
     try:
-        raw_bytes = await file.read()
-        try:
-            yaml_str = raw_bytes.decode("utf-8")
-        except UnicodeDecodeError:
+        ctx = await RequestContext.from_upload(file)
+        if ctx.decode_error:
             return {"error": "Uploaded file is not valid UTF-8."}
 
-        if not yaml_str.strip():
+        if ctx.is_empty:
             return {"error": "Uploaded YAML is empty or unreadable."}
 
         logger.info("Suggest-persona request: %s | Persona: %s", file.filename, persona)
-        persona_suggestions = llm_handler.suggest_with_persona(yaml_str, persona)
+        await _spend(request, units_for_text(ctx.text))
+        persona_suggestions = llm_handler.suggest_with_persona(ctx.text, persona, docs=ctx.docs)
         return {"persona_suggestions": persona_suggestions}
+    except UploadTooLarge as e:
+        return _too_large(e)
+    except BudgetExceeded as e:
+        return _over_budget(e)
     except Exception as e:
         logger.exception("Error in /suggest-persona")
         return {"error": "Internal Server Error during persona-based suggestion."}
 
 
+# === Async jobs: submit returns immediately, workers run the same handlers ===
+
+def _analyze_job(payload: bytes, params: dict) -> dict:
+    ctx = RequestContext(payload)
+    if not ctx.is_valid and not ctx.is_empty:
+        return INVALID_YAML_ANALYSIS
+    issues = rule_engine.run_engine(ctx.docs or [], params.get("engine", "kube-linter"), ctx.raw)
+    if _no_issues(issues):
+        return {"issues": issues, "explanations": [NO_ISSUES_EXPLANATION]}
+    if params.get("client"):
+        try:
+            budget.take(params["client"], _llm_cost(set(issues)))
+        except BudgetExceeded as e:
+            return {"issues": issues, "error": "Rate limit exceeded. Try again later.",
+                    "retry_after": round(e.retry_after, 1)}
+    return {"issues": issues, "explanations": list(llm_handler.executor.map(llm_handler.explain, issues))}
+
+
+def _suggest_job(payload: bytes, params: dict) -> dict:
+    ctx = RequestContext(payload)
+    if ctx.parse_error:
+        return {"suggestions": "Invalid YAML. Could not parse structure. Please fix formatting or indentation."}
+    return {"suggestions": llm_handler.suggest(ctx.text, docs=ctx.docs)}
+
+
+def _suggest_persona_job(payload: bytes, params: dict) -> dict:
+    ctx = RequestContext(payload)
+    persona = params.get("persona", "junior")
+    return {"persona_suggestions": llm_handler.suggest_with_persona(ctx.text, persona, docs=ctx.docs)}
+
+
+jobs = JobQueue()
+jobs.register("analyze", _analyze_job)
+jobs.register("suggest", _suggest_job)
+jobs.register("suggest-persona", _suggest_persona_job)
+
+
+@app.on_event("startup")
+def start_job_workers():
+    jobs.start()
+
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    jobs.stop()
+
+
+@app.on_event("shutdown")
+async def close_qloo_client():
+    await qloo_handler.client.close()
+
+
+@app.on_event("shutdown")
+def flush_lint_cache():
+    lint_cache.flush()
+
+
+async def _submit_job(kind: str, file: UploadFile, params: dict, request: Request, cost: float = None):
+    """Budget is taken at submit time: `cost` units, or the prompt-token estimate when None."""
+    payload = await read_upload(file)
+    ctx = RequestContext(payload, filename=file.filename or "")
+    if ctx.decode_error:
+        return {"error": "Uploaded file is not valid UTF-8."}
+    if ctx.is_empty:
+        return {"error": "Uploaded YAML is empty or unreadable."}
+    await _spend(request, units_for_text(ctx.text) if cost is None else cost)
+    job_id = jobs.submit(kind, params, payload)
+    return {"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}
+
+
+@app.post("/jobs/analyze")
+@limiter.limit("5/minute")
+async def submit_analyze_job(
+    request: Request,
+    file: UploadFile = File(...),
+    engine: str = Query("kube-linter", description="Lint engine: kube-linter, native or hybrid")
+):
+    if engine not in rule_engine.ENGINES:
+        return {"error": f"Invalid engine. Choose from: {', '.join(rule_engine.ENGINES)}."}
+    # Nothing up front: the job takes the budget once it knows the issues to explain.
+    return await _submit_job("analyze", file, {"engine": engine, "client": get_remote_address(request)}, request, cost=0)
+
+
+@app.post("/jobs/suggest")
+@limiter.limit("5/minute")
+async def submit_suggest_job(request: Request, file: UploadFile = File(...)):
+    return await _submit_job("suggest", file, {}, request)
+
+
+@app.post("/jobs/suggest-persona")
+async def submit_suggest_persona_job(request: Request, file: UploadFile = File(...), persona: str = Query("junior")):
+    return await _submit_job("suggest-persona", file, {"persona": persona}, request)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=60, description="Long-poll up to this many seconds for completion")
+):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    while True:
+        job = await loop.run_in_executor(None, jobs.get, job_id)
+        if job is None:
+            return JSONResponse(status_code=404, content={"error": "Job not found or expired."})
+        if job["status"] in ("done", "failed") or loop.time() >= deadline:
+            return job
+        await asyncio.sleep(0.25)
+
+
 @app.get("/memory")
 def get_recent_memories(q: str = Query(..., description="Query term for RAG memory")):
     try:
@@ -187,17 +576,63 @@ def get_recent_memories(q: str = Query(..., description="Query term for RAG memo
 
 @app.post("/memory/clear")
 def clear_memory():
-    memory.store.clear()
-    memory.index = faiss.IndexFlatL2(memory.dim)
-    memory.save("memory-data/memory.pkl")
+    memory.clear()
+    memory.save(llm_handler.MEMORY_PATH)
     return {"message": "Memory cleared."}
 
 
+@app.get("/memory/stats")
+def memory_stats():
+    """Entries and bytes per source, the retention policy, and what compaction has reclaimed."""
+    return memory.stats()
+
+
+# Seconds between background RAG memory retention passes (0 disables them).
+MEMORY_COMPACT_INTERVAL = float(os.getenv("MEMORY_COMPACT_INTERVAL", "60"))
+
+
+async def _compact_memory_forever():
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(MEMORY_COMPACT_INTERVAL)
+        try:
+            run = await loop.run_in_executor(None, memory.compact)
+            if run["evicted"]:
+                await loop.run_in_executor(None, memory.save, llm_handler.MEMORY_PATH)
+        except Exception:
+            logger.exception("RAG memory compaction failed")
+
+
+@app.on_event("startup")
+async def start_memory_compaction():
+    if MEMORY_COMPACT_INTERVAL > 0:
+        app.state.memory_compaction = asyncio.get_running_loop().create_task(_compact_memory_forever())
+
+
+@app.on_event("shutdown")
+async def stop_memory_compaction():
+    task = getattr(app.state, "memory_compaction", None)
+    if task is not None:
+        task.cancel()
+
+
 @app.get("/")
 def root():
     return {"message": "GenKube Guard is running 🚀"}
 
 
+@app.on_event("startup")
+async def start_warmup():
+    app.state.warmup = asyncio.get_running_loop().create_task(warmup.run_async())
+
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 503 until start-up warm-up has finished (or timed out)."""
+    status = warmup.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
 from fastapi import FastAPI, Request, Query
 from src import qloo_handler
 from src.llm_handler import explain_with_qloo
@@ -206,9 +641,61 @@ import logging
 
 
 
+# Whole /recommend responses, keyed on (normalized persona, mode, prompt version, model).
+RECOMMEND_CACHE_SIZE = int(os.getenv("RECOMMEND_CACHE_SIZE", "256"))
+RECOMMEND_CACHE_TTL = float(os.getenv("RECOMMEND_CACHE_TTL", "3600"))
+# Comma-separated personas computed in the background at startup.
+RECOMMEND_PREWARM = os.getenv("RECOMMEND_PREWARM", "")
+
+recommend_cache = LRUCache(maxsize=RECOMMEND_CACHE_SIZE, ttl=RECOMMEND_CACHE_TTL, name="recommend")
+metrics.register_cache(recommend_cache)
+
+
+def _recommend_key(persona: str, mode: str) -> tuple:
+    return (
+        qloo_handler.normalize_topic(persona),
+        mode,
+        llm_handler.prompt_registry.version,
+        llm_handler.active_model("mistral"),
+    )
+
+
+async def _recommendation(persona: str, mode: str):
+    """(recommendation, qloo_data, error) for one persona; qloo errors come back as error."""
+    # Keyed before the LLM call, so a prompt or model switch meanwhile cannot file it under the new one.
+    key = _recommend_key(persona, mode)
+    qloo_data = await qloo_handler.fetch_qloo_profile(persona, mode=mode)
+    if "error" in qloo_data:
+        return None, qloo_data, qloo_data["error"]
+    loop = asyncio.get_running_loop()
+    recommendation = await loop.run_in_executor(None, explain_with_qloo, persona, qloo_data, mode)
+    # With an API key, mock data means Qloo failed this time; don't pin that answer for the TTL.
+    degraded = qloo_data.get("mock") and qloo_handler.client.api_key
+    if llm_handler.is_valid_recommendation_response(recommendation) and not degraded:
+        recommend_cache.set(key, recommendation)
+    return recommendation, qloo_data, None
+
+
+@app.on_event("startup")
+async def prewarm_recommendations():
+    personas = [p.strip() for p in RECOMMEND_PREWARM.split(",") if p.strip()]
+    if not personas:
+        return
+
+    async def warm():
+        for persona in personas:
+            try:
+                await _recommendation(persona, "default")
+            except Exception:
+                logger.exception("Pre-warming /recommend failed for %r", persona)
+        logger.info("Pre-warmed /recommend for %d persona(s)", len(personas))
+
+    asyncio.get_running_loop().create_task(warm())
+
+
 @app.get("/recommend")
 @limiter.limit("10/minute")
-def get_recommendation(
+async def get_recommendation(
     request: Request,
     q: str = Query(..., description="Describe the user or cultural persona"),
     mode: str = Query("default", description="Mode: default or technical"),
@@ -216,13 +703,17 @@ def get_recommendation(
 ):
     try:
         logger.info("Recommend called: persona=%s | mode=%s", q, mode)
-        qloo_data = qloo_handler.get_qloo_profile(q, mode=mode)
-
-        if "error" in qloo_data:
+        # debug always recomputes so the returned Qloo data matches the recommendation.
+        if not debug:
+            cached = recommend_cache.get(_recommend_key(q, mode))
+            if cached is not None:
+                return {"recommendation": cached}
+
+        await _spend(request, 1)
+        enriched_explanation, qloo_data, error = await _recommendation(q, mode)
+        if error:
             logger.warning("Qloo returned error for %s", q)
-            return {"error": qloo_data["error"]}
-
-        enriched_explanation = explain_with_qloo(q, qloo_data, mode=mode)
+            return {"error": error}
 
         if debug:
             return {
@@ -233,19 +724,40 @@ def get_recommendation(
 
         return {"recommendation": enriched_explanation}
 
+    except BudgetExceeded as e:
+        return _over_budget(e)
     except Exception as e:
         logger.exception("Error in /recommend")
         return {"error": "Internal Server Error during recommendation."}
 
 
+@app.exception_handler(UploadTooLarge)
+async def upload_too_large_handler(request, exc):
+    return _too_large(exc)
+
+
+@app.exception_handler(BudgetExceeded)
+async def budget_exceeded_handler(request, exc):
+    return _over_budget(exc)
+
+
 @app.exception_handler(RateLimitExceeded)
 async def rate_limit_handler(request, exc):
     logger.warning("Rate limit exceeded: %s", request.client.host)
-    return JSONResponse(status_code=429, content={"error": "Rate limit exceeded. Try again later."})
+    metrics.rate_limited.inc(limiter="requests")
+    headers = {}
+    try:
+        # Seconds until the fixed window that was hit resets.
+        limit, args = request.state.view_rate_limit
+        reset_at, _ = limiter.limiter.get_window_stats(limit, *args)
+        headers["Retry-After"] = retry_after_header(reset_at - time.time())
+    except Exception:
+        logger.exception("Could not compute Retry-After")
+    return JSONResponse(status_code=429, content={"error": "Rate limit exceeded. Try again later."}, headers=headers)
 
 
 schema = strawberry.Schema(query=GQLQuery, mutation=GQLMutation)
-graphql_app = GraphQLRouter(schema)
+graphql_app = GraphQLRouter(schema, context_getter=graphql_context)
 app.include_router(graphql_app, prefix="/graphql")
 
 
@@ -0,0 +1,328 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import tarfile
+import zipfile
+from collections import deque
+from pathlib import PurePosixPath
+
+from src import profiler, rule_engine
+from src.cost_limiter import BudgetExceeded
+from src.lint_cache import document_hash
+from src.request_context import RequestContext, UploadTooLarge
+
+logger = logging.getLogger("genkube")
+
+# Files linted together in one kube-linter invocation.
+BATCH_CHUNK_FILES = int(os.getenv("BATCH_CHUNK_FILES", "50"))
+
+# Chunks linted concurrently; together with the chunk size this bounds memory.
+BATCH_MAX_INFLIGHT = int(os.getenv("BATCH_MAX_INFLIGHT", "4"))
+
+# Members larger than this are reported as skipped instead of being read.
+BATCH_MAX_FILE_BYTES = int(os.getenv("BATCH_MAX_FILE_BYTES", str(5 * 1024 * 1024)))
+
+# Documents parsed per step of a single upload; the native engine also lints them per step.
+STREAM_CHUNK_DOCS = int(os.getenv("STREAM_CHUNK_DOCS", "25"))
+
+MANIFEST_SUFFIXES = (".yaml", ".yml")
+
+# Stands in for explanations the client's LLM budget could not pay for.
+BUDGET_EXCEEDED_EXPLANATION = "Not explained: LLM budget exceeded. Retry later for an explanation."
+
+
+class SkippedFile:
+    def __init__(self, name: str, reason: str):
+        self.name = name
+        self.reason = reason
+
+
+def _is_manifest(name: str) -> bool:
+    path = PurePosixPath(name)
+    return path.suffix.lower() in MANIFEST_SUFFIXES and not any(part.startswith(".") for part in path.parts)
+
+
+def is_archive(fileobj) -> bool:
+    try:
+        return zipfile.is_zipfile(fileobj) or tarfile.is_tarfile(fileobj)
+    finally:
+        fileobj.seek(0)
+
+
+def iter_archive(fileobj):
+    """
+    Yield (name, bytes) or SkippedFile for each manifest in a tar(.gz) or zip
+    archive, reading one member at a time.
+    """
+    if zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not _is_manifest(info.filename):
+                    continue
+                if info.file_size > BATCH_MAX_FILE_BYTES:
+                    yield SkippedFile(info.filename, "file exceeds size limit")
+                    continue
+                yield info.filename, archive.read(info)
+        return
+
+    fileobj.seek(0)
+    # Stream mode: members are read sequentially, nothing is indexed up front.
+    with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+        for member in archive:
+            if not member.isfile() or not _is_manifest(member.name):
+                continue
+            if member.size > BATCH_MAX_FILE_BYTES:
+                yield SkippedFile(member.name, "file exceeds size limit")
+                continue
+            yield member.name, archive.extractfile(member).read()
+
+
+def iter_uploads(files):
+    """Yield (name, bytes) for a multi-file upload, reading one file at a time."""
+    for upload in files:
+        data = upload.file.read(BATCH_MAX_FILE_BYTES + 1)
+        if len(data) > BATCH_MAX_FILE_BYTES:
+            yield SkippedFile(upload.filename, "file exceeds size limit")
+            continue
+        yield upload.filename, data
+
+
+def _next_chunk(iterator) -> list:
+    chunk = []
+    for item in iterator:
+        chunk.append(item)
+        if len(chunk) >= BATCH_CHUNK_FILES:
+            break
+    return chunk
+
+
+def lint_chunk(chunk: list, engine: str) -> list:
+    """
+    Lint every file of a chunk in one engine call and split the issues back
+    per file. Returns a list of result dicts in chunk order.
+    """
+    results = []
+    docs = []
+    owners = []
+    for item in chunk:
+        if isinstance(item, SkippedFile):
+            results.append({"file": item.name, "error": item.reason})
+            continue
+        name, data = item
+        try:
+            ctx = RequestContext(data, filename=name)
+        except UploadTooLarge as e:
+            results.append({"file": name, "error": str(e)})
+            continue
+        if ctx.decode_error:
+            results.append({"file": name, "error": "File is not valid UTF-8."})
+            continue
+        if ctx.parse_error:
+            results.append({"file": name, "error": "Invalid or unparseable YAML."})
+            continue
+        result = {"file": name, "issues": []}
+        results.append(result)
+        for doc in ctx.docs or []:
+            docs.append(doc)
+            owners.append(result)
+
+    try:
+        per_doc = rule_engine.lint_per_document(docs, engine)
+    except Exception as e:
+        logger.exception("Batch lint failed for chunk of %d files", len(chunk))
+        for result in {id(r): r for r in owners}.values():
+            result.pop("issues", None)
+            result["error"] = f"Error running kube-linter: {e}"
+        return results
+
+    for result, issues in zip(owners, per_doc):
+        result["issues"].extend(issues)
+    return results
+
+
+def _take(iterator, count: int, hashed: bool = False) -> list:
+    docs = list(itertools.islice(iterator, count))
+    if hashed:
+        return [(doc, document_hash(doc)) for doc in docs]
+    return [(doc, None) for doc in docs]
+
+
+def known_explanations(previous: dict) -> dict:
+    """issue -> explanation from a manifest snapshot (older snapshots kept parallel lists)."""
+    known = {}
+    for stored in (previous or {}).values():
+        explanations = stored.get("explanations") or {}
+        if isinstance(explanations, list):
+            explanations = dict(zip(stored.get("issues") or [], explanations))
+        known.update(explanations)
+    return known
+
+
+async def lint_incrementally(documents, engine: str = "kube-linter", explain_fn=None, previous: dict = None,
+                             admit=None):
+    """
+    Lint a lazily parsed document stream, parsed STREAM_CHUNK_DOCS at a time.
+    Native rules look at one document at a time, so with engine="native"
+    each chunk is linted while the next one is parsed. kube-linter (alone or
+    in hybrid) has checks across objects, e.g. dangling-service, so it lints
+    the whole document set in one call once parsing is done. Explanations for
+    a lint call's issues start as soon as it returns, after `await
+    admit(issues)` has accepted the distinct issues about to be explained
+    (it raises to refuse them, e.g. when the client's LLM budget is short).
+    Parse, lint and admit errors propagate.
+
+    Returns one dict per document, in order, with "hash", "issues",
+    "explanations" (strings), "explained" (issues sent to explain_fn) and
+    "reused". `previous` is the last snapshot of the manifest, mapping
+    document hashes to {"issues", "explanations": {issue: text}}: every
+    document is still linted, but issues explained before are not explained
+    again. A document is "reused" when it is unchanged and needed no new
+    explanation.
+    """
+    loop = asyncio.get_running_loop()
+    per_chunk = engine == "native"
+    known = known_explanations(previous)
+    iterator = iter(documents)
+    results = []
+    explaining = {}
+    linting = None
+    pending_docs, pending_results = [], []
+
+    def start_lint():
+        lint = profiler.in_thread(rule_engine.lint_per_document)
+        return loop.run_in_executor(None, lint, pending_docs, engine), pending_results
+
+    async def finish_lint(future, pending):
+        for result, doc_issues in zip(pending, await future):
+            result["issues"] = [str(issue) for issue in doc_issues]
+        if not explain_fn:
+            return
+        new = list(dict.fromkeys(
+            issue for result in pending for issue in result["issues"] if issue not in known and issue not in explaining
+        ))
+        if admit and new:
+            await admit(new)
+        for issue in new:
+            explaining[issue] = loop.run_in_executor(None, explain_fn, issue)
+        for result in pending:
+            for issue in result["issues"]:
+                result["explanations"].append(known[issue] if issue in known else explaining[issue])
+            result["explained"] = sum(1 for issue in result["issues"] if issue not in known)
+            result["reused"] = result["reused"] and not result["explained"]
+
+    try:
+        while True:
+            chunk = await loop.run_in_executor(
+                None, profiler.in_thread(_take), iterator, STREAM_CHUNK_DOCS, previous is not None
+            )
+            if linting is not None:
+                await finish_lint(*linting)
+                linting = None
+            if not chunk:
+                break
+
+            for doc, digest in chunk:
+                unchanged = previous is not None and digest in previous
+                result = {"hash": digest, "issues": [], "explanations": [], "explained": 0, "reused": unchanged}
+                results.append(result)
+                pending_docs.append(doc)
+                pending_results.append(result)
+            if per_chunk:
+                linting = start_lint()
+                pending_docs, pending_results = [], []
+
+        if pending_docs:
+            linting = start_lint()
+            await finish_lint(*linting)
+            linting = None
+
+        await asyncio.gather(*explaining.values())
+        for result in results:
+            result["explanations"] = [
+                text.result() if isinstance(text, asyncio.Future) else text for text in result["explanations"]
+            ]
+        return results
+    finally:
+        # On a parse, lint or admit error, drop work that is still in flight.
+        for future in [linting[0] if linting else None, *explaining.values()]:
+            if future is not None:
+                future.cancel()
+
+
+class Explainer:
+    """
+    Explains each distinct (check, message) once per batch, however many
+    files hit it. When explain_fn raises BudgetExceeded the stream goes on
+    with a notice in place of the explanation.
+    """
+
+    def __init__(self, explain_fn):
+        self.explain_fn = explain_fn
+        self.pending = {}
+        self.over_budget = 0
+
+    def _explain(self, text: str) -> str:
+        try:
+            return self.explain_fn(text)
+        except BudgetExceeded:
+            self.over_budget += 1
+            return BUDGET_EXCEEDED_EXPLANATION
+
+    def explain(self, issue):
+        key = (issue.check, issue.message)
+        if key not in self.pending:
+            loop = asyncio.get_running_loop()
+            self.pending[key] = loop.run_in_executor(None, self._explain, str(issue))
+        return self.pending[key]
+
+    @property
+    def unique(self) -> int:
+        return len(self.pending)
+
+
+async def analyze_batch(items, engine: str = "kube-linter", explain_fn=None):
+    """
+    Async generator of NDJSON lines: one per file as soon as its chunk is
+    linted (and explained, if explain_fn is given), then a summary line.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = iter(items)
+    explainer = Explainer(explain_fn) if explain_fn else None
+    inflight = deque()
+    files = issues_total = 0
+
+    async def emit(future):
+        nonlocal files, issues_total
+        lines = []
+        for result in await future:
+            files += 1
+            if "issues" in result:
+                issues = result["issues"]
+                issues_total += len(issues)
+                if explainer:
+                    result["explanations"] = list(await asyncio.gather(*(explainer.explain(i) for i in issues)))
+                result["issues"] = [str(i) for i in issues]
+            lines.append(json.dumps(result) + "\n")
+        return lines
+
+    exhausted = False
+    while not exhausted or inflight:
+        if not exhausted and len(inflight) < BATCH_MAX_INFLIGHT:
+            chunk = await loop.run_in_executor(None, _next_chunk, iterator)
+            if chunk:
+                inflight.append(loop.run_in_executor(None, lint_chunk, chunk, engine))
+                continue
+            exhausted = True
+        if inflight:
+            for line in await emit(inflight.popleft()):
+                yield line
+
+    summary = {"files": files, "issues": issues_total}
+    if explainer:
+        summary["unique_issues_explained"] = explainer.unique - explainer.over_budget
+        summary["unique_issues_over_budget"] = explainer.over_budget
+    logger.info("Batch analysis complete: %s", summary)
+    yield json.dumps({"summary": summary}) + "\n"
@@ -0,0 +1,81 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger("genkube")
+
+
+class LRUCache:
+    """
+    Small thread-safe LRU cache with an optional TTL (seconds) and hit/miss
+    counters. Shared by the explanation, lint and response caches.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = None, name: str = "cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, stored_at = item
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def items(self) -> list:
+        """Live (key, value) pairs, oldest first."""
+        with self._lock:
+            now = time.monotonic()
+            return [
+                (key, value)
+                for key, (value, stored_at) in self._data.items()
+                if self.ttl is None or now - stored_at < self.ttl
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key) -> bool:
+        """Whether key holds a live value; unlike get(), not counted as a hit or miss."""
+        with self._lock:
+            item = self._data.get(key)
+            return item is not None and (self.ttl is None or time.monotonic() - item[1] < self.ttl)
+
+    def __len__(self):
+        return len(self._data)
+
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hit_ratio(), 4),
+        }
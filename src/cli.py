@@ -0,0 +1,280 @@
+"""
+Offline scanner for CI gates and repo-wide sweeps: lints manifests in-process
+(no HTTP, no rate limits), spreading files over a process pool.
+
+    python main.py scan k8s/ deploy/app.yaml --format sarif --output scan.sarif
+    python main.py scan . --engine native --no-llm --patch-dir patched/
+
+Exits 1 when any issue or unreadable file was found (0 with --exit-zero).
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from src import batch_analyzer, patch_rules, rule_engine
+from src.lint_cache import lint_cache
+from src.request_context import RequestContext, dump_all
+
+logger = logging.getLogger("genkube")
+
+# Files handed to a worker process at a time. Chunks hold whole directories, and
+# each directory is one kube-linter run, so cross-object checks (dangling-service)
+# always see the same set of objects however the files are spread over workers.
+SCAN_CHUNK_FILES = int(os.getenv("SCAN_CHUNK_FILES", str(batch_analyzer.BATCH_CHUNK_FILES)))
+
+# Concurrent LLM explanations when --no-llm is not given.
+SCAN_EXPLAIN_WORKERS = int(os.getenv("SCAN_EXPLAIN_WORKERS", "4"))
+
+FORMATS = ("json", "sarif")
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+INFORMATION_URI = "https://github.com/Site24x7Project/genkube-guard"
+
+
+def collect_files(paths: list) -> list:
+    """Manifest files under the given files and directories, sorted, without duplicates."""
+    found = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+                for name in files:
+                    full = os.path.join(root, name)
+                    if batch_analyzer._is_manifest(os.path.relpath(full, path).replace(os.sep, "/")):
+                        found.add(os.path.normpath(full))
+        elif os.path.isfile(path):
+            found.add(os.path.normpath(path))
+        else:
+            logger.warning("Skipping %s: no such file or directory", path)
+    return sorted(found)
+
+
+def scan_root(paths: list) -> str:
+    """Deepest directory containing every scanned path; patched copies mirror the tree below it."""
+    dirs = [os.path.abspath(path if os.path.isdir(path) else os.path.dirname(path) or ".") for path in paths]
+    return os.path.commonpath(dirs) if dirs else os.getcwd()
+
+
+def _by_directory(files: list) -> dict:
+    groups = {}
+    for path in files:
+        groups.setdefault(os.path.dirname(path), []).append(path)
+    return groups
+
+
+def _read(path: str):
+    if os.path.getsize(path) > batch_analyzer.BATCH_MAX_FILE_BYTES:
+        return batch_analyzer.SkippedFile(path, "file exceeds size limit")
+    with open(path, "rb") as f:
+        return path, f.read()
+
+
+def _write_patch(path: str, data: bytes, patch_dir: str, root: str):
+    """Patch a file with the /patch rules and write it under patch_dir, mirroring its path below root."""
+    ctx = RequestContext(data, filename=path)
+    if not ctx.docs:
+        return
+    changed = False
+    for doc in ctx.docs:
+        changed = patch_rules.engine.patch(doc) or changed
+    if not changed:
+        return
+    target = os.path.join(patch_dir, os.path.relpath(os.path.abspath(path), root))
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    with open(target, "w", encoding="utf-8") as f:
+        f.write(dump_all(ctx.docs))
+
+
+def scan_chunk(paths: list, engine: str, patch_dir: str = "", root: str = "") -> list:
+    """
+    Worker entry point: lint each directory of a chunk with one
+    batch_analyzer.lint_chunk call and, with patch_dir, write patched copies
+    below it (mirroring paths under root). Returns the result dicts.
+    """
+    results = []
+    for group in _by_directory(paths).values():
+        items = []
+        for path in group:
+            try:
+                items.append(_read(path))
+            except OSError as e:
+                items.append(batch_analyzer.SkippedFile(path, f"unreadable: {e.strerror}"))
+        group_results = batch_analyzer.lint_chunk(items, engine)
+        if patch_dir:
+            for item, result in zip(items, group_results):
+                if "issues" in result:
+                    try:
+                        _write_patch(item[0], item[1], patch_dir, root or scan_root([item[0]]))
+                    except Exception:
+                        logger.exception("Could not write patched copy of %s", result["file"])
+        results.extend(group_results)
+    lint_cache.flush()
+    return results
+
+
+def _chunks(files: list, size: int) -> list:
+    """Pack whole directories into chunks of about `size` files (a larger directory is one chunk)."""
+    chunks = [[]]
+    for group in _by_directory(files).values():
+        if chunks[-1] and len(chunks[-1]) + len(group) > size:
+            chunks.append([])
+        chunks[-1].extend(group)
+    return [chunk for chunk in chunks if chunk]
+
+
+def scan(files: list, engine: str = "kube-linter", workers: int = None, patch_dir: str = "", root: str = "") -> list:
+    """Lint files across a process pool (one worker per CPU by default); results in file order."""
+    root = root or scan_root(files)
+    chunks = _chunks(files, max(1, SCAN_CHUNK_FILES))
+    workers = min(workers or os.cpu_count() or 1, len(chunks))
+    if workers <= 1:
+        results = [result for chunk in chunks for result in scan_chunk(chunk, engine, patch_dir, root)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(scan_chunk, chunk, engine, patch_dir, root) for chunk in chunks]
+            results = [result for future in futures for result in future.result()]
+    by_file = {result["file"]: result for result in results}
+    return [by_file[path] for path in files]
+
+
+def explain_issues(results: list, use_llm: bool) -> dict:
+    """
+    One explanation per distinct (check, message). Without the LLM this is
+    the remediation hint; with it, llm_handler.explain (and its cache), which
+    is only imported here so --no-llm never loads the embedding model.
+    """
+    unique = {}
+    for result in results:
+        for issue in result.get("issues", []):
+            unique.setdefault((issue.check, issue.message), issue)
+    if not use_llm:
+        return {key: issue.remediation or rule_engine.REMEDIATIONS.get(issue.check, "") for key, issue in unique.items()}
+
+    from src import llm_handler
+
+    with ThreadPoolExecutor(max_workers=SCAN_EXPLAIN_WORKERS) as pool:
+        explained = pool.map(llm_handler.explain, [str(issue) for issue in unique.values()])
+        return dict(zip(unique, explained))
+
+
+def to_json(results: list, explanations: dict, meta: dict) -> dict:
+    files = []
+    for result in results:
+        entry = {"file": result["file"]}
+        if "error" in result:
+            entry["error"] = result["error"]
+        else:
+            entry["issues"] = [
+                dict(issue.to_dict(), explanation=explanations.get((issue.check, issue.message), ""))
+                for issue in result["issues"]
+            ]
+        files.append(entry)
+    return {"summary": meta, "files": files}
+
+
+def to_sarif(results: list, explanations: dict, meta: dict) -> dict:
+    rules = {}
+    sarif_results = []
+    notifications = []
+    for result in results:
+        uri = result["file"].replace(os.sep, "/")
+        if "error" in result:
+            notifications.append({
+                "level": "error",
+                "message": {"text": f"{uri}: {result['error']}"},
+                "locations": [{"physicalLocation": {"artifactLocation": {"uri": uri}}}],
+            })
+            continue
+        for issue in result["issues"]:
+            if issue.check not in rules:
+                rules[issue.check] = {
+                    "id": issue.check,
+                    "shortDescription": {"text": issue.check},
+                    "help": {"text": issue.remediation or rule_engine.REMEDIATIONS.get(issue.check, "")},
+                }
+            namespace = issue.namespace or "<no namespace>"
+            sarif_results.append({
+                "ruleId": issue.check,
+                "level": "warning",
+                "message": {"text": issue.message},
+                "locations": [{
+                    "physicalLocation": {"artifactLocation": {"uri": uri}},
+                    "logicalLocations": [{
+                        "fullyQualifiedName": f"{namespace}/{issue.object_name}",
+                        "kind": issue.object_kind,
+                    }],
+                }],
+                "properties": {"explanation": explanations.get((issue.check, issue.message), "")},
+            })
+    return {
+        "$schema": SARIF_SCHEMA,
+        "version": "2.1.0",
+        "runs": [{
+            "tool": {"driver": {"name": "genkube-guard", "informationUri": INFORMATION_URI, "rules": list(rules.values())}},
+            "invocations": [{"executionSuccessful": not notifications, "toolExecutionNotifications": notifications}],
+            "results": sarif_results,
+            "properties": meta,
+        }],
+    }
+
+
+def run_scan(args) -> int:
+    started = time.perf_counter()
+    files = collect_files(args.paths)
+    if not files:
+        logger.error("No manifests found under: %s", ", ".join(args.paths))
+        return 2
+    results = scan(files, args.engine, args.workers, args.patch_dir, scan_root(args.paths))
+    explanations = explain_issues(results, use_llm=not args.no_llm)
+
+    issues = sum(len(r.get("issues", [])) for r in results)
+    errors = sum(1 for r in results if "error" in r)
+    meta = {
+        "files": len(results),
+        "issues": issues,
+        "errors": errors,
+        "engine": args.engine,
+        "llm": not args.no_llm,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    report = (to_sarif if args.format == "sarif" else to_json)(results, explanations, meta)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    logger.info("Scanned %d file(s) in %.2fs: %d issue(s), %d error(s)", len(results), meta["seconds"], issues, errors)
+    return 0 if args.exit_zero or not (issues or errors) else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="genkube-guard", description="GenKube Guard command line.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    scan_parser = commands.add_parser("scan", help="lint manifests offline", description=__doc__,
+                                      formatter_class=argparse.RawDescriptionHelpFormatter)
+    scan_parser.add_argument("paths", nargs="+", help="manifest files or directories (searched for *.yaml/*.yml)")
+    scan_parser.add_argument("--engine", choices=rule_engine.ENGINES, default="kube-linter")
+    scan_parser.add_argument("--format", choices=FORMATS, default="json")
+    scan_parser.add_argument("--output", "-o", help="report path (default stdout)")
+    scan_parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    scan_parser.add_argument("--no-llm", action="store_true", help="use remediation hints instead of LLM explanations")
+    scan_parser.add_argument("--patch-dir", default="", help="write patched copies of the manifests here")
+    scan_parser.add_argument("--exit-zero", action="store_true", help="exit 0 even when issues are found")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "scan":
+        return run_scan(args)
+    return 2
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(name)s | %(message)s")
+    sys.exit(main())
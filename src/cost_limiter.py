@@ -0,0 +1,162 @@
+"""
+Per-client token bucket shared by every worker on the node (SQLite), charged
+by estimated LLM work instead of per request: one unit per explained lint
+issue, or per LLM_BUDGET_TOKENS_PER_UNIT prompt tokens. The slowapi limits in
+api.py stay as a coarse per-process request cap in front of it.
+"""
+import logging
+import math
+import os
+import sqlite3
+import time
+
+from src import metrics
+
+logger = logging.getLogger("genkube")
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").strip().lower() not in ("0", "false", "no")
+
+RATE_LIMIT_DB_PATH = os.getenv("RATE_LIMIT_DB_PATH", "memory-data/ratelimit.db")
+
+# Units a client regains per minute, and the most it can save up.
+LLM_BUDGET_PER_MINUTE = float(os.getenv("LLM_BUDGET_PER_MINUTE", "60"))
+LLM_BUDGET_BURST = float(os.getenv("LLM_BUDGET_BURST", "120"))
+
+# Prompt tokens that cost one unit (about what explaining one issue costs).
+LLM_BUDGET_TOKENS_PER_UNIT = int(os.getenv("LLM_BUDGET_TOKENS_PER_UNIT", "500"))
+
+# Rough prompt tokens per character of manifest text.
+CHARS_PER_TOKEN = 4
+
+# Every this many writes, drop buckets that have refilled completely (same as absent).
+PRUNE_EVERY = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    client TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class BudgetExceeded(Exception):
+    def __init__(self, retry_after: float, cost: float):
+        self.retry_after = retry_after
+        self.cost = cost
+        super().__init__(f"LLM budget exceeded; {cost:g} unit(s) available in {retry_after:.1f}s")
+
+
+def units_for_text(text: str) -> int:
+    """Units for one LLM call whose prompt embeds `text`."""
+    tokens = len(text or "") / CHARS_PER_TOKEN
+    return max(1, math.ceil(tokens / LLM_BUDGET_TOKENS_PER_UNIT))
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+class CostLimiter:
+    """
+    take() spends units before LLM work and raises BudgetExceeded with the
+    exact wait when the bucket is short. Callers take once the size of the
+    work is known (e.g. after the lint stage has counted the issues to
+    explain) and before any of it runs. A cost above burst needs a full
+    bucket and leaves the balance negative by the rest, which later requests
+    wait to refill. A broken database never blocks requests.
+    """
+
+    def __init__(self, path=RATE_LIMIT_DB_PATH, per_minute=LLM_BUDGET_PER_MINUTE, burst=LLM_BUDGET_BURST,
+                 enabled=RATE_LIMIT_ENABLED):
+        self.path = path
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.enabled = enabled and per_minute > 0
+        self._writes = 0
+        if not self.enabled:
+            return
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _refilled(self, row, now: float) -> float:
+        if row is None:
+            return self.burst
+        tokens, updated_at = row
+        return min(self.burst, tokens + max(0.0, now - updated_at) * self.rate)
+
+    def _spend(self, client: str, cost: float, required: float) -> float:
+        """Deduct cost if at least `required` units are available; returns the wait in seconds (0 = spent)."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE client = ?", (client,)).fetchone()
+            tokens = self._refilled(row, now)
+            if tokens < required:
+                conn.rollback()
+                return (required - tokens) / self.rate
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (client, tokens, updated_at) VALUES (?, ?, ?)",
+                (client, tokens - cost, now),
+            )
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM buckets WHERE updated_at < ?", (now - 2 * self.burst / self.rate,))
+            conn.commit()
+            return 0.0
+        finally:
+            conn.close()
+
+    def take(self, client: str, cost: float = 1):
+        """Spend cost units now or raise BudgetExceeded. Costs above burst need a full bucket."""
+        if not self.enabled or cost <= 0:
+            return
+        try:
+            wait = self._spend(client, cost, min(cost, self.burst))
+        except sqlite3.Error:
+            logger.exception("Rate limit store unavailable; allowing request")
+            return
+        if wait > 0:
+            metrics.rate_limited.inc(limiter="llm_budget")
+            logger.warning("LLM budget exceeded for %s: %g unit(s), retry in %.1fs", client, cost, wait)
+            raise BudgetExceeded(wait, cost)
+        metrics.llm_budget_units.inc(cost)
+
+    def metered(self, client: str, fn, cost: float = 1, free=None):
+        """
+        fn wrapped to take `cost` units before each call (for LLM calls made
+        while streaming, whose number is not known up front). Calls for which
+        free(*args) is true (e.g. cached explanations) cost nothing. Once the
+        budget runs out every further paid call raises BudgetExceeded without
+        touching the store.
+        """
+        exceeded = []
+
+        def call(*args, **kwargs):
+            if free is None or not free(*args):
+                if exceeded:
+                    raise exceeded[0]
+                try:
+                    self.take(client, cost)
+                except BudgetExceeded as e:
+                    exceeded.append(e)
+                    raise
+            return fn(*args, **kwargs)
+        return call
+
+    def balance(self, client: str) -> float:
+        if not self.enabled:
+            return self.burst
+        with self._connect() as conn:
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE client = ?", (client,)).fetchone()
+        return self._refilled(row, time.time())
+
+
+budget = CostLimiter()
@@ -0,0 +1,95 @@
+import logging
+import math
+import os
+import re
+import zlib
+
+import numpy as np
+
+logger = logging.getLogger("genkube")
+
+# Which embedder backs RAG memory: "sentence-transformers" or "hashing".
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence-transformers")
+
+# Model loaded by the sentence-transformers backend.
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+
+# Torch threads used by the sentence-transformers backend (0 keeps torch's default).
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+
+# Vector size of the hashing backend; matches all-MiniLM-L6-v2 by default.
+EMBEDDING_HASH_DIM = int(os.getenv("EMBEDDING_HASH_DIM", "384"))
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class SentenceTransformerBackend:
+    """The transformer model; imported lazily so other backends never pay for it."""
+
+    def __init__(self, model_name=EMBEDDING_MODEL, threads=EMBEDDING_THREADS):
+        if threads > 0:
+            import torch
+
+            torch.set_num_threads(threads)
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.id = f"sentence-transformers:{model_name}"
+
+    def encode(self, texts: list) -> np.ndarray:
+        return np.asarray(self.model.encode(texts), dtype="float32")
+
+
+class HashingEmbedder:
+    """
+    Dependency-free embedder: word unigrams, word bigrams and character
+    trigrams hashed into `dim` signed buckets, log-scaled term frequency,
+    L2-normalized. No model to download and deterministic across processes;
+    good enough for keyword-heavy memory search, not for paraphrases.
+    """
+
+    VERSION = 1
+
+    def __init__(self, dim=EMBEDDING_HASH_DIM):
+        self.dim = dim
+        self.id = f"hashing:v{self.VERSION}:{dim}"
+
+    def _features(self, text: str) -> dict:
+        words = _WORD.findall(text.lower())
+        counts = {}
+        grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f"#{word}#"
+            grams.extend(f"~{padded[i:i + 3]}" for i in range(len(padded) - 2))
+        for gram in grams:
+            counts[gram] = counts.get(gram, 0) + 1
+        return counts
+
+    def encode(self, texts: list) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, text in enumerate(texts):
+            for gram, count in self._features(text).items():
+                h = zlib.crc32(gram.encode("utf-8"))
+                sign = 1.0 if h & 0x80000000 else -1.0
+                out[row, h % self.dim] += sign * (1.0 + math.log(count))
+            norm = np.linalg.norm(out[row])
+            if norm:
+                out[row] /= norm
+        return out
+
+
+BACKENDS = {
+    "sentence-transformers": SentenceTransformerBackend,
+    "hashing": HashingEmbedder,
+}
+
+
+def get_backend(name: str = None):
+    """Instantiate the named backend (default: EMBEDDING_BACKEND)."""
+    name = name or EMBEDDING_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend {name!r}; expected one of {', '.join(BACKENDS)}")
+    backend = BACKENDS[name]()
+    logger.info("Embedding backend: %s (dim %d)", backend.id, backend.dim)
+    return backend
@@ -0,0 +1,232 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger("genkube")
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "memory-data/jobs.db")
+
+# Worker threads processing queued jobs.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+# Seconds a finished job's result stays available for polling.
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "3600"))
+
+# How often idle workers re-check the queue and purge expired jobs.
+JOB_POLL_SECONDS = 1.0
+
+# A running job belongs to the process that claimed it for this long; the
+# owner renews the lease every third of it, so only jobs of a process that
+# died (or hung) go back to the queue.
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    payload BLOB,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    expires_at REAL,
+    claimed_by TEXT,
+    lease_expires REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+# Columns added after the first release, for databases created before them.
+MIGRATIONS = (("claimed_by", "TEXT"), ("lease_expires", "REAL"))
+
+
+class JobQueue:
+    """
+    Persistent local job queue on SQLite, shared by every worker process on
+    the node. Jobs survive restarts: a running job whose owner stopped
+    renewing its lease is queued again.
+    """
+
+    def __init__(self, path=JOBS_DB_PATH, workers=JOB_WORKERS, result_ttl=JOB_RESULT_TTL,
+                 lease_seconds=JOB_LEASE_SECONDS):
+        self.path = path
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.handlers = {}
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in MIGRATIONS:
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def register(self, kind: str, handler):
+        """handler(payload: bytes, params: dict) -> JSON-serializable result"""
+        self.handlers[kind] = handler
+
+    def submit(self, kind: str, params: dict = None, payload: bytes = b"") -> str:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, params, payload, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(params or {}), payload, QUEUED, now, now),
+            )
+        self._wakeup.set()
+        logger.info("Job %s queued (%s)", job_id, kind)
+        return job_id
+
+    def get(self, job_id: str):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, kind, status, result, error, created_at, updated_at, expires_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None or (row[7] is not None and row[7] < time.time()):
+            return None
+        job = {"job_id": row[0], "kind": row[1], "status": row[2], "created_at": row[5], "updated_at": row[6]}
+        if row[2] == DONE:
+            job["result"] = json.loads(row[3])
+        if row[2] == FAILED:
+            job["error"] = row[4]
+        return job
+
+    def claim(self):
+        """Atomically move the oldest queued job to running, leased to this queue, and return it."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, kind, params, payload FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                (QUEUED,),
+            ).fetchone()
+            if row is not None:
+                now = time.time()
+                conn.execute(
+                    "UPDATE jobs SET status = ?, updated_at = ?, claimed_by = ?, lease_expires = ? WHERE id = ?",
+                    (RUNNING, now, self.owner, now + self.lease_seconds, row[0]),
+                )
+            conn.commit()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return {"id": row[0], "kind": row[1], "params": json.loads(row[2]), "payload": row[3] or b""}
+
+    def _finish(self, job_id: str, status: str, result=None, error=None):
+        now = time.time()
+        with self._connect() as conn:
+            # The upload is no longer needed once the job has finished. A job
+            # whose lease was lost and re-claimed is left to its new owner.
+            count = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, payload = NULL, updated_at = ?, expires_at = ?, "
+                "lease_expires = NULL WHERE id = ? AND status = ? AND claimed_by = ?",
+                (status, json.dumps(result) if result is not None else None, error, now, now + self.result_ttl,
+                 job_id, RUNNING, self.owner),
+            ).rowcount
+        if not count:
+            logger.warning("Job %s was re-claimed after its lease expired; dropping this result", job_id)
+
+    def renew_leases(self) -> int:
+        """Extend the lease of every job this queue is running."""
+        now = time.time()
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE status = ? AND claimed_by = ?",
+                (now + self.lease_seconds, RUNNING, self.owner),
+            ).rowcount
+
+    def requeue_expired(self) -> int:
+        """Queue again running jobs whose owner stopped renewing the lease (crashed or hung)."""
+        with self._connect() as conn:
+            count = conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ?, claimed_by = NULL, lease_expires = NULL "
+                "WHERE status = ? AND (lease_expires IS NULL OR lease_expires < ?)",
+                (QUEUED, time.time(), RUNNING, time.time()),
+            ).rowcount
+        if count:
+            logger.info("Re-queued %d job(s) whose worker stopped renewing its lease", count)
+        return count
+
+    def purge_expired(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)).rowcount
+
+    def run_one(self) -> bool:
+        job = self.claim()
+        if job is None:
+            return False
+        started = time.monotonic()
+        try:
+            result = self.handlers[job["kind"]](job["payload"], job["params"])
+            self._finish(job["id"], DONE, result=result)
+            logger.info("Job %s done in %.2fs", job["id"], time.monotonic() - started)
+        except Exception as e:
+            logger.exception("Job %s failed", job["id"])
+            self._finish(job["id"], FAILED, error=str(e))
+        return True
+
+    def _worker(self):
+        last_purge = 0.0
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() - last_purge > 60:
+                    self.purge_expired()
+                    self.requeue_expired()
+                    last_purge = time.monotonic()
+                if self.run_one():
+                    continue
+            except Exception:
+                logger.exception("Job worker error")
+            self._wakeup.wait(JOB_POLL_SECONDS)
+            self._wakeup.clear()
+
+    def _renew_loop(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                self.renew_leases()
+            except Exception:
+                logger.exception("Could not renew job leases")
+
+    def start(self):
+        if self._threads:
+            return
+        self.requeue_expired()
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"genkube-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._renew_loop, name="genkube-job-lease", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        logger.info("Started %d job worker(s) on %s", self.workers, self.path)
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
@@ -0,0 +1,74 @@
+import copy
+
+
+def _pointer(path: list) -> str:
+    """RFC 6901 JSON Pointer for a list of keys/indexes."""
+    return "".join("/" + str(part).replace("~", "~0").replace("/", "~1") for part in path)
+
+
+def _unpointer(pointer: str) -> list:
+    if not pointer:
+        return []
+    return [part.replace("~1", "/").replace("~0", "~") for part in pointer.split("/")[1:]]
+
+
+def diff(old, new, path: list = None) -> list:
+    """
+    RFC 6902 operations turning old into new. Maps are diffed key by key;
+    lists of the same length element by element, anything else is replaced.
+    """
+    path = path or []
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": _pointer(path + [key])})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": _pointer(path + [key]), "value": value})
+            else:
+                ops.extend(diff(old[key], value, path + [key]))
+        return ops
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        ops = []
+        for i, (a, b) in enumerate(zip(old, new)):
+            ops.extend(diff(a, b, path + [i]))
+        return ops
+    if old == new and type(old) is type(new):
+        return []
+    return [{"op": "replace", "path": _pointer(path), "value": new}]
+
+
+def apply(doc, ops: list):
+    """Apply add/remove/replace operations to a copy of doc and return it."""
+    doc = copy.deepcopy(doc)
+    for op in ops:
+        parts = _unpointer(op["path"])
+        if not parts:
+            if op["op"] == "remove":
+                doc = None
+            else:
+                doc = copy.deepcopy(op["value"])
+            continue
+        parent = doc
+        for part in parts[:-1]:
+            parent = parent[int(part)] if isinstance(parent, list) else parent[part]
+        last = parts[-1]
+        if isinstance(parent, list):
+            index = len(parent) if last == "-" else int(last)
+            if op["op"] == "add":
+                parent.insert(index, copy.deepcopy(op["value"]))
+            elif op["op"] == "remove":
+                del parent[index]
+            elif op["op"] == "replace":
+                parent[index] = copy.deepcopy(op["value"])
+            else:
+                raise ValueError(f"Unsupported JSON Patch op: {op['op']}")
+        else:
+            if op["op"] in ("add", "replace"):
+                parent[last] = copy.deepcopy(op["value"])
+            elif op["op"] == "remove":
+                del parent[last]
+            else:
+                raise ValueError(f"Unsupported JSON Patch op: {op['op']}")
+    return doc
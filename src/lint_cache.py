@@ -0,0 +1,115 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from src.cache import LRUCache
+
+logger = logging.getLogger("genkube")
+
+# Number of per-document lint results kept in memory. 0 disables the cache.
+LINT_CACHE_SIZE = int(os.getenv("LINT_CACHE_SIZE", "4096"))
+
+# Optional JSON file the cache is loaded from at startup and written back to.
+LINT_CACHE_PATH = os.getenv("LINT_CACHE_PATH", "")
+
+# Minimum seconds between two writes of LINT_CACHE_PATH; newer entries wait for
+# the next write or for flush() at shutdown.
+LINT_CACHE_SAVE_INTERVAL = float(os.getenv("LINT_CACHE_SAVE_INTERVAL", "60"))
+
+
+def document_hash(doc) -> str:
+    """Content address of a parsed document; key order and formatting don't matter."""
+    normalized = json.dumps(doc, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class LintCache:
+    """
+    Lint results per Kubernetes document, keyed on the document hash, the
+    document set it was linted with (cross-object checks such as
+    dangling-service depend on it) and a linter fingerprint (kube-linter
+    version and config), so upgrading the linter or editing its config never
+    serves stale results.
+    """
+
+    def __init__(self, maxsize=LINT_CACHE_SIZE, path=LINT_CACHE_PATH, save_interval=LINT_CACHE_SAVE_INTERVAL):
+        self.entries = LRUCache(maxsize=maxsize, name="lint")
+        self.path = path
+        self.save_interval = save_interval
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = float("-inf")
+        if path:
+            self.load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.entries.maxsize > 0
+
+    def key(self, fingerprint: str, doc) -> str:
+        return f"{fingerprint}:{document_hash(doc)}"
+
+    @staticmethod
+    def set_key(docs) -> str:
+        """Order-independent digest of a document set."""
+        digest = hashlib.sha256()
+        for doc_hash in sorted(document_hash(doc) for doc in docs):
+            digest.update(doc_hash.encode("ascii"))
+        return digest.hexdigest()[:16]
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, issues: list):
+        self.entries.set(key, issues)
+        self._dirty = True
+
+    def stats(self) -> dict:
+        return self.entries.stats()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for key, issues in json.load(f):
+                    self.entries.set(key, issues)
+            logger.info("Lint cache loaded %d entries from %s", len(self.entries), self.path)
+        except Exception:
+            logger.exception("Failed to load lint cache from %s", self.path)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._save_lock:
+            self._dirty = False
+            self._saved_at = time.monotonic()
+            tmp_path = None
+            try:
+                # A temp file per save, so concurrent writers (other workers) never share one.
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".",
+                                                prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(self.entries.items(), f)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                logger.exception("Failed to save lint cache to %s", self.path)
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def save_if_due(self):
+        """Write new entries, at most once per save_interval."""
+        if self._dirty and time.monotonic() - self._saved_at >= self.save_interval:
+            self.save()
+
+    def flush(self):
+        """Write entries not saved yet (shutdown, end of a scan chunk)."""
+        if self._dirty:
+            self.save()
+
+
+lint_cache = LintCache()
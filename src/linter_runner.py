@@ -1,50 +1,268 @@
-import subprocess
-import uuid
+import hashlib
+import json
+import logging
 import os
+import shlex
+import subprocess
 import tempfile
-import logging
+import threading
+from dataclasses import asdict, dataclass
+
+import yaml
+
+from src import metrics
+from src.lint_cache import lint_cache
+from src.request_context import dump_all, load_all
 
 logger = logging.getLogger("genkube")
 
-def run_kube_linter(yaml_bytes: bytes):
+DEFAULT_KUBE_LINTER = "tools/kube-linter.exe" if os.name == "nt" else "kube-linter"
+
+# Command used to run kube-linter; may include arguments (e.g. a stub script).
+KUBE_LINTER_PATH = os.getenv("KUBE_LINTER_PATH", DEFAULT_KUBE_LINTER)
+
+# Upper bound on concurrent kube-linter processes across request threads.
+LINT_MAX_WORKERS = int(os.getenv("LINT_MAX_WORKERS", "4"))
+
+# When set (e.g. /dev/shm), uploads are written there instead of piped over stdin.
+# Only needed for kube-linter builds that cannot read "-".
+KUBE_LINTER_TMPDIR = os.getenv("KUBE_LINTER_TMPDIR", "")
+
+# Optional kube-linter config file, passed as --config and part of the cache key.
+KUBE_LINTER_CONFIG = os.getenv("KUBE_LINTER_CONFIG", "")
+
+LINT_TIMEOUT_SECONDS = 60
+
+NO_ISSUES_MESSAGE = " No lint issues found."
+
+_lint_slots = threading.BoundedSemaphore(LINT_MAX_WORKERS)
+
+
+class LintError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class LintIssue:
+    check: str
+    message: str
+    remediation: str = ""
+    object_name: str = ""
+    object_kind: str = ""
+    namespace: str = ""
+    file_path: str = ""
+
+    def __str__(self):
+        # Same shape as kube-linter's plain output, which explain() was written against.
+        namespace = self.namespace or "<no namespace>"
+        return (
+            f"{self.file_path or '<standard input>'}: (object: {namespace}/{self.object_name} {self.object_kind}) "
+            f"{self.message} (check: {self.check}, remediation: {self.remediation})"
+        )
+
+    @property
+    def identity(self) -> tuple:
+        return (self.object_kind, self.namespace or "", self.object_name)
+
+    def to_dict(self) -> dict:
+        return {
+            "check": self.check,
+            "message": self.message,
+            "remediation": self.remediation,
+            "object": {"name": self.object_name, "kind": self.object_kind, "namespace": self.namespace},
+        }
+
+
+def linter_command() -> list:
+    return shlex.split(KUBE_LINTER_PATH, posix=os.name != "nt")
+
+
+def parse_report(output: str) -> list:
+    """Turn kube-linter's --format json report into LintIssue objects."""
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".yaml") as tmp:
-            tmp.write(yaml_bytes)
-            temp_file = tmp.name
+        report = json.loads(output) if output.strip() else {}
+    except json.JSONDecodeError as e:
+        raise LintError(f"kube-linter returned invalid JSON: {e}") from e
 
-        kube_linter_path = "tools/kube-linter.exe" if os.name == "nt" else "kube-linter"
+    issues = []
+    for entry in report.get("Reports") or []:
+        obj = entry.get("Object") or {}
+        k8s = obj.get("K8sObject") or {}
+        gvk = k8s.get("GroupVersionKind") or {}
+        issues.append(LintIssue(
+            check=entry.get("Check", ""),
+            message=(entry.get("Diagnostic") or {}).get("Message", ""),
+            remediation=entry.get("Remediation", ""),
+            object_name=k8s.get("Name", ""),
+            object_kind=gvk.get("Kind", ""),
+            namespace=k8s.get("Namespace", ""),
+            file_path=(obj.get("Metadata") or {}).get("FilePath", ""),
+        ))
+    return issues
 
-        result = subprocess.run(
-            [kube_linter_path, "lint", temp_file],
+
+def _run(args: list, yaml_bytes: bytes) -> subprocess.CompletedProcess:
+    if not KUBE_LINTER_TMPDIR:
+        return subprocess.run(
+            linter_command() + args + ["-"],
+            input=yaml_bytes,
             capture_output=True,
-            text=True,
-            check=False
+            timeout=LINT_TIMEOUT_SECONDS,
+            check=False,
         )
 
-        output = result.stdout.strip()
-        error_output = result.stderr.strip()
+    with tempfile.NamedTemporaryFile(dir=KUBE_LINTER_TMPDIR, suffix=".yaml") as tmp:
+        tmp.write(yaml_bytes)
+        tmp.flush()
+        return subprocess.run(
+            linter_command() + args + [tmp.name],
+            capture_output=True,
+            timeout=LINT_TIMEOUT_SECONDS,
+            check=False,
+        )
 
-        lines = [line.strip() for line in output.splitlines() if line.strip()]
 
-        issues = []
-        for line in lines:
-            if "kubelinter" in line.lower():
-                continue
-            if ":" not in line:
-                continue
-            issues.append(line)
+def lint_issues(yaml_bytes: bytes, extra_args=None) -> list:
+    """
+    Lint yaml_bytes and return typed issues. Raises LintError if kube-linter
+    fails for a reason other than finding issues.
+    """
+    args = ["lint", "--format", "json"] + _config_args() + list(extra_args or [])
+    with _lint_slots, metrics.timed("kube_linter"):
+        result = _run(args, yaml_bytes)
 
-        if not issues:
-            if error_output:
-                logger.warning("kube-linter stderr: %s", error_output)
-            return [" No lint issues found."]
+    stdout = result.stdout.decode("utf-8", errors="replace")
+    stderr = result.stderr.decode("utf-8", errors="replace").strip()
+
+    # kube-linter exits 1 when it found issues; anything else is a real failure.
+    if result.returncode not in (0, 1):
+        raise LintError(f"kube-linter exited with {result.returncode}: {stderr[:200]}")
+    if stderr:
+        logger.warning("kube-linter stderr: %s", stderr)
+    return parse_report(stdout)
+
+
+def _config_args() -> list:
+    return ["--config", KUBE_LINTER_CONFIG] if KUBE_LINTER_CONFIG else []
+
+
+_linter_version = None
+
+
+def linter_version() -> str:
+    global _linter_version
+    if _linter_version is None:
+        try:
+            result = subprocess.run(linter_command() + ["version"], capture_output=True, timeout=10, check=False)
+            _linter_version = result.stdout.decode("utf-8", errors="replace").strip() or "unknown"
+        except Exception:
+            logger.warning("Could not determine kube-linter version")
+            _linter_version = "unknown"
+    return _linter_version
+
+
+def linter_fingerprint(extra_args=None) -> str:
+    """Everything besides the document that decides what kube-linter reports."""
+    digest = hashlib.sha256(linter_version().encode("utf-8"))
+    digest.update(json.dumps(list(extra_args or [])).encode("utf-8"))
+    if KUBE_LINTER_CONFIG:
+        try:
+            with open(KUBE_LINTER_CONFIG, "rb") as f:
+                digest.update(f.read())
+        except OSError:
+            logger.warning("kube-linter config %s is unreadable", KUBE_LINTER_CONFIG)
+    return digest.hexdigest()[:16]
+
+
+def document_identity(doc: dict) -> tuple:
+    meta = doc.get("metadata") if isinstance(doc.get("metadata"), dict) else {}
+    return (doc.get("kind", ""), meta.get("namespace") or "", meta.get("name", ""))
+
+
+def _batches(docs: list, indices: list) -> list:
+    """Group documents so no batch holds two objects kube-linter would report identically."""
+    batches = []
+    for i in indices:
+        identity = document_identity(docs[i])
+        for seen, batch in batches:
+            if identity not in seen:
+                seen.add(identity)
+                batch.append(i)
+                break
+        else:
+            batches.append(({identity}, [i]))
+    return [batch for _, batch in batches]
 
-        return issues
+
+def _lint_batch(docs: list, batch: list, extra_args=None) -> dict:
+    """Lint a batch in one kube-linter run and hand each issue back to its document."""
+    payload = dump_all([docs[i] for i in batch]).encode("utf-8")
+    owners = {document_identity(docs[i]): i for i in batch}
+    per_doc = {i: [] for i in batch}
+    for issue in lint_issues(payload, extra_args):
+        per_doc[owners.get(issue.identity, batch[0])].append(issue)
+    return per_doc
+
+
+def lint_documents(docs: list, extra_args=None) -> list:
+    """
+    Lint parsed documents and return one list of issues per document, in
+    order. kube-linter has checks across objects (dangling-service,
+    non-isolated-pod), so a document's issues depend on the rest of the
+    manifest: cached results are keyed on the whole document set, and when
+    any document misses, the whole set is linted again.
+    """
+    results = [[] for _ in docs]
+    lintable = [i for i, doc in enumerate(docs) if isinstance(doc, dict)]
+    keys = {}
+    misses = []
+    if lint_cache.enabled:
+        scope = f"{linter_fingerprint(extra_args)}:{lint_cache.set_key([docs[i] for i in lintable])}"
+        for i in lintable:
+            keys[i] = lint_cache.key(scope, docs[i])
+            cached = lint_cache.get(keys[i])
+            if cached is None:
+                misses.append(i)
+            else:
+                results[i] = [LintIssue(**issue) for issue in cached]
+    if misses or not lint_cache.enabled:
+        misses = lintable
+
+    for batch in _batches(docs, misses):
+        for i, issues in _lint_batch(docs, batch, extra_args).items():
+            results[i] = issues
+            if lint_cache.enabled:
+                lint_cache.set(keys[i], [asdict(issue) for issue in issues])
+
+    if lint_cache.enabled:
+        linted = sum(1 for doc in docs if isinstance(doc, dict))
+        stats = lint_cache.stats()
+        logger.info(
+            "Lint cache: %d/%d document(s) served from cache (overall hit ratio %.2f)",
+            linted - len(misses), linted, stats["hit_ratio"],
+        )
+        if misses:
+            lint_cache.save_if_due()
+    return results
+
+
+def run_kube_linter(yaml_bytes: bytes, docs=None):
+    try:
+        if docs is None:
+            try:
+                docs = load_all(yaml_bytes)
+            except yaml.YAMLError:
+                docs = None
+
+        if docs is None:
+            issues = lint_issues(yaml_bytes)
+        else:
+            issues = [issue for doc_issues in lint_documents(docs) for issue in doc_issues]
+
+        if not issues:
+            return [NO_ISSUES_MESSAGE]
+        return [str(issue) for issue in issues]
 
     except Exception as e:
         logger.exception("Error running kube-linter")
         return [f"Error running kube-linter: {str(e)}"]
-
-    finally:
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
@@ -2,8 +2,11 @@ import ollama
 import os
 import yaml
 import logging
-from pathlib import Path
 from src.rag_memory import RagMemory
+from src import metrics, patch_rules, prompt_compactor, rule_engine
+from src.prompt_registry import registry as prompt_registry
+from src.cache import LRUCache
+from src.request_context import dump_all, load_all
 from concurrent.futures import ThreadPoolExecutor, TimeoutError as LLMTimeout
 import re
 import requests
@@ -11,10 +14,14 @@ import requests
 
 logger = logging.getLogger(__name__)
 
+MEMORY_PATH = os.getenv("MEMORY_PATH", "memory-data/memory.pkl")
+
 memory = RagMemory()
-memory.load("memory-data/memory.pkl")
+memory.load(MEMORY_PATH)
 executor = ThreadPoolExecutor(max_workers=4)
 LLM_TIMEOUT_SECONDS = 45
+# Base URL of the HF Inference API; overridable to point at a local stand-in.
+HF_INFERENCE_URL = os.getenv("HF_INFERENCE_URL", "https://api-inference.huggingface.co/models").rstrip("/")
 
 
 def is_valid_response(text: str) -> bool:
@@ -29,6 +36,18 @@ def is_valid_response(text: str) -> bool:
 
     return True
 
+# Lines of the templates explain() answers with when the LLM fails or its answer is rejected.
+EXPLAIN_FALLBACK_MARKERS = (
+    "**Why it’s a problem**: See Kubernetes best practices\n",
+    "**Why it’s a problem**: Explanation service failed\n",
+)
+
+
+def is_valid_explanation(text: str) -> bool:
+    """An explain() result worth keeping: a validated answer, not a fallback template."""
+    return is_valid_response(text) and not any(marker in text for marker in EXPLAIN_FALLBACK_MARKERS)
+
+
 def preprocess_persona(persona: str) -> dict:
     """Extract tone and region hints from persona text"""
     persona = persona.lower()
@@ -43,7 +62,7 @@ def is_valid_yaml_response(text: str) -> bool:
     try:
         clean_text = re.sub(r"^```(yaml)?", "", text.strip(), flags=re.IGNORECASE).strip()
         clean_text = re.sub(r"```$", "", clean_text.strip(), flags=re.IGNORECASE).strip()
-        parsed = list(yaml.safe_load_all(clean_text))
+        parsed = load_all(clean_text)
         return bool(parsed)
     except Exception:
         return False
@@ -62,7 +81,7 @@ def _call_hf_inference(model_hint, messages, timeout=LLM_TIMEOUT_SECONDS):
         raise RuntimeError("HF provider selected but LLM_API_KEY is missing")
 
     # Build correct endpoint and show exactly what we're calling
-    url = f"https://api-inference.huggingface.co/models/{model_id}?wait_for_model=true"
+    url = f"{HF_INFERENCE_URL}/{model_id}?wait_for_model=true"
     logger.info(f"HF provider active, model={repr(model_id)} url={url}")
 
     headers = {
@@ -90,16 +109,24 @@ def _call_hf_inference(model_hint, messages, timeout=LLM_TIMEOUT_SECONDS):
 
 
 
+def active_model(model_hint):
+    """Model name the configured provider will actually run for model_hint."""
+    if os.getenv("LLM_PROVIDER", "ollama").strip().lower() == "hf":
+        return os.getenv("LLM_MODEL", model_hint or "mistralai/Mistral-7B-Instruct-v0.2").strip()
+    return model_hint
+
+
 def run_llm_with_timeout(model, messages):
     provider = os.getenv("LLM_PROVIDER", "ollama").strip().lower()
     try:
-        if provider == "hf":
-            # Use Hugging Face Inference API with the env you set in the Space
-            return _call_hf_inference(model, messages, timeout=30)
+        with metrics.timed("llm"):
+            if provider == "hf":
+                # Use Hugging Face Inference API with the env you set in the Space
+                return _call_hf_inference(model, messages, timeout=30)
 
-        # Default: existing Ollama behavior (local dev)
-        response = ollama.chat(model=model, messages=messages)
-        return response["message"]["content"]
+            # Default: existing Ollama behavior (local dev)
+            response = ollama.chat(model=model, messages=messages)
+            return response["message"]["content"]
 
     except LLMTimeout:
         # Keeping your original handler untouched
@@ -110,16 +137,24 @@ def run_llm_with_timeout(model, messages):
         return f"LLM error: {e}"
 
 
-def load_prompt_template():
-    with open("src/prompts/explain.txt", "r", encoding="utf-8") as f:
-        return f.read()
+# LLM explanations keyed on (prompt version, issue); editing a prompt invalidates them.
+explain_cache = LRUCache(maxsize=int(os.getenv("EXPLAIN_CACHE_SIZE", "512")), name="explain")
 
-PROMPT_TEMPLATE = load_prompt_template()
+
+# Checks explain() answers from canned text, without the LLM.
+CANNED_EXPLANATION_CHECKS = ("mismatching-selector", "no-anti-affinity")
+
+
+def explain_needs_llm(issue: str) -> bool:
+    """False when explain(issue) is answered from canned text or explain_cache (nothing to bill)."""
+    if any(check in issue.lower() for check in CANNED_EXPLANATION_CHECKS):
+        return False
+    return (prompt_registry.version, issue.strip()) not in explain_cache
 
 
 def explain(issue: str) -> str:
-    prompt = PROMPT_TEMPLATE.replace("{{issue}}", issue.strip())
     try:
+        prompt = prompt_registry.render("explain.txt", issue=issue.strip())
         #  Early handling for known kube-linter issues if LLM fails
         if "mismatching-selector" in issue.lower():
             return (
@@ -169,14 +204,22 @@ def explain(issue: str) -> str:
             }
         ]
 
+        cache_key = (prompt_registry.version, issue.strip())
+        cached = explain_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         content = run_llm_with_timeout("mistral", messages)
 
         if is_valid_response(content):
-            memory.add(f"Prompt: {prompt}\nResponse: {content}")
-            memory.save("memory-data/memory.pkl")
+            memory.add(f"Prompt: {prompt}\nResponse: {content}", source="explain")
+            memory.save(MEMORY_PATH)
+            explain_cache.set(cache_key, content)
             return content
         else:
             logger.warning("Invalid or empty LLM response. Falling back to markdown template.")
+            metrics.validation_failures.inc(validator="is_valid_response")
+            metrics.llm_fallbacks.inc(function="explain", reason="invalid")
             return (
                 f"**Issue**: {issue.strip()}\n"
                 "**Why it’s a problem**: See Kubernetes best practices\n"
@@ -185,6 +228,7 @@ def explain(issue: str) -> str:
 
     except Exception as e:
         logger.exception("LLM explain() failed")
+        metrics.llm_fallbacks.inc(function="explain", reason="error")
         return (
             f"**Issue**: {issue.strip()}\n"
             "**Why it’s a problem**: Explanation service failed\n"
@@ -195,74 +239,40 @@ def explain(issue: str) -> str:
 from yaml.parser import ParserError
 from yaml.scanner import ScannerError
 
-def generate_patch(yaml_text: str) -> str:
-    try:
-        docs = list(yaml.safe_load_all(yaml_text))
-    except (ParserError, ScannerError, yaml.YAMLError):
-        return "# Skipped: Invalid or unparseable YAML content."
-
-    patched_docs = []
-
-    for doc in docs:
-        kind = doc.get("kind", "")
-        if kind not in ["Deployment", "StatefulSet"]:
-            # Leave non-patchable resources untouched
-            patched_docs.append(doc)
-            continue
+PATCHABLE_KINDS = tuple(rule_engine.POD_SPEC_PATHS)
 
-        # Safely navigate to containers path
-        spec = doc.setdefault("spec", {})
-        template = spec.setdefault("template", {})
-        pod_spec = template.setdefault("spec", {})
 
-        containers = pod_spec.get("containers")
-
-        if not isinstance(containers, list):
-            # If malformed (e.g., string or dict), skip
-            logger.warning("Skipping patch for resource with malformed containers: %s", doc.get("metadata", {}).get("name", "Unnamed"))
-            patched_docs.append(doc)
-            continue
+def generate_patch(yaml_text: str, docs=None) -> str:
+    """
+    Patch every workload in yaml_text. Callers that already parsed
+    the upload pass docs to skip re-parsing; they are patched in place.
+    """
+    if docs is None:
+        try:
+            docs = load_all(yaml_text)
+        except (ParserError, ScannerError, yaml.YAMLError):
+            return "# Skipped: Invalid or unparseable YAML content."
 
-        if len(containers) == 0:
-           logger.warning("Skipping patch for resource with empty containers: %s", doc.get("metadata", {}).get("name", "Unnamed"))
-           patched_docs.append(doc)
-           continue
+    return dump_all([patch_document(doc) for doc in docs])
 
-        else:
-            for container in containers:
-                if "securityContext" not in container:
-                    container["securityContext"] = {
-                        "runAsNonRoot": True,
-                        "runAsUser": 1000,
-                        "readOnlyRootFilesystem": True
-                    }
-                if "resources" not in container:
-                    container["resources"] = {
-                        "limits": {
-                            "cpu": "250m",
-                            "memory": "512Mi"
-                        },
-                        "requests": {
-                            "cpu": "125m",
-                            "memory": "256Mi"
-                        }
-                    }
 
-        patched_docs.append(doc)
+def patch_document(doc):
+    """Apply the patch rules (src/patch_rules.py) to one workload document, in place."""
+    patch_rules.engine.patch(doc)
+    return doc
 
-    return yaml.dump_all(patched_docs, sort_keys=False)
 
 
 
-
-def suggest(yaml_str: str) -> str:
+def suggest(yaml_str: str, docs=None) -> str:
     try:
-        prompt_path = os.path.join(os.path.dirname(__file__), "prompts", "suggest.txt")
-        with open(prompt_path, "r") as f:
-            prompt_template = f.read()
+        template = prompt_registry.template("suggest.txt")
 
         # Build full prompt
-        prompt = f"{prompt_template}\n\nYAML:\n{yaml_str.strip()}"
+        yaml_for_prompt = prompt_compactor.compact_for_prompt(
+            yaml_str, "suggest", active_model("mistral"), template=template.text, docs=docs
+        )
+        prompt = template.render(yaml_text=yaml_for_prompt)
 
         messages = [
             {"role": "system", "content": "You are a helpful Kubernetes DevSecOps expert."},
@@ -277,19 +287,22 @@ def suggest(yaml_str: str) -> str:
             return "No improvements needed — this YAML is already valid and secure for its purpose."
 
         if is_valid_response(content):
-            memory.add(f"Prompt: {prompt}\nResponse: {content}")
-            memory.save("memory-data/memory.pkl")
+            memory.add(f"Prompt: {prompt}\nResponse: {content}", source="suggest")
+            memory.save(MEMORY_PATH)
             return content
         else:
             logger.warning("LLM suggestion response invalid. Using fallback.")
+            metrics.validation_failures.inc(validator="is_valid_response")
+            metrics.llm_fallbacks.inc(function="suggest", reason="invalid")
             return "Suggestion not available right now. Try again later or check YAML structure."
 
     except Exception as e:
         logger.exception("LLM suggest() failed")
+        metrics.llm_fallbacks.inc(function="suggest", reason="error")
         return "Suggestion service failed. Please try again later."
 
 def load_prompt(filename):
-    return Path(f"src/prompts/{filename}").read_text()
+    return prompt_registry.get(filename)
 
 
 from datetime import datetime
@@ -309,7 +322,7 @@ def is_valid_persona_response(response: str) -> bool:
     return any(kw in response for kw in keywords)
 
 
-def suggest_with_persona(yaml_text, persona="junior"):
+def suggest_with_persona(yaml_text, persona="junior", docs=None):
     try:
         yaml_text = yaml_text.strip()
 
@@ -318,15 +331,9 @@ def suggest_with_persona(yaml_text, persona="junior"):
             logger.warning(f"Invalid persona: {persona}")
             return "Invalid persona. Choose from: junior, senior, sre."
 
-        # Validate YAML before sending to LLM
-        try:
-            yaml.safe_load_all(yaml_text)
-        except yaml.YAMLError:
-            return "Invalid YAML structure detected. Please fix formatting or indentation first."
-
-        # Load the appropriate persona prompt
+        # Validate YAML before sending to LLM (callers that already parsed pass docs)
         try:
-           parsed_docs = list(yaml.safe_load_all(yaml_text))
+           parsed_docs = docs if docs is not None else load_all(yaml_text)
            has_podspec = any(
                doc.get("kind") in ["Deployment", "StatefulSet", "DaemonSet", "Job"]
                for doc in parsed_docs if isinstance(doc, dict)
@@ -338,13 +345,16 @@ def suggest_with_persona(yaml_text, persona="junior"):
 # Use lighter prompt for non-podspec YAML
         if not has_podspec:
            logger.info("Using simple persona prompt for non-PodSpec YAML.")
-           persona_prompt = load_prompt(f"persona_{persona}_simple.txt")
+           persona_template = prompt_registry.template(f"persona_{persona}_simple.txt")
         else:
-           persona_prompt = load_prompt(f"persona_{persona}.txt")
+           persona_template = prompt_registry.template(f"persona_{persona}.txt")
 
 
         # Construct the LLM prompt
-        prompt = f"{persona_prompt}\n\nHere is the YAML file:\n```yaml\n{yaml_text}\n```"
+        yaml_for_prompt = prompt_compactor.compact_for_prompt(
+            yaml_text, "suggest_persona", active_model("mistral"), template=persona_template.text, docs=parsed_docs
+        )
+        prompt = persona_template.render(yaml_text=yaml_for_prompt)
         messages = [
             {"role": "system", "content": "You are a helpful Kubernetes DevSecOps expert."},
             {"role": "user", "content": prompt.strip()}
@@ -354,15 +364,18 @@ def suggest_with_persona(yaml_text, persona="junior"):
 
         if is_valid_persona_response(content):
 
-            memory.add(f"[{datetime.now()}] Prompt: {prompt}\nResponse: {content}")
-            memory.save("memory-data/memory.pkl")
+            memory.add(f"[{datetime.now()}] Prompt: {prompt}\nResponse: {content}", source="persona")
+            memory.save(MEMORY_PATH)
             return content
         else:
             logger.warning("LLM persona suggestion invalid. Fallback used.")
+            metrics.validation_failures.inc(validator="is_valid_persona_response")
+            metrics.llm_fallbacks.inc(function="suggest_with_persona", reason="invalid")
             return "No persona-based suggestion available. Try later."
 
     except Exception as e:
         logger.exception("LLM suggest_with_persona() failed")
+        metrics.llm_fallbacks.inc(function="suggest_with_persona", reason="error")
         return "Error occurred in persona suggestion. Retry later."
 
 def is_valid_recommendation_response(text: str) -> bool:
@@ -443,12 +456,15 @@ You MUST:
         response = run_llm_with_timeout("mistral", messages)
 
         if is_valid_recommendation_response(response):
-            memory.add(f"Persona: {persona}\nResponse: {response}")
-            memory.save("memory-data/memory.pkl")
+            memory.add(f"Persona: {persona}\nResponse: {response}", source="recommend")
+            memory.save(MEMORY_PATH)
             return response
 
+        metrics.validation_failures.inc(validator="is_valid_recommendation_response")
+        metrics.llm_fallbacks.inc(function="explain_with_qloo", reason="invalid")
         return "Could not generate a recommendation at this time."
 
     except Exception as e:
         logger.exception("Error in explain_with_qloo")
+        metrics.llm_fallbacks.inc(function="explain_with_qloo", reason="error")
         return "Internal error while generating recommendation."
@@ -0,0 +1,82 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+
+logger = logging.getLogger("genkube")
+
+MANIFEST_DB_PATH = os.getenv("MANIFEST_DB_PATH", "memory-data/manifests.db")
+
+# Snapshots not refreshed for this many seconds are deleted.
+MANIFEST_TTL_SECONDS = int(os.getenv("MANIFEST_TTL_SECONDS", str(30 * 24 * 3600)))
+
+# Longest accepted manifest id (query parameter or X-Manifest-Id header).
+MANIFEST_ID_MAX_LENGTH = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    manifest_id TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    context TEXT NOT NULL,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (manifest_id, endpoint)
+);
+"""
+
+
+class ManifestStore:
+    """
+    Last results per (manifest id, endpoint) so a re-submitted manifest only
+    redoes the documents that changed. `context` captures everything besides
+    the documents that shapes a result (engine, linter, prompt version);
+    a snapshot taken under a different context is ignored.
+    """
+
+    def __init__(self, path=MANIFEST_DB_PATH, ttl=MANIFEST_TTL_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def load(self, manifest_id: str, endpoint: str, context: str) -> dict:
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT context, data, updated_at FROM snapshots WHERE manifest_id = ? AND endpoint = ?",
+                    (manifest_id, endpoint),
+                ).fetchone()
+        except sqlite3.Error:
+            logger.exception("Could not read manifest snapshot %s", manifest_id)
+            return {}
+        if row is None or row[0] != context or row[2] < time.time() - self.ttl:
+            return {}
+        return json.loads(row[1])
+
+    def save(self, manifest_id: str, endpoint: str, context: str, data: dict):
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO snapshots (manifest_id, endpoint, context, data, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (manifest_id, endpoint, context, json.dumps(data), now),
+                )
+                conn.execute("DELETE FROM snapshots WHERE updated_at < ?", (now - self.ttl,))
+        except sqlite3.Error:
+            logger.exception("Could not store manifest snapshot %s", manifest_id)
+
+
+def normalize_manifest_id(value) -> str:
+    """Trimmed manifest id, or "" when none (or an unusable one) was given."""
+    value = (value or "").strip()
+    if len(value) > MANIFEST_ID_MAX_LENGTH:
+        logger.warning("Ignoring manifest id longer than %d characters", MANIFEST_ID_MAX_LENGTH)
+        return ""
+    return value
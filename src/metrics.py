@@ -0,0 +1,138 @@
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("genkube")
+
+# Latency buckets (seconds) wide enough for both YAML parsing and CPU LLM calls.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{str(v)}"' for k, v in sorted(labels.items()))
+    return "{" + inner + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_labels(dict(key))} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                # [per-bucket counts, sum, count]
+                series = self.series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self.series.items()):
+                labels = dict(key)
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_labels({**labels, 'le': bound})} {bucket_count}")
+                lines.append(f"{self.name}_bucket{_labels({**labels, 'le': '+Inf'})} {count}")
+                lines.append(f"{self.name}_sum{_labels(labels)} {total}")
+                lines.append(f"{self.name}_count{_labels(labels)} {count}")
+        return lines
+
+
+stage_seconds = Histogram("genkube_stage_seconds", "Time spent per pipeline stage.")
+request_seconds = Histogram("genkube_request_seconds", "HTTP request latency by endpoint.")
+llm_fallbacks = Counter("genkube_llm_fallbacks_total", "Responses served from a fallback instead of the LLM.")
+validation_failures = Counter("genkube_validation_failures_total", "LLM responses rejected by a validator.")
+rate_limited = Counter("genkube_rate_limited_total", "Requests rejected with 429, by limiter.")
+llm_budget_units = Counter("genkube_llm_budget_units_total", "LLM work units charged to client budgets.")
+
+_collectors = []
+_caches = []
+
+# Per-request {stage: seconds} totals, set by request capture (src/request_capture.py).
+stage_recorder = contextvars.ContextVar("stage_recorder", default=None)
+
+
+def register_collector(fn):
+    """fn() -> list of Prometheus text lines, called at scrape time (e.g. cache stats)."""
+    _collectors.append(fn)
+
+
+@contextmanager
+def timed(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(elapsed, stage=stage)
+        recorder = stage_recorder.get()
+        if recorder is not None:
+            recorder[stage] = recorder.get(stage, 0.0) + elapsed
+
+
+def register_cache(*caches):
+    """Expose LRUCache hit/miss counters as genkube_cache_* metrics."""
+    _caches.extend(caches)
+
+
+def _cache_lines() -> list:
+    caches = list(_caches)
+    if not caches:
+        return []
+    lines = ["# HELP genkube_cache_hits_total Cache hits.", "# TYPE genkube_cache_hits_total counter"]
+    lines += [f'genkube_cache_hits_total{{cache="{c.name}"}} {c.hits}' for c in caches]
+    lines += ["# HELP genkube_cache_misses_total Cache misses.", "# TYPE genkube_cache_misses_total counter"]
+    lines += [f'genkube_cache_misses_total{{cache="{c.name}"}} {c.misses}' for c in caches]
+    lines += ["# HELP genkube_cache_entries Entries currently cached.", "# TYPE genkube_cache_entries gauge"]
+    lines += [f'genkube_cache_entries{{cache="{c.name}"}} {len(c)}' for c in caches]
+    lines += ["# HELP genkube_cache_hit_ratio Hits over lookups since start.", "# TYPE genkube_cache_hit_ratio gauge"]
+    lines += [f'genkube_cache_hit_ratio{{cache="{c.name}"}} {c.hit_ratio():.4f}' for c in caches]
+    return lines
+
+
+def render() -> str:
+    lines = []
+    for metric in (stage_seconds, request_seconds, llm_fallbacks, validation_failures, rate_limited, llm_budget_units):
+        lines += metric.render()
+    lines += _cache_lines()
+    for collect in _collectors:
+        try:
+            lines += collect()
+        except Exception:
+            logger.exception("Metrics collector failed")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,122 @@
+import copy
+import logging
+import os
+from dataclasses import dataclass
+
+import yaml
+
+from src import rule_engine
+
+logger = logging.getLogger("genkube")
+
+# Optional YAML file with default and per-namespace overrides of the rules below:
+#
+#   defaults:
+#     resources: {limits: {cpu: 500m, memory: 1Gi}, requests: {cpu: 250m, memory: 512Mi}}
+#   namespaces:
+#     batch:
+#       resources: {limits: {cpu: "2", memory: 4Gi}, requests: {cpu: "1", memory: 2Gi}}
+#     legacy:
+#       security-context: false      # rule disabled in this namespace
+PATCH_RULES_PATH = os.getenv("PATCH_RULES_PATH", "")
+
+# Container lists in a pod spec that rules are applied to.
+CONTAINER_LISTS = ("initContainers", "containers")
+
+
+@dataclass(frozen=True)
+class PatchRule:
+    """Set `field` on every container that does not have it yet."""
+
+    name: str
+    field: str
+    value: object
+
+
+DEFAULT_RULES = (
+    PatchRule(
+        name="security-context",
+        field="securityContext",
+        value={"runAsNonRoot": True, "runAsUser": 1000, "readOnlyRootFilesystem": True},
+    ),
+    PatchRule(
+        name="resources",
+        field="resources",
+        value={
+            "limits": {"cpu": "250m", "memory": "512Mi"},
+            "requests": {"cpu": "125m", "memory": "256Mi"},
+        },
+    ),
+)
+
+
+def _apply_overrides(rules: tuple, overrides: dict) -> tuple:
+    """Rules with values replaced (or dropped, for false) by an overrides map keyed on rule name."""
+    resolved = []
+    for rule in rules:
+        if rule.name not in overrides:
+            resolved.append(rule)
+        elif overrides[rule.name] is not False:
+            resolved.append(PatchRule(rule.name, rule.field, overrides[rule.name]))
+    return tuple(resolved)
+
+
+class PatchEngine:
+    """
+    Declarative container patch rules, resolved once per namespace and
+    applied in a single traversal: each pod spec path is visited once and
+    every rule runs on every container (init containers included).
+    """
+
+    def __init__(self, rules: tuple = DEFAULT_RULES, defaults: dict = None, namespaces: dict = None):
+        unknown = {name for section in [defaults or {}, *(namespaces or {}).values()] for name in section}
+        unknown -= {rule.name for rule in rules}
+        if unknown:
+            raise ValueError(f"Unknown patch rule(s): {', '.join(sorted(unknown))}")
+        self.rules = _apply_overrides(tuple(rules), defaults or {})
+        self.by_namespace = {ns: _apply_overrides(self.rules, o or {}) for ns, o in (namespaces or {}).items()}
+
+    @classmethod
+    def from_file(cls, path: str) -> "PatchEngine":
+        with open(path, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+        return cls(defaults=config.get("defaults"), namespaces=config.get("namespaces"))
+
+    def rules_for(self, namespace: str) -> tuple:
+        return self.by_namespace.get(namespace, self.rules)
+
+    def patch(self, doc) -> bool:
+        """Apply the rules to doc in place. Returns True if anything changed."""
+        spec = rule_engine.pod_spec(doc)
+        if spec is None:
+            return False
+        meta = doc.get("metadata") if isinstance(doc.get("metadata"), dict) else {}
+        rules = self.rules_for(meta.get("namespace", ""))
+        changed = False
+        for key in CONTAINER_LISTS:
+            containers = spec.get(key)
+            if not isinstance(containers, list):
+                continue
+            for container in containers:
+                if not isinstance(container, dict):
+                    continue
+                for rule in rules:
+                    if rule.field not in container:
+                        container[rule.field] = copy.deepcopy(rule.value)
+                        changed = True
+        return changed
+
+
+def load_engine(path: str = PATCH_RULES_PATH) -> PatchEngine:
+    if not path:
+        return PatchEngine()
+    try:
+        engine = PatchEngine.from_file(path)
+        logger.info("Loaded patch rules from %s (%d namespace override(s))", path, len(engine.by_namespace))
+        return engine
+    except Exception:
+        logger.exception("Failed to load patch rules from %s; using defaults", path)
+        return PatchEngine()
+
+
+engine = load_engine()
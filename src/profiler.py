@@ -0,0 +1,149 @@
+import cProfile
+import contextvars
+import hmac
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+logger = logging.getLogger("genkube")
+
+# Admin surface (sampling profiles, per-request cProfile) is off unless a token is set.
+ADMIN_TOKEN = os.getenv("GENKUBE_ADMIN_TOKEN", "").strip()
+
+# Upper bound on one sampling run, so a typo cannot pin a sampler for hours.
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+
+# Functions listed in the log for a profiled request.
+PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", "25"))
+
+# Leaf frames in these stdlib modules mean the thread is parked, not working.
+IDLE_MODULES = ("threading.py", "queue.py", "selectors.py")
+
+_sampling = threading.Lock()
+_request_profiling = threading.Lock()
+_request_profile = contextvars.ContextVar("request_profile", default=None)
+
+
+def enabled() -> bool:
+    return bool(ADMIN_TOKEN)
+
+
+def authorized(token: str) -> bool:
+    return enabled() and hmac.compare_digest((token or "").encode(), ADMIN_TOKEN.encode())
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample(seconds: float, interval: float = 0.01, include_idle: bool = False) -> Counter:
+    """
+    Sample every thread's stack with sys._current_frames() for `seconds`.
+    Returns a Counter of collapsed stacks ("thread;outer;...;leaf") to hit counts.
+    """
+    seconds = min(max(seconds, 0.0), PROFILE_MAX_SECONDS)
+    me = threading.get_ident()
+    counts = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me:
+                continue
+            if not include_idle and os.path.basename(frame.f_code.co_filename) in IDLE_MODULES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, f"thread-{thread_id}"))
+            counts[";".join(reversed(stack)).replace("\n", " ")] += 1
+        time.sleep(interval)
+    return counts
+
+
+def collapsed(counts: Counter) -> str:
+    """Brendan Gregg's collapsed format, as consumed by flamegraph.pl and speedscope."""
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+def sample_collapsed(seconds: float, interval: float = 0.01, include_idle: bool = False):
+    """Run one sampling profile; returns None if another one is already running."""
+    if not _sampling.acquire(blocking=False):
+        return None
+    try:
+        logger.info("Sampling profile started for %.1fs", seconds)
+        return collapsed(sample(seconds, interval, include_idle))
+    finally:
+        _sampling.release()
+
+
+class RequestProfile:
+    """cProfile data for one request, gathered from the executor threads that ran its work."""
+
+    def __init__(self):
+        self.profiles = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self):
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                self.profiles.append(profile)
+
+    def top(self, limit: int = PROFILE_TOP_FUNCTIONS) -> str:
+        out = io.StringIO()
+        with self._lock:
+            if not self.profiles:
+                return ""
+            stats = pstats.Stats(self.profiles[0], stream=out)
+            for profile in self.profiles[1:]:
+                stats.add(profile)
+        stats.sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+
+@contextmanager
+def profile_request():
+    """
+    Bind a profile to the wrapped request so in_thread() records the work it
+    hands to executor threads. The event loop thread is not profiled: it
+    interleaves every in-flight request, so its stats would not be this
+    request's. Yields None (and profiles nothing) while another request is
+    being profiled.
+    """
+    if not _request_profiling.acquire(blocking=False):
+        logger.warning("Another request is being profiled; skipping")
+        yield None
+        return
+    profile = RequestProfile()
+    token = _request_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _request_profile.reset(token)
+        _request_profiling.release()
+
+
+def in_thread(fn):
+    """Wrap fn for run_in_executor so it is profiled when the calling request opted in."""
+    profile = _request_profile.get()
+    if profile is None:
+        return fn
+
+    def run(*args, **kwargs):
+        with profile.measure():
+            return fn(*args, **kwargs)
+    return run
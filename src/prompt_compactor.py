@@ -0,0 +1,171 @@
+import copy
+import logging
+import os
+import re
+
+import yaml
+
+from src.request_context import dump, load_all
+
+logger = logging.getLogger("genkube")
+
+# Rough chars-per-token ratio for Mistral/Llama style tokenizers on YAML.
+# Good enough for budgeting; we never need an exact count.
+CHARS_PER_TOKEN = 4
+
+# Context budget per model, in tokens. Unknown models use DEFAULT_TOKEN_BUDGET.
+MODEL_TOKEN_BUDGETS = {
+    "mistral": 6000,
+    "mistralai/Mistral-7B-Instruct-v0.2": 6000,
+}
+DEFAULT_TOKEN_BUDGET = 4000
+
+# Tokens kept free for the model's answer.
+RESPONSE_RESERVE_TOKENS = 1024
+
+# Values longer than this under data/stringData/binaryData/annotations are elided.
+DEFAULT_VALUE_MAX_CHARS = 200
+
+# Kinds whose data/stringData/binaryData payloads get elided.
+PAYLOAD_KINDS = {"ConfigMap", "Secret"}
+ELIDED_DATA_KEYS = {"data", "stringData", "binaryData"}
+
+# Endpoints that compact their YAML before prompting unless PROMPT_COMPACTION
+# says otherwise.
+DEFAULT_COMPACTION_ENDPOINTS = "suggest,suggest_persona"
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        logger.warning("Ignoring invalid %s=%r; using %d", name, raw, default)
+        return default
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def token_budget_for(model: str) -> int:
+    return _env_int("PROMPT_TOKEN_BUDGET", MODEL_TOKEN_BUDGETS.get(model, DEFAULT_TOKEN_BUDGET))
+
+
+def value_max_chars() -> int:
+    return _env_int("COMPACT_VALUE_MAX_CHARS", DEFAULT_VALUE_MAX_CHARS)
+
+
+def compaction_endpoints() -> set:
+    """Comma-separated PROMPT_COMPACTION; "none" disables compaction everywhere."""
+    raw = os.getenv("PROMPT_COMPACTION", DEFAULT_COMPACTION_ENDPOINTS)
+    return {
+        name.strip()
+        for name in raw.split(",")
+        if name.strip() and name.strip().lower() != "none"
+    }
+
+
+def is_enabled(endpoint: str) -> bool:
+    return endpoint in compaction_endpoints()
+
+
+def _elide_map(values: dict, max_chars: int) -> dict:
+    return {
+        k: f"<elided {len(v)} chars>" if isinstance(v, str) and len(v) > max_chars else v
+        for k, v in values.items()
+    }
+
+
+def _elide_values(node, max_chars: int):
+    """
+    Walk a parsed document and shorten bulky payload values in place.
+    Resources are recognised by kind, so ConfigMaps inside a List are elided too.
+    """
+    if isinstance(node, dict):
+        is_payload = node.get("kind") in PAYLOAD_KINDS
+        for key, value in node.items():
+            if is_payload and key in ELIDED_DATA_KEYS and isinstance(value, dict):
+                node[key] = _elide_map(value, max_chars)
+            elif key == "metadata" and isinstance(value, dict) and isinstance(value.get("annotations"), dict):
+                value["annotations"] = _elide_map(value["annotations"], max_chars)
+                _elide_values(value, max_chars)
+            else:
+                _elide_values(value, max_chars)
+    elif isinstance(node, list):
+        for item in node:
+            _elide_values(item, max_chars)
+
+
+def _strip_comments(yaml_text: str) -> str:
+    """Fallback for text we could not parse: drop comment lines and blank runs."""
+    lines = [line.rstrip() for line in yaml_text.splitlines()]
+    lines = [line for line in lines if line and not line.lstrip().startswith("#")]
+    return "\n".join(lines)
+
+
+def _dump_docs(docs) -> list:
+    dumped = []
+    max_chars = value_max_chars()
+    for doc in docs:
+        if doc is None:
+            continue
+        _elide_values(doc, max_chars)
+        dumped.append(dump(doc, default_flow_style=False, width=120).strip())
+    return dumped
+
+
+def _fit_budget(chunks: list, budget_tokens: int) -> str:
+    """Keep whole documents while they fit, then note what was dropped."""
+    kept = []
+    used = 0
+    for chunk in chunks:
+        cost = estimate_tokens(chunk) + 1
+        if used + cost > budget_tokens:
+            if not kept:
+                # A single document larger than the budget: cut it hard.
+                max_chars = max(budget_tokens * CHARS_PER_TOKEN - 80, 0)
+                kept.append(chunk[:max_chars] + "\n# ... truncated to fit the token budget")
+            omitted = len(chunks) - len(kept)
+            if omitted > 0:
+                kept.append(f"# ... {omitted} more document(s) omitted to fit the token budget")
+            break
+        kept.append(chunk)
+        used += cost
+    return "\n---\n".join(kept)
+
+
+def compact_yaml(yaml_text: str, budget_tokens: int, docs=None) -> str:
+    """
+    Shrink YAML for prompting: strips comments, elides large data/annotation
+    values, normalizes whitespace and keeps the result under budget_tokens.
+    """
+    try:
+        if docs is None:
+            docs = load_all(yaml_text)
+        chunks = _dump_docs(copy.deepcopy(docs))
+    except yaml.YAMLError:
+        chunks = [c for c in (_strip_comments(part) for part in re.split(r"^---\s*$", yaml_text, flags=re.M)) if c]
+
+    return _fit_budget(chunks, budget_tokens)
+
+
+def compact_for_prompt(yaml_text: str, endpoint: str, model: str, template: str = "", docs=None) -> str:
+    """
+    Compact yaml_text for the given endpoint if enabled, budgeting around the
+    prompt template and the tokens reserved for the answer.
+    """
+    if not is_enabled(endpoint):
+        return yaml_text.strip()
+
+    budget = token_budget_for(model) - estimate_tokens(template) - RESPONSE_RESERVE_TOKENS
+    budget = max(budget, 256)
+    before = estimate_tokens(yaml_text)
+    compacted = compact_yaml(yaml_text, budget, docs=docs)
+    after = estimate_tokens(compacted)
+    logger.info("Prompt compaction [%s/%s]: ~%d -> ~%d tokens (budget %d)", endpoint, model, before, after, budget)
+    return compacted
@@ -0,0 +1,111 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger("genkube")
+
+PROMPTS_DIR = Path(__file__).resolve().parent / "prompts"
+
+# How often (seconds) to stat the prompts directory for edits. 0 disables hot reload.
+PROMPT_RELOAD_INTERVAL = float(os.getenv("PROMPT_RELOAD_INTERVAL", "2"))
+
+# Matches both {{slot}} and {slot} placeholders used by the templates.
+SLOT_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}|\{(\w+)\}")
+
+
+class PromptTemplate:
+    """A prompt file split once into literal text and substitution slots."""
+
+    def __init__(self, name: str, text: str):
+        self.name = name
+        self.text = text
+        self.parts = []
+        last = 0
+        for match in SLOT_PATTERN.finditer(text):
+            self.parts.append(text[last:match.start()])
+            self.parts.append((match.group(1) or match.group(2), match.group(0)))
+            last = match.end()
+        self.parts.append(text[last:])
+        self.slots = {p[0] for p in self.parts if isinstance(p, tuple)}
+
+    def render(self, **values) -> str:
+        out = []
+        for part in self.parts:
+            if isinstance(part, tuple):
+                slot, raw = part
+                out.append(str(values[slot]) if slot in values else raw)
+            else:
+                out.append(part)
+        return "".join(out)
+
+
+class PromptRegistry:
+    """
+    Loads every template under src/prompts/ once and keeps them in memory.
+    Edits on disk are picked up without a restart, checked at most every
+    PROMPT_RELOAD_INTERVAL seconds.
+    """
+
+    def __init__(self, prompts_dir=PROMPTS_DIR, reload_interval=PROMPT_RELOAD_INTERVAL):
+        self.prompts_dir = Path(prompts_dir)
+        self.reload_interval = reload_interval
+        self.templates = {}
+        self.version = ""
+        self._mtimes = {}
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def _scan(self) -> dict:
+        return {p.name: p.stat().st_mtime_ns for p in sorted(self.prompts_dir.glob("*.txt"))}
+
+    def reload(self):
+        with self._lock:
+            mtimes = self._scan()
+            templates = {}
+            digest = hashlib.sha256()
+            for name in mtimes:
+                text = (self.prompts_dir / name).read_text(encoding="utf-8")
+                templates[name] = PromptTemplate(name, text)
+                digest.update(name.encode("utf-8") + b"\0" + text.encode("utf-8") + b"\0")
+            self.templates = templates
+            self._mtimes = mtimes
+            self.version = digest.hexdigest()[:16]
+            self._last_check = time.monotonic()
+        logger.info("Loaded %d prompt templates (version %s)", len(templates), self.version)
+
+    def _maybe_reload(self):
+        if self.reload_interval <= 0:
+            return
+        now = time.monotonic()
+        if now - self._last_check < self.reload_interval:
+            return
+        self._last_check = now
+        try:
+            if self._scan() != self._mtimes:
+                logger.info("Prompt templates changed on disk. Reloading.")
+                self.reload()
+        except (OSError, UnicodeDecodeError):
+            # reload() only swaps in a complete set, so the last good templates stay live.
+            logger.exception("Failed to reload prompt templates; keeping version %s", self.version)
+
+    def template(self, name: str) -> PromptTemplate:
+        self._maybe_reload()
+        return self.templates[name]
+
+    def get(self, name: str) -> str:
+        return self.template(name).text
+
+    def render(self, name: str, /, **values) -> str:
+        return self.template(name).render(**values)
+
+    def current_version(self) -> str:
+        self._maybe_reload()
+        return self.version
+
+
+registry = PromptRegistry()
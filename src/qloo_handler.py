@@ -1,5 +1,11 @@
+import asyncio
 import logging
 import os
+import time
+
+import httpx
+
+from src.cache import LRUCache
 
 logger = logging.getLogger("genkube")
 
@@ -7,8 +13,150 @@ QLOO_API_KEY = os.getenv("QLOO_API_KEY")
 QLOO_BASE_URL = os.getenv("QLOO_BASE_URL", "https://hackathon.api.qloo.com")
 QLOO_API_URL = f"{QLOO_BASE_URL}/v1/recommendations"
 
+# Hard limit on one Qloo call; past it the mock profile is served instead.
+QLOO_TIMEOUT_SECONDS = float(os.getenv("QLOO_TIMEOUT_SECONDS", "2.0"))
+
+# Profiles are fresh for QLOO_CACHE_TTL seconds, then served stale for up to
+# QLOO_STALE_TTL more while one background request refreshes them.
+QLOO_CACHE_TTL = float(os.getenv("QLOO_CACHE_TTL", "3600"))
+QLOO_STALE_TTL = float(os.getenv("QLOO_STALE_TTL", "86400"))
+QLOO_CACHE_SIZE = int(os.getenv("QLOO_CACHE_SIZE", "1024"))
+
+# Pooled connections kept open to the Qloo API.
+QLOO_MAX_CONNECTIONS = int(os.getenv("QLOO_MAX_CONNECTIONS", "20"))
+
+
+def normalize_topic(topic: str) -> str:
+    return " ".join(str(topic or "").lower().split())
+
+
+def _normalize_response(topic: str, body) -> dict:
+    """Qloo payload -> the profile shape the prompt builder expects."""
+    items = body
+    if isinstance(body, dict):
+        items = body.get("recommendations") or body.get("results") or []
+        if isinstance(items, dict):
+            items = items.get("entities") or []
+    recommendations = []
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        recommendations.append({
+            "name": item.get("name", ""),
+            "type": item.get("type") or item.get("subtype", ""),
+            "location": item.get("location", ""),
+            "affinity": item.get("affinity", item.get("popularity")),
+            "affinity_reason": item.get("affinity_reason", ""),
+        })
+    return {"mock": False, "topic": topic, "recommendations": recommendations}
+
+
+class QlooClient:
+    """
+    Async Qloo client: one pooled httpx session per event loop, a TTL cache
+    keyed on the normalized topic with stale-while-revalidate, coalescing of
+    concurrent requests for the same key, and a hard timeout that falls back
+    to the mock profile.
+    """
+
+    def __init__(self, api_key=QLOO_API_KEY, url=QLOO_API_URL, timeout=QLOO_TIMEOUT_SECONDS,
+                 ttl=QLOO_CACHE_TTL, stale_ttl=QLOO_STALE_TTL, maxsize=QLOO_CACHE_SIZE):
+        self.api_key = api_key
+        self.url = url
+        self.timeout = timeout
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        # Entries are (profile, fetched_at); freshness is judged here so stale ones stay usable.
+        self.cache = LRUCache(maxsize=maxsize, name="qloo")
+        self.requests = 0
+        self._inflight = {}
+        # One pooled session per event loop: an httpx client is bound to the loop it was opened on.
+        self._sessions = {}
+
+    def _http(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None:
+            # Sessions of loops that have since closed cannot be awaited any more; drop them.
+            for old in [old for old in self._sessions if old.is_closed()]:
+                del self._sessions[old]
+            session = self._sessions[loop] = httpx.AsyncClient(
+                headers={"X-Api-Key": self.api_key or "", "Accept": "application/json"},
+                limits=httpx.Limits(max_connections=QLOO_MAX_CONNECTIONS),
+            )
+        return session
+
+    async def close(self):
+        """Close every session: on this loop directly, on other live loops through that loop."""
+        current = asyncio.get_running_loop()
+        sessions, self._sessions = self._sessions, {}
+        for loop, session in sessions.items():
+            if loop is current:
+                await session.aclose()
+            elif loop.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.aclose(), loop))
+
+    async def profile(self, topic: str, entity_type: str = "person", mode: str = "default") -> dict:
+        key = (normalize_topic(topic), entity_type, mode)
+        entry = self.cache.get(key)
+        if entry is not None:
+            data, fetched_at = entry
+            age = time.monotonic() - fetched_at
+            if age < self.ttl:
+                return data
+            if age < self.ttl + self.stale_ttl:
+                self._fetch(key)  # refresh in the background, coalesced with any other caller
+                return data
+        return await asyncio.shield(self._fetch(key))
+
+    def _fetch(self, key) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._request(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def _request(self, key) -> dict:
+        topic, entity_type, mode = key
+        self.requests += 1
+        try:
+            response = await asyncio.wait_for(
+                self._http().get(self.url, params={"q": topic, "type": entity_type, "mode": mode}),
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            data = _normalize_response(topic, response.json())
+        except asyncio.TimeoutError:
+            logger.warning("Qloo request for %r timed out after %.1fs; using mock data", topic, self.timeout)
+            return self._fallback(key)
+        except Exception as e:
+            logger.warning("Qloo request for %r failed (%s); using mock data", topic, e)
+            return self._fallback(key)
+        self.cache.set(key, (data, time.monotonic()))
+        return data
+
+    def _fallback(self, key) -> dict:
+        # A stale profile beats canned data; the mock is the last resort.
+        entry = self.cache.get(key)
+        if entry is not None:
+            return entry[0]
+        topic, entity_type, mode = key
+        return get_qloo_profile(topic, entity_type, mode)
+
+
+client = QlooClient()
+
+
+async def fetch_qloo_profile(topic: str, entity_type: str = "person", mode: str = "default") -> dict:
+    """Live Qloo profile when QLOO_API_KEY is set, otherwise the mock one."""
+    if not client.api_key or not topic or not isinstance(topic, str) or not topic.strip():
+        return get_qloo_profile(topic, entity_type, mode)
+    return await client.profile(topic, entity_type, mode)
+
 
 def get_qloo_profile(topic: str, entity_type: str = "person", mode: str = "default"):
+    """Canned profile used offline and whenever the Qloo API cannot answer in time."""
     if not topic or not isinstance(topic, str) or not topic.strip():
         logger.warning("Invalid topic passed to Qloo profile: %s", topic)
         return {"mock": True, "topic": topic, "recommendations": []}
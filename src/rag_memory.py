@@ -1,54 +1,255 @@
-from sentence_transformers import SentenceTransformer
 import faiss
 import numpy as np
 import pickle
 import os
+import tempfile
 import logging
+import threading
+import time
+from dataclasses import dataclass, field
+
+from src import embeddings, metrics
 
 logger = logging.getLogger("genkube")
 
-MAX_MEMORY = 200
+# Retention, enforced by compact() (run in the background by the API). 0 disables a limit.
+MAX_MEMORY = int(os.getenv("MEMORY_MAX_ENTRIES", "200"))
+MEMORY_MAX_BYTES = int(os.getenv("MEMORY_MAX_BYTES", str(4 * 1024 * 1024)))
+MEMORY_MAX_AGE_SECONDS = int(os.getenv("MEMORY_MAX_AGE_SECONDS", str(30 * 24 * 3600)))
+
+# Per-source entry quotas, e.g. "explain=100,suggest=40,persona=40,recommend=40".
+MEMORY_SOURCE_QUOTAS = os.getenv("MEMORY_SOURCE_QUOTAS", "explain=100,suggest=40,persona=40,recommend=40")
+
+SOURCES = ("explain", "suggest", "persona", "recommend", "other")
+
+
+def parse_quotas(value: str) -> dict:
+    quotas = {}
+    for item in (value or "").split(","):
+        if not item.strip():
+            continue
+        source, _, limit = item.partition("=")
+        source = source.strip()
+        if source not in SOURCES or not limit.strip().isdigit():
+            raise ValueError(f"Invalid memory quota {item.strip()!r}; expected <source>=<entries> with source in {', '.join(SOURCES)}")
+        quotas[source] = int(limit)
+    return quotas
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    max_entries: int = MAX_MEMORY
+    max_bytes: int = MEMORY_MAX_BYTES
+    max_age_seconds: int = MEMORY_MAX_AGE_SECONDS
+    source_quotas: dict = field(default_factory=lambda: parse_quotas(MEMORY_SOURCE_QUOTAS))
+
+    def evictions(self, meta: list, now: float) -> dict:
+        """Indices of `meta` (oldest first) to drop, mapped to the reason."""
+        evicted = {}
+        if self.max_age_seconds:
+            for i, (_, added_at, _) in enumerate(meta):
+                if added_at < now - self.max_age_seconds:
+                    evicted[i] = "age"
+
+        by_source = {}
+        for i, (source, _, _) in enumerate(meta):
+            if i not in evicted:
+                by_source.setdefault(source, []).append(i)
+        for source, indices in by_source.items():
+            quota = self.source_quotas.get(source)
+            if quota is not None and len(indices) > quota:
+                for i in indices[:len(indices) - quota]:
+                    evicted[i] = "quota"
+
+        live = [i for i in range(len(meta)) if i not in evicted]
+        if self.max_entries and len(live) > self.max_entries:
+            for i in live[:len(live) - self.max_entries]:
+                evicted[i] = "entries"
+            live = live[len(live) - self.max_entries:]
+
+        if self.max_bytes:
+            total = sum(meta[i][2] for i in live)
+            for i in live:
+                if total <= self.max_bytes:
+                    break
+                evicted[i] = "bytes"
+                total -= meta[i][2]
+        return evicted
+
+
+def _guess_source(text: str) -> str:
+    """Source of an entry from a snapshot written before sources were recorded."""
+    if text.startswith("Persona: "):
+        return "recommend"
+    if text.startswith("["):
+        return "persona"
+    return "other"
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    """Older snapshots pickled the faiss index itself, naming the CPU-specific build (e.g. swigfaiss_avx512)."""
+
+    def find_class(self, module, name):
+        if module.startswith("faiss.swigfaiss"):
+            module = "faiss"
+        return super().find_class(module, name)
+
 
 class RagMemory:
-    def __init__(self, dim=384):
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
-        self.index = faiss.IndexFlatL2(dim)
+    def __init__(self, backend=None, retention=None):
+        self.backend = backend or embeddings.get_backend()
+        self.retention = retention or RetentionPolicy()
+        self.dim = self.backend.dim
+        self.index = faiss.IndexFlatL2(self.dim)
         self.store = []
-        self.dim = dim
+        # (source, added_at, size in bytes) per store entry
+        self.meta = []
+        self.compactions = {"runs": 0, "evicted": {}, "bytes_reclaimed": 0, "last": None}
+        self._lock = threading.RLock()
 
     def embed(self, text: str) -> np.ndarray:
         if not isinstance(text, str) or not text.strip():
             logger.warning("Invalid input passed to embed()")
             return np.zeros(self.dim, dtype='float32')
-        return self.model.encode([text])[0].astype("float32")
+        with metrics.timed("embed"):
+            return self.backend.encode([text])[0]
 
-    def add(self, text: str):
+    def add(self, text: str, source: str = "other"):
         if not isinstance(text, str) or not text.strip():
             logger.warning("Attempted to add empty or invalid text to RAG memory")
             return
-        if len(self.store) >= MAX_MEMORY:
-            logger.info("RAG memory exceeded limit. Rebuilding index with recent entries.")
-            self.store.pop(0)
+        vector = self.embed(text)
+        with self._lock:
+            self.store.append(text)
+            self.meta.append((source if source in SOURCES else "other", time.time(), len(text.encode("utf-8"))))
+            self.index.add(np.array([vector]))
+            size = len(self.store)
+        logger.info("Text added to RAG memory. Store size: %d", size)
+        # Retention normally runs in the background; this only guards callers that never compact.
+        if self.retention.max_entries and size >= 2 * self.retention.max_entries:
+            logger.info("RAG memory at twice its entry limit. Compacting inline.")
+            self.compact()
+
+    def clear(self):
+        with self._lock:
+            self.store = []
+            self.meta = []
             self.index = faiss.IndexFlatL2(self.dim)
-            for t in self.store:
-                self.index.add(np.array([self.embed(t)]))
-        self.store.append(text)
-        self.index.add(np.array([self.embed(text)]))
-        logger.info("Text added to RAG memory. Store size: %d", len(self.store))
 
-        from difflib import get_close_matches
+    def compact(self, now: float = None) -> dict:
+        """
+        Apply the retention policy: drop evicted entries and rebuild the index
+        from the stored vectors of the survivors (nothing is re-embedded).
+        Returns what this run reclaimed.
+        """
+        started = time.perf_counter()
+        now = now or time.time()
+        with self._lock:
+            evicted = self.retention.evictions(self.meta, now)
+            if evicted:
+                keep = [i for i in range(len(self.store)) if i not in evicted]
+                vectors = self.index.reconstruct_n(0, self.index.ntotal) if self.index.ntotal else None
+                index = faiss.IndexFlatL2(self.dim)
+                if keep and vectors is not None:
+                    index.add(vectors[keep])
+                reclaimed = sum(self.meta[i][2] for i in evicted)
+                self.store = [self.store[i] for i in keep]
+                self.meta = [self.meta[i] for i in keep]
+                self.index = index
+            else:
+                reclaimed = 0
+
+            reasons = {}
+            for reason in evicted.values():
+                reasons[reason] = reasons.get(reason, 0) + 1
+            run = {
+                "at": now,
+                "seconds": round(time.perf_counter() - started, 4),
+                "evicted": reasons,
+                "bytes_reclaimed": reclaimed,
+                "entries": len(self.store),
+            }
+            self.compactions["runs"] += 1
+            self.compactions["bytes_reclaimed"] += reclaimed
+            for reason, count in reasons.items():
+                self.compactions["evicted"][reason] = self.compactions["evicted"].get(reason, 0) + count
+            self.compactions["last"] = run
+        if evicted:
+            logger.info("RAG memory compacted: evicted %s, reclaimed %d bytes, %d entries left", reasons, reclaimed, run["entries"])
+        return run
+
+    def stats(self) -> dict:
+        with self._lock:
+            sources = {}
+            for source, _, size in self.meta:
+                entry = sources.setdefault(source, {"entries": 0, "bytes": 0})
+                entry["entries"] += 1
+                entry["bytes"] += size
+            return {
+                "entries": len(self.store),
+                "bytes": sum(size for _, _, size in self.meta),
+                "sources": sources,
+                "retention": {
+                    "max_entries": self.retention.max_entries,
+                    "max_bytes": self.retention.max_bytes,
+                    "max_age_seconds": self.retention.max_age_seconds,
+                    "source_quotas": dict(self.retention.source_quotas),
+                },
+                "compactions": {
+                    "runs": self.compactions["runs"],
+                    "evicted": dict(self.compactions["evicted"]),
+                    "bytes_reclaimed": self.compactions["bytes_reclaimed"],
+                    "last": self.compactions["last"],
+                },
+            }
+
+    def metric_lines(self) -> list:
+        """Prometheus lines for metrics.register_collector."""
+        stats = self.stats()
+        lines = ["# HELP genkube_memory_entries RAG memory entries by source.", "# TYPE genkube_memory_entries gauge"]
+        lines += [f'genkube_memory_entries{{source="{s}"}} {v["entries"]}' for s, v in sorted(stats["sources"].items())]
+        lines += ["# HELP genkube_memory_bytes RAG memory text bytes by source.", "# TYPE genkube_memory_bytes gauge"]
+        lines += [f'genkube_memory_bytes{{source="{s}"}} {v["bytes"]}' for s, v in sorted(stats["sources"].items())]
+        lines += ["# HELP genkube_memory_evicted_total Entries evicted by compaction.", "# TYPE genkube_memory_evicted_total counter"]
+        lines += [f'genkube_memory_evicted_total{{reason="{r}"}} {n}' for r, n in sorted(stats["compactions"]["evicted"].items())]
+        lines += ["# HELP genkube_memory_reclaimed_bytes_total Text bytes reclaimed by compaction.",
+                  "# TYPE genkube_memory_reclaimed_bytes_total counter",
+                  f"genkube_memory_reclaimed_bytes_total {stats['compactions']['bytes_reclaimed']}"]
+        return lines
 
     def search(self, query: str, k: int = 3):
-        if not self.store:
+        return self.search_many([(query, k)])[0]
+
+    def search_many(self, queries: list) -> list:
+        """
+        Results for several (query, k) pairs, in order: one batched embed and
+        one FAISS search for all of them, then per-query keyword filtering.
+        """
+        if not queries:
+            return []
+        with self._lock:
+            store, index = self.store, self.index
+        if not store:
            logger.info("RAG memory is empty. Nothing to search.")
-           return []
+           return [[] for _ in queries]
 
-    # Step 1: Semantic search using FAISS
-        query_vec = self.embed(query.lower())
-        _, I = self.index.search(np.array([query_vec]), k * 2)
+    # Step 1: Semantic search using FAISS, all queries at once
+        vectors = np.zeros((len(queries), self.dim), dtype="float32")
+        valid = [i for i, (query, _) in enumerate(queries) if isinstance(query, str) and query.strip()]
+        if valid:
+            with metrics.timed("embed"):
+                vectors[valid] = self.backend.encode([queries[i][0].lower() for i in valid])
+        depth = max(1, max(k for _, k in queries) * 2)
+        with metrics.timed("faiss_search"):
+            _, I = index.search(vectors, depth)
 
-        initial_matches = [self.store[i] for i in I[0] if i < len(self.store)]
+        results = []
+        for (query, k), row in zip(queries, I):
+            initial_matches = [store[i] for i in row[:k * 2] if 0 <= i < len(store)]
+            results.append(self._filter(query, initial_matches, k, store))
+        return results
 
+    def _filter(self, query: str, initial_matches: list, k: int, store: list) -> list:
     # Step 2: Post-filter by keyword
         keywords = query.lower().split()
         filtered = []
@@ -68,7 +269,7 @@ class RagMemory:
     # Step 3: Fallback keyword match if semantic + filter failed
         if not filtered:
            logger.warning("No filtered semantic matches. Trying fallback keyword match.")
-           for entry in reversed(self.store):
+           for entry in reversed(store):
                entry_str = str(entry).strip()
                entry_lower = entry_str.lower()
                if any(keyword in entry_lower for keyword in keywords):
@@ -81,13 +282,21 @@ class RagMemory:
         logger.info("Final memory search results for query='%s': %d match(es)", query, len(filtered))
         return filtered
 
-
-
-
     def save(self, path="memory.pkl"):
         try:
-            with open(path, "wb") as f:
-                pickle.dump((self.index, self.store), f)
+            with self._lock:
+                # Serialized bytes rather than the index object, so any faiss build can read it.
+                snapshot = (faiss.serialize_index(self.index), list(self.store), self.backend.id, list(self.meta))
+            # A temp file per save, so concurrent saves (threads or workers) never share one.
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".",
+                                            prefix=os.path.basename(path) + ".", suffix=".tmp")
+            try:
+                with metrics.timed("memory_save"), os.fdopen(fd, "wb") as f:
+                    pickle.dump(snapshot, f)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
             logger.info("RAG memory saved to %s", path)
         except Exception as e:
             logger.exception("Failed to save RAG memory")
@@ -96,12 +305,31 @@ class RagMemory:
         if os.path.exists(path):
             try:
                 with open(path, "rb") as f:
-                     self.index, self.store = pickle.load(f)  
+                    snapshot = _SnapshotUnpickler(f).load()
+                index, self.store = snapshot[:2]
+                if isinstance(index, np.ndarray):
+                    index = faiss.deserialize_index(index)
+                # Older snapshots lack the entry metadata: count their entries as added now.
+                meta = snapshot[3] if len(snapshot) > 3 else []
+                if len(meta) != len(self.store):
+                    now = time.time()
+                    meta = [(_guess_source(text), now, len(text.encode("utf-8"))) for text in self.store]
+                self.meta = [tuple(m) for m in meta]
+                # Snapshots before the backend id was stored (2-tuples) are always rebuilt.
+                backend_id = snapshot[2] if len(snapshot) > 2 else None
+                if backend_id == self.backend.id and index.ntotal == len(self.store):
+                    self.index = index
+                    logger.info("RAG memory loaded from %s with %d entries", path, len(self.store))
+                    return
+
                 self.index = faiss.IndexFlatL2(self.dim)
-                for text in self.store:
-                    self.index.add(np.array([self.embed(text)]))
+                if self.store:
+                    self.index.add(self.backend.encode(list(self.store)))
 
-                logger.info("RAG memory rebuilt from store with %d entries", len(self.store))
+                logger.info(
+                    "RAG memory rebuilt with %s from store with %d entries (snapshot backend: %s)",
+                    self.backend.id, len(self.store), backend_id,
+                )
 
             except Exception as e:
                 logger.exception("Failed to load RAG memory")
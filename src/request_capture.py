@@ -0,0 +1,178 @@
+"""
+Opt-in request capture: one JSON line per request with endpoint, query,
+selected headers, upload hash and (up to a cap) body, status, latency and
+per-stage timings, written to a rotating JSONL file off the request path.
+benchmarks/replay.py fires a capture back at a local instance.
+
+    REQUEST_CAPTURE_PATH=memory-data/captures/capture.jsonl python main.py
+
+Bodies are stored as uploaded; only enable capture where that is acceptable.
+"""
+import base64
+import concurrent.futures
+import contextvars
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+from src import metrics
+
+logger = logging.getLogger("genkube")
+
+# Capture file; empty (the default) disables capture.
+REQUEST_CAPTURE_PATH = os.getenv("REQUEST_CAPTURE_PATH", "").strip()
+
+# Bodies up to this size are stored (base64); larger ones only by hash and size.
+REQUEST_CAPTURE_MAX_BODY_BYTES = int(os.getenv("REQUEST_CAPTURE_MAX_BODY_BYTES", str(256 * 1024)))
+
+# Rotate the capture file at this size, keeping this many old files (.1, .2, ...).
+REQUEST_CAPTURE_MAX_FILE_BYTES = int(os.getenv("REQUEST_CAPTURE_MAX_FILE_BYTES", str(64 * 1024 * 1024)))
+REQUEST_CAPTURE_BACKUPS = int(os.getenv("REQUEST_CAPTURE_BACKUPS", "5"))
+
+# Records waiting for the writer thread; beyond this they are dropped, never blocking a request.
+REQUEST_CAPTURE_QUEUE = 1000
+
+# Probes, metrics and admin/docs traffic are not worth replaying.
+EXCLUDED_PATHS = ("/metrics", "/ready", "/admin/", "/docs", "/openapi.json", "/redoc")
+
+# Headers replay needs; credentials and admin tokens are never recorded.
+RECORDED_HEADERS = ("content-type", "accept", "x-manifest-id")
+
+
+class CaptureWriter:
+    """Appends JSON lines from a background thread, rotating like RotatingFileHandler."""
+
+    def __init__(self, path=REQUEST_CAPTURE_PATH, max_body_bytes=REQUEST_CAPTURE_MAX_BODY_BYTES,
+                 max_file_bytes=REQUEST_CAPTURE_MAX_FILE_BYTES, backups=REQUEST_CAPTURE_BACKUPS):
+        self.path = path
+        self.max_body_bytes = max_body_bytes
+        self.max_file_bytes = max_file_bytes
+        self.backups = backups
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=REQUEST_CAPTURE_QUEUE)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def write(self, record: dict):
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(json.dumps(record, separators=(",", ":")))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Block until every queued record is on disk."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _ensure_thread(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="genkube-capture", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            self.path, maxBytes=self.max_file_bytes, backupCount=self.backups, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.info("Capturing requests to %s", self.path)
+        while True:
+            line = self._queue.get()
+            try:
+                handler.emit(logging.makeLogRecord({"msg": line}))
+                self.written += 1
+            except Exception:
+                logger.exception("Could not write captured request")
+            finally:
+                self._queue.task_done()
+
+
+class ContextThreadPoolExecutor(concurrent.futures.ThreadPoolExecutor):
+    """Default executor that carries the caller's contextvars, so stages timed in run_in_executor count."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def _excluded(path: str) -> bool:
+    return any(path == p or (p.endswith("/") and path.startswith(p)) for p in EXCLUDED_PATHS)
+
+
+class RequestCaptureMiddleware:
+    """
+    Pure ASGI middleware: tees the request body as it streams (so uploads
+    are still spooled, never buffered whole) and records one line per request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        writer = recorder
+        if scope["type"] != "http" or not writer.enabled or _excluded(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        digest = hashlib.sha256()
+        kept = bytearray()
+        size = 0
+        status = 500
+
+        async def tee_receive():
+            nonlocal size
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                digest.update(body)
+                size += len(body)
+                if len(kept) <= writer.max_body_bytes:
+                    kept.extend(body[:writer.max_body_bytes + 1 - len(kept)])
+            return message
+
+        async def tee_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stages = {}
+        token = metrics.stage_recorder.set(stages)
+        wall, start = time.time(), time.perf_counter()
+        try:
+            await self.app(scope, tee_receive, tee_send)
+        finally:
+            seconds = time.perf_counter() - start
+            metrics.stage_recorder.reset(token)
+            headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+            record = {
+                "ts": round(wall, 6),
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(scope.get("route"), "path", None),
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "headers": {name: headers[name] for name in RECORDED_HEADERS if name in headers},
+                "body_bytes": size,
+                "body_sha256": digest.hexdigest(),
+                "status": status,
+                "seconds": round(seconds, 6),
+                "stages": {stage: round(value, 6) for stage, value in sorted(stages.items())},
+            }
+            if size <= writer.max_body_bytes:
+                record["body_b64"] = base64.b64encode(bytes(kept)).decode("ascii")
+            writer.write(record)
+
+
+recorder = CaptureWriter()
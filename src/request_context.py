@@ -0,0 +1,193 @@
+import logging
+import os
+
+import yaml
+from starlette.responses import JSONResponse
+
+from src import metrics
+
+logger = logging.getLogger("genkube")
+
+# Prefer the libyaml C bindings; they parse and emit several times faster
+# than the pure-Python implementation.
+try:
+    from yaml import CSafeDumper as SafeDumper
+    from yaml import CSafeLoader as SafeLoader
+    LIBYAML = True
+except ImportError:
+    from yaml import SafeDumper, SafeLoader
+    LIBYAML = False
+
+
+# Uploads are rejected (413) past this many bytes, while the request body is still being received.
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Allowance for multipart framing (boundaries, part headers, other form fields) on top of UPLOAD_MAX_BYTES.
+UPLOAD_FRAMING_BYTES = 64 * 1024
+
+# Endpoints with their own limits (per archive member) instead of UPLOAD_MAX_BYTES.
+UPLOAD_LIMIT_EXEMPT = ("/analyze-batch",)
+
+# Maximum YAML documents in one upload.
+UPLOAD_MAX_DOCUMENTS = int(os.getenv("UPLOAD_MAX_DOCUMENTS", "5000"))
+
+
+
+class UploadTooLarge(ValueError):
+    """An upload went over UPLOAD_MAX_BYTES or UPLOAD_MAX_DOCUMENTS."""
+
+
+def load_all(stream) -> list:
+    return list(yaml.load_all(stream, Loader=SafeLoader))
+
+
+def iter_documents(stream, max_documents: int = None):
+    """
+    Parse a YAML string or file object lazily, yielding one document at a
+    time. Raises UploadTooLarge past max_documents and yaml.YAMLError (a
+    ReaderError for bytes that are not valid UTF-8) where parsing fails.
+    """
+    max_documents = UPLOAD_MAX_DOCUMENTS if max_documents is None else max_documents
+    for count, doc in enumerate(yaml.load_all(stream, Loader=SafeLoader), 1):
+        if count > max_documents:
+            raise UploadTooLarge(f"Upload has more than {max_documents} YAML documents.")
+        yield doc
+
+
+async def spool_upload(file, max_bytes: int = None):
+    """
+    The UploadFile's own spooled file, rewound to the start. By the time a
+    handler runs Starlette has received the whole body (UploadLimitMiddleware
+    cuts oversized ones off while they arrive), so this only checks the
+    size of the file part itself against max_bytes.
+    """
+    max_bytes = UPLOAD_MAX_BYTES if max_bytes is None else max_bytes
+    size = getattr(file, "size", None)
+    if size is None:
+        size = file.file.seek(0, os.SEEK_END)
+    if size > max_bytes:
+        raise UploadTooLarge(f"Upload exceeds the {max_bytes} byte limit.")
+    file.file.seek(0)
+    return file.file
+
+
+async def read_upload(file, max_bytes: int = None) -> bytes:
+    """Whole upload as bytes, with the same size check as spool_upload."""
+    with await spool_upload(file, max_bytes) as spool:
+        return spool.read()
+
+
+class UploadLimitMiddleware:
+    """
+    Pure ASGI middleware answering 413 for request bodies over UPLOAD_MAX_BYTES
+    (plus multipart framing) before they are spooled: up front from
+    Content-Length, or as soon as a chunked body passes the limit.
+    """
+
+    def __init__(self, app, max_bytes: int = None):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in UPLOAD_LIMIT_EXEMPT:
+            await self.app(scope, receive, send)
+            return
+        max_bytes = UPLOAD_MAX_BYTES if self.max_bytes is None else self.max_bytes
+        limit = max_bytes + UPLOAD_FRAMING_BYTES
+        headers = dict(scope.get("headers") or [])
+        try:
+            length = int(headers.get(b"content-length", b"0"))
+        except ValueError:
+            length = 0
+        if length > limit:
+            await self._reject(scope, receive, send, max_bytes)
+            return
+
+        received = 0
+        started = False
+        overflowed = False
+
+        async def limited_receive():
+            nonlocal received, overflowed
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    overflowed = True
+                    raise UploadTooLarge(f"Upload exceeds the {max_bytes} byte limit.")
+            return message
+
+        async def tracked_send(message):
+            nonlocal started
+            # Whatever the app answers to the aborted body (FastAPI: 400) is replaced by the 413.
+            if overflowed and not started:
+                return
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except Exception:
+            if not overflowed or started:
+                raise
+        if overflowed and not started:
+            await self._reject(scope, receive, send, max_bytes)
+
+    @staticmethod
+    async def _reject(scope, receive, send, max_bytes: int):
+        logger.warning("Upload rejected: %s %s is over %d bytes", scope.get("method"), scope["path"], max_bytes)
+        response = JSONResponse(status_code=413, content={"error": f"Upload exceeds the {max_bytes} byte limit."})
+        await response(scope, receive, send)
+
+
+def dump(doc, **kwargs) -> str:
+    kwargs.setdefault("sort_keys", False)
+    return yaml.dump(doc, Dumper=SafeDumper, **kwargs)
+
+
+def dump_all(docs, **kwargs) -> str:
+    kwargs.setdefault("sort_keys", False)
+    return yaml.dump_all(docs, Dumper=SafeDumper, **kwargs)
+
+
+class RequestContext:
+    """
+    One uploaded manifest, decoded and parsed exactly once. Endpoints build
+    it up front and hand text/docs to linting, patching and prompt building.
+    Raises UploadTooLarge when the upload breaks the size or document limits.
+    """
+
+    def __init__(self, raw: bytes, filename: str = ""):
+        self.raw = raw
+        self.filename = filename
+        self.text = None
+        self.docs = None
+        self.decode_error = None
+        self.parse_error = None
+
+        try:
+            self.text = raw.decode("utf-8")
+        except UnicodeDecodeError as e:
+            self.decode_error = e
+            return
+
+        if not self.text.strip():
+            return
+
+        try:
+            with metrics.timed("yaml_parse"):
+                self.docs = list(iter_documents(self.text))
+        except yaml.YAMLError as e:
+            self.parse_error = e
+
+    @classmethod
+    async def from_upload(cls, file) -> "RequestContext":
+        return cls(await read_upload(file), filename=file.filename or "")
+
+    @property
+    def is_empty(self) -> bool:
+        return self.text is not None and not self.text.strip()
+
+    @property
+    def is_valid(self) -> bool:
+        return self.docs is not None
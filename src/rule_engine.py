@@ -0,0 +1,181 @@
+import logging
+
+from src import linter_runner, metrics
+from src.linter_runner import LintIssue
+
+logger = logging.getLogger("genkube")
+
+# Where each workload kind keeps its pod spec.
+POD_SPEC_PATHS = {
+    "Deployment": ("spec", "template", "spec"),
+    "StatefulSet": ("spec", "template", "spec"),
+    "DaemonSet": ("spec", "template", "spec"),
+    "ReplicaSet": ("spec", "template", "spec"),
+    "Job": ("spec", "template", "spec"),
+    "CronJob": ("spec", "jobTemplate", "spec", "template", "spec"),
+    "Pod": ("spec",),
+}
+
+# kube-linter checks implemented natively. Names match kube-linter so hybrid
+# mode can --exclude them and the results read the same either way.
+NATIVE_CHECKS = (
+    "run-as-non-root",
+    "no-read-only-root-fs",
+    "unset-cpu-requirements",
+    "unset-memory-requirements",
+    "latest-tag",
+    "no-liveness-probe",
+    "no-readiness-probe",
+)
+
+REMEDIATIONS = {
+    "run-as-non-root": "Set runAsUser to a non-zero number and runAsNonRoot to true in your pod or container securityContext.",
+    "no-read-only-root-fs": "Set readOnlyRootFilesystem to true in the container securityContext.",
+    "unset-cpu-requirements": "Set CPU requests and limits for your container based on its requirements.",
+    "unset-memory-requirements": "Set memory requests and limits for your container based on its requirements.",
+    "latest-tag": "Use a container image with a specific tag other than latest.",
+    "no-liveness-probe": "Specify a liveness probe in your container.",
+    "no-readiness-probe": "Specify a readiness probe in your container.",
+}
+
+
+def pod_spec(doc):
+    """Return the pod spec of a workload document, or None if it has none."""
+    if not isinstance(doc, dict):
+        return None
+    path = POD_SPEC_PATHS.get(doc.get("kind"))
+    if path is None:
+        return None
+    node = doc
+    for key in path:
+        node = node.get(key) if isinstance(node, dict) else None
+    return node if isinstance(node, dict) else None
+
+
+# Every container list in a pod spec, with the checks that do not apply to it:
+# init containers run to completion (no probes), ephemeral containers may not
+# set resources or probes.
+CONTAINER_LISTS = (
+    ("containers", ()),
+    ("initContainers", ("no-liveness-probe", "no-readiness-probe")),
+    ("ephemeralContainers", ("unset-cpu-requirements", "unset-memory-requirements",
+                             "no-liveness-probe", "no-readiness-probe")),
+)
+
+
+def _is_latest(image: str) -> bool:
+    name = image.rsplit("/", 1)[-1]
+    if "@" in name:
+        return False
+    return ":" not in name or name.endswith(":latest")
+
+
+def _container_issues(container: dict, pod_context: dict) -> list:
+    """All native rules for one container, as (check, message) pairs."""
+    name = container.get("name", "")
+    found = []
+    security = container.get("securityContext") or {}
+    pod_security = pod_context.get("securityContext") or {}
+
+    run_as_non_root = security.get("runAsNonRoot", pod_security.get("runAsNonRoot"))
+    run_as_user = security.get("runAsUser", pod_security.get("runAsUser"))
+    if not run_as_non_root and not (isinstance(run_as_user, int) and run_as_user > 0):
+        found.append(("run-as-non-root", f'container "{name}" is not set to runAsNonRoot'))
+
+    if not security.get("readOnlyRootFilesystem"):
+        found.append(("no-read-only-root-fs", f'container "{name}" does not have a read-only root file system'))
+
+    resources = container.get("resources") or {}
+    requests = resources.get("requests") or {}
+    limits = resources.get("limits") or {}
+    for resource, check in (("cpu", "unset-cpu-requirements"), ("memory", "unset-memory-requirements")):
+        if not requests.get(resource):
+            found.append((check, f'container "{name}" has {resource} request 0'))
+        if not limits.get(resource):
+            found.append((check, f'container "{name}" has {resource} limit 0'))
+
+    image = str(container.get("image", ""))
+    if _is_latest(image):
+        found.append(("latest-tag", f'The container "{name}" is using an invalid container image, "{image}".'))
+
+    if not container.get("livenessProbe"):
+        found.append(("no-liveness-probe", f'container "{name}" does not specify a liveness probe'))
+    if not container.get("readinessProbe"):
+        found.append(("no-readiness-probe", f'container "{name}" does not specify a readiness probe'))
+    return found
+
+
+def evaluate(docs: list) -> list:
+    """
+    Run every native rule in one pass over the pod specs in docs. Returns one
+    list of LintIssue per document, in order, like linter_runner.lint_documents.
+    """
+    with metrics.timed("native_rules"):
+        return [_document_issues(doc) for doc in docs]
+
+
+def _document_issues(doc) -> list:
+    issues = []
+    spec = pod_spec(doc)
+    if spec is None:
+        return issues
+    meta = doc.get("metadata") if isinstance(doc.get("metadata"), dict) else {}
+    for field, skipped in CONTAINER_LISTS:
+        containers = spec.get(field)
+        if not isinstance(containers, list):
+            continue
+        for container in containers:
+            if not isinstance(container, dict):
+                continue
+            for check, message in _container_issues(container, spec):
+                if check in skipped:
+                    continue
+                issues.append(LintIssue(
+                    check=check,
+                    message=message,
+                    remediation=REMEDIATIONS[check],
+                    object_name=meta.get("name", ""),
+                    object_kind=doc.get("kind", ""),
+                    namespace=meta.get("namespace", ""),
+                ))
+    return issues
+
+
+def remaining_checks_args() -> list:
+    """kube-linter arguments that skip the checks evaluated natively."""
+    return ["--exclude", ",".join(NATIVE_CHECKS)]
+
+
+ENGINES = ("kube-linter", "native", "hybrid")
+
+
+def lint_per_document(docs: list, engine: str = "kube-linter") -> list:
+    """
+    Lint parsed documents with the chosen engine; one list of LintIssue per
+    document, in order:
+      kube-linter - every check via the kube-linter binary
+      native      - only the in-process rules above
+      hybrid      - native rules plus kube-linter for all remaining checks
+    """
+    if engine == "kube-linter":
+        return linter_runner.lint_documents(docs)
+    per_doc = evaluate(docs)
+    if engine == "hybrid":
+        remote = linter_runner.lint_documents(docs, extra_args=remaining_checks_args())
+        per_doc = [native + other for native, other in zip(per_doc, remote)]
+    return per_doc
+
+
+def run_engine(docs: list, engine: str = "kube-linter", content: bytes = None) -> list:
+    """Same contract as linter_runner.run_kube_linter, for any engine."""
+    if engine == "kube-linter":
+        return linter_runner.run_kube_linter(content, docs=docs)
+
+    try:
+        per_doc = lint_per_document(docs, engine)
+    except Exception as e:
+        logger.exception("Error running %s lint engine", engine)
+        return [f"Error running kube-linter: {str(e)}"]
+
+    issues = [str(issue) for doc_issues in per_doc for issue in doc_issues]
+    return issues or [linter_runner.NO_ISSUES_MESSAGE]
@@ -1,17 +1,132 @@
 import strawberry
-from typing import List
+import asyncio
+import base64
+import os
+from typing import List, Optional
+from strawberry.dataloader import DataLoader
 from strawberry.types import Info
 import logging
 
-from src.llm_handler import memory
+from src.llm_handler import MEMORY_PATH, memory
 
 logger = logging.getLogger("genkube")
 
+# Largest page (first / k) a memory search may ask for.
+MEMORY_PAGE_MAX = int(os.getenv("MEMORY_PAGE_MAX", "50"))
+
+# Most queries one searchMemoryBatch call may carry.
+MEMORY_BATCH_MAX = int(os.getenv("MEMORY_BATCH_MAX", "20"))
+
+CURSOR_PREFIX = "memory:"
+
+
+async def _search_memory_batch(keys: List[tuple]) -> List[list]:
+    """Every (query, k) of one GraphQL request: one embed batch and one FAISS search, off the event loop."""
+    logger.info("GraphQL memory search batch of %d quer(ies)", len(keys))
+    return await asyncio.get_running_loop().run_in_executor(None, memory.search_many, list(keys))
+
+
+async def get_context() -> dict:
+    """Per-request GraphQL context; the loader batches and de-duplicates memory searches."""
+    return {"memory_loader": DataLoader(load_fn=_search_memory_batch)}
+
+
+def _loader(info: Info) -> DataLoader:
+    context = info.context
+    if "memory_loader" not in context:
+        context["memory_loader"] = DataLoader(load_fn=_search_memory_batch)
+    return context["memory_loader"]
+
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(f"{CURSOR_PREFIX}{offset}".encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> int:
+    """
+    Offset after which the next page starts; an absent cursor means the first
+    page. Cursors past the `size` entries in memory are rejected, so a forged
+    one cannot make the search ask FAISS for an arbitrary number of results.
+    """
+    if not cursor:
+        return 0
+    try:
+        value = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        if value.startswith(CURSOR_PREFIX):
+            offset = int(value[len(CURSOR_PREFIX):]) + 1
+            if 0 < offset <= size:
+                return offset
+    except (ValueError, UnicodeError):
+        pass
+    raise ValueError(f"Invalid cursor: {cursor}")
+
+
 @strawberry.type
 class MemoryItem:
     prompt: str
     response: str
 
+
+def _to_item(text: str) -> MemoryItem:
+    logger.debug("RAW TEXT FROM SEARCH: %s", text)
+
+    if "\nResponse: " in text and "Prompt: " in text:
+        parts = text.split("\nResponse: ", 1)
+        prompt = parts[0].replace("Prompt: ", "").strip()
+        response = parts[1].strip()
+        logger.debug("✅ Parsed OK: %s | %s", prompt, response)
+    else:
+        prompt = text[:60] + "..." if len(text) > 60 else text
+        response = text
+        logger.warning("⚠️ Fallback parser used for: %s", text)
+
+    return MemoryItem(prompt=prompt, response=response)
+
+
+@strawberry.type
+class MemoryEdge:
+    cursor: str
+    node: MemoryItem
+
+
+@strawberry.type
+class PageInfo:
+    end_cursor: Optional[str]
+    has_next_page: bool
+
+
+@strawberry.type
+class MemoryConnection:
+    query: str
+    edges: List[MemoryEdge]
+    page_info: PageInfo
+
+
+@strawberry.input
+class MemoryQueryInput:
+    q: str
+    first: int = 5
+    after: Optional[str] = None
+
+
+async def _page(info: Info, q: str, first: int, after: Optional[str]) -> MemoryConnection:
+    first = max(0, min(first, MEMORY_PAGE_MAX))
+    offset = decode_cursor(after, len(memory.store))
+    # One extra result tells whether another page exists.
+    results = await _loader(info).load((q, offset + first + 1))
+    edges = [
+        MemoryEdge(cursor=encode_cursor(offset + i), node=_to_item(text))
+        for i, text in enumerate(results[offset:offset + first])
+    ]
+    return MemoryConnection(
+        query=q,
+        edges=edges,
+        page_info=PageInfo(
+            end_cursor=edges[-1].cursor if edges else after,
+            has_next_page=len(results) > offset + first,
+        ),
+    )
+
 @strawberry.type
 class AddMemoryResponse:
     status: str
@@ -20,41 +135,34 @@ class AddMemoryResponse:
 @strawberry.type
 class Query:
     @strawberry.field(description="Search memory for relevant LLM prompts/responses.")
-    def search_memory(self, q: str, k: int = 5) -> List[MemoryItem]:
+    async def search_memory(self, info: Info, q: str, k: int = 5) -> List[MemoryItem]:
         try:
             logger.info("GraphQL memory search called for query: %s", q)
-            results = memory.search(q, k)
-            parsed = []
-
-            for i, text in enumerate(results[:k]):
-                logger.debug("RAW TEXT FROM SEARCH: %s", text)
-
-                if "\nResponse: " in text and "Prompt: " in text:
-                    parts = text.split("\nResponse: ", 1)
-                    prompt = parts[0].replace("Prompt: ", "").strip()
-                    response = parts[1].strip()
-                    logger.debug("✅ Parsed OK: %s | %s", prompt, response)
-                else:
-                    prompt = text[:60] + "..." if len(text) > 60 else text
-                    response = text
-                    logger.warning("⚠️ Fallback parser used for: %s", text)
-
-                parsed.append(MemoryItem(prompt=prompt, response=response))
-
-            return parsed
+            k = max(0, min(k, MEMORY_PAGE_MAX))
+            results = await _loader(info).load((q, k))
+            return [_to_item(text) for text in results[:k]]
 
         except Exception as e:
             logger.exception("GraphQL memory search failed")
             return []
 
+    @strawberry.field(description="One page of memory search results; pass pageInfo.endCursor as `after` for the next.")
+    async def search_memory_page(self, info: Info, q: str, first: int = 5, after: Optional[str] = None) -> MemoryConnection:
+        return await _page(info, q, first, after)
+
+    @strawberry.field(description="Several memory searches resolved with one embed batch and one FAISS search.")
+    async def search_memory_batch(self, info: Info, queries: List[MemoryQueryInput]) -> List[MemoryConnection]:
+        if len(queries) > MEMORY_BATCH_MAX:
+            raise ValueError(f"At most {MEMORY_BATCH_MAX} queries per batch.")
+        return list(await asyncio.gather(*(_page(info, item.q, item.first, item.after) for item in queries)))
+
 @strawberry.type
 class Mutation:
     @strawberry.mutation(description="Clear the FAISS-backed memory store.")
     def clear_memory(self) -> str:
         try:
-            memory.store.clear()
-            memory.index.reset()
-            memory.save("memory-data/memory.pkl")
+            memory.clear()
+            memory.save(MEMORY_PATH)
             logger.info("GraphQL mutation: memory cleared")
             return "Memory cleared."
         except Exception as e:
@@ -0,0 +1,156 @@
+"""
+Start-up warm-up so the first requests after a deploy are not the slow ones:
+a throwaway embed and FAISS search, a tiny LLM prompt that loads the model,
+and explanations for the most common checks in memory history. GET /ready
+answers 503 until it has finished.
+"""
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+import faiss
+import numpy as np
+
+from src import llm_handler
+from src.prompt_registry import registry as prompt_registry
+
+logger = logging.getLogger("genkube")
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").strip().lower() == "true"
+
+# Send a tiny prompt so Ollama / the HF endpoint has the model loaded.
+WARMUP_LLM = os.getenv("WARMUP_LLM", "true").strip().lower() == "true"
+
+# Checks (most frequent in memory history first) whose explanations are pre-filled.
+WARMUP_EXPLAIN_TOP_N = int(os.getenv("WARMUP_EXPLAIN_TOP_N", "5"))
+
+# Report ready after this long even if warm-up is still going.
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "180"))
+
+WARMUP_PROMPT = [{"role": "user", "content": "Reply with the single word OK."}]
+
+# One kube-linter issue line, as rendered into explain prompts by LintIssue.__str__.
+ISSUE_LINE = re.compile(r"^.*\(check: ([\w-]+), remediation: .*\)$", re.MULTILINE)
+
+
+def warm_embeddings() -> str:
+    memory = llm_handler.memory
+    vector = memory.backend.encode(["kubernetes security warm-up"])
+    if memory.store:
+        memory.search_many([("security", 1)])
+    else:
+        faiss.IndexFlatL2(memory.dim).search(np.asarray(vector, dtype="float32"), 1)
+    return f"{memory.backend.id}, {len(memory.store)} entries"
+
+
+def warm_llm() -> str:
+    reply = llm_handler.run_llm_with_timeout("mistral", WARMUP_PROMPT)
+    if reply.startswith("LLM error"):
+        raise RuntimeError(reply)
+    return llm_handler.active_model("mistral")
+
+
+def common_issues(store: list, top_n: int) -> list:
+    """Latest issue line of each of the top_n most frequent checks in explain history."""
+    counts = Counter()
+    latest = {}
+    for text in store:
+        if not text.startswith("Prompt: "):
+            continue
+        prompt = text[len("Prompt: "):].split("\nResponse: ", 1)[0]
+        for match in ISSUE_LINE.finditer(prompt):
+            counts[match.group(1)] += 1
+            latest[match.group(1)] = match.group(0).strip()
+    return [latest[check] for check, _ in counts.most_common(top_n)]
+
+
+def prefill_explanations(top_n: int, use_llm: bool = True) -> str:
+    """
+    Seed the explain cache. A history entry whose prompt matches the current
+    explain.txt is reused as is; otherwise (with use_llm) it is regenerated.
+    """
+    history = {}
+    for text in list(llm_handler.memory.store):
+        prompt, sep, response = text.partition("\nResponse: ")
+        if sep and prompt.startswith("Prompt: "):
+            history[prompt[len("Prompt: "):]] = response
+
+    reused = generated = 0
+    for issue in common_issues(list(llm_handler.memory.store), top_n):
+        prompt = prompt_registry.render("explain.txt", issue=issue)
+        key = (prompt_registry.version, issue)
+        if llm_handler.explain_cache.get(key) is not None:
+            continue
+        response = history.get(prompt)
+        if response is not None and llm_handler.is_valid_response(response):
+            llm_handler.explain_cache.set(key, response)
+            reused += 1
+        elif use_llm:
+            llm_handler.explain(issue)
+            generated += 1
+    return f"{reused} reused, {generated} generated"
+
+
+class WarmUp:
+    def __init__(self, enabled=WARMUP_ENABLED, llm=WARMUP_LLM, explain_top_n=WARMUP_EXPLAIN_TOP_N):
+        self.enabled = enabled
+        self.llm = llm
+        self.explain_top_n = explain_top_n
+        self.state = "pending" if enabled else "disabled"
+        self.steps = {}
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.state in ("ready", "timed_out", "disabled")
+
+    def _step(self, name: str, fn):
+        started = time.perf_counter()
+        try:
+            detail, ok = fn(), True
+        except Exception as e:
+            logger.exception("Warm-up step %s failed", name)
+            detail, ok = str(e), False
+        with self._lock:
+            self.steps[name] = {"ok": ok, "seconds": round(time.perf_counter() - started, 3), "detail": detail}
+
+    def run(self):
+        """Run every step; a failing step is recorded but does not block readiness."""
+        if not self.enabled:
+            return
+        self.state = "running"
+        self.started_at = time.time()
+        self._step("embeddings", warm_embeddings)
+        if self.llm:
+            self._step("llm", warm_llm)
+        if self.explain_top_n > 0:
+            self._step("explain_cache", lambda: prefill_explanations(self.explain_top_n, use_llm=self.llm))
+        self.finished_at = time.time()
+        if self.state == "running":
+            self.state = "ready"
+        logger.info("Warm-up finished in %.2fs: %s", self.finished_at - self.started_at, self.steps)
+
+    async def run_async(self, timeout: float = WARMUP_TIMEOUT_SECONDS):
+        """run() in the executor; after `timeout` seconds report ready anyway and let it finish."""
+        if not self.enabled:
+            return
+        future = asyncio.get_running_loop().run_in_executor(None, self.run)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Warm-up still running after %.0fs; reporting ready", timeout)
+            self.state = "timed_out"
+
+    def status(self) -> dict:
+        with self._lock:
+            steps = {name: dict(step) for name, step in self.steps.items()}
+        return {"ready": self.ready, "state": self.state, "steps": steps}
+
+
+warmup = WarmUp()
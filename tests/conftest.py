@@ -0,0 +1,26 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Offline and fast: hashed n-gram embeddings instead of downloading the
+# transformer model, and a scratch RAG snapshot and SQLite stores instead of
+# the tracked snapshot and the shared memory-data/ files.
+os.environ.setdefault("EMBEDDING_BACKEND", "hashing")
+_SCRATCH = tempfile.mkdtemp(prefix="genkube-tests-")
+os.environ.setdefault("MEMORY_PATH", os.path.join(_SCRATCH, "memory.pkl"))
+os.environ.setdefault("RATE_LIMIT_DB_PATH", os.path.join(_SCRATCH, "ratelimit.db"))
+os.environ.setdefault("JOBS_DB_PATH", os.path.join(_SCRATCH, "jobs.db"))
+os.environ.setdefault("MANIFEST_DB_PATH", os.path.join(_SCRATCH, "manifests.db"))
+
+FAKE_LINTER = Path(__file__).parent / "fixtures" / "fake_kube_linter.py"
+
+
+@pytest.fixture
+def fake_linter(monkeypatch):
+    """Point linter_runner at the stub kube-linter in tests/fixtures."""
+    from src import linter_runner
+
+    monkeypatch.setattr(linter_runner, "KUBE_LINTER_PATH", f'"{sys.executable}" "{FAKE_LINTER}"')
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Stand-in for the kube-linter binary in tests. Understands
+`lint --format json [--exclude checks] <file|->` and `version`, and reports a small subset of
+checks (including the cross-object dangling-service) in kube-linter's JSON report shape.
+"""
+import json
+import sys
+
+import yaml
+
+VERSION = "v0.0.0-fake"
+
+WORKLOAD_KINDS = {"Deployment", "StatefulSet", "DaemonSet", "Job"}
+
+
+def report(doc, check, message, remediation, path):
+    meta = doc.get("metadata") or {}
+    group, _, version = (doc.get("apiVersion") or "").rpartition("/")
+    return {
+        "Diagnostic": {"Message": message},
+        "Check": check,
+        "Remediation": remediation,
+        "Object": {
+            "Metadata": {"FilePath": path},
+            "K8sObject": {
+                "Namespace": meta.get("namespace", ""),
+                "Name": meta.get("name", ""),
+                "GroupVersionKind": {"Group": group, "Version": version, "Kind": doc.get("kind", "")},
+            },
+        },
+    }
+
+
+def dangling_services(docs, path):
+    """Services whose selector matches no pod template in the same run, like kube-linter's dangling-service."""
+    pod_labels = [
+        (((doc.get("spec") or {}).get("template") or {}).get("metadata") or {}).get("labels") or {}
+        for doc in docs if doc.get("kind") in WORKLOAD_KINDS
+    ]
+    reports = []
+    for doc in docs:
+        selector = (doc.get("spec") or {}).get("selector") if doc.get("kind") == "Service" else None
+        if selector and not any(all(labels.get(k) == v for k, v in selector.items()) for labels in pod_labels):
+            reports.append(report(doc, "dangling-service",
+                                  f"no pods found matching service labels ({selector})",
+                                  "Confirm that your service's selector correctly matches the labels on one of your deployments.",
+                                  path))
+    return reports
+
+
+def lint(text, path):
+    docs = [doc for doc in yaml.safe_load_all(text) if isinstance(doc, dict)]
+    reports = dangling_services(docs, path)
+    for doc in docs:
+        if doc.get("kind") not in WORKLOAD_KINDS:
+            continue
+        pod = (((doc.get("spec") or {}).get("template") or {}).get("spec")) or {}
+        for container in pod.get("containers") or []:
+            name = container.get("name", "")
+            if not (container.get("securityContext") or {}).get("runAsNonRoot"):
+                reports.append(report(doc, "run-as-non-root",
+                                      f'container "{name}" is not set to runAsNonRoot',
+                                      "Set runAsUser to a non-zero number and runAsNonRoot to true.", path))
+            if ":" not in container.get("image", "") or container.get("image", "").endswith(":latest"):
+                reports.append(report(doc, "latest-tag",
+                                      f'The container "{name}" is using an invalid container image, "{container.get("image", "")}".',
+                                      "Use a container image with a specific tag other than latest.", path))
+    return reports
+
+
+def main(argv):
+    if argv[:1] == ["version"]:
+        print(VERSION)
+        return 0
+    if argv[:1] != ["lint"]:
+        print("unsupported command", file=sys.stderr)
+        return 2
+    target = argv[-1]
+    if target == "-":
+        text, path = sys.stdin.read(), "<standard input>"
+    else:
+        with open(target, encoding="utf-8") as f:
+            text, path = f.read(), target
+    excluded = set()
+    if "--exclude" in argv:
+        excluded = set(argv[argv.index("--exclude") + 1].split(","))
+    reports = [r for r in lint(text, path) if r["Check"] not in excluded]
+    print(json.dumps({"Reports": reports, "Summary": {"KubeLinterVersion": VERSION}}))
+    return 1 if reports else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
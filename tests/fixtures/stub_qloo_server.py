@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+Local stand-in for the Qloo recommendations API, for tests and benchmarks.
+Answers GET /v1/recommendations?q=... with a few entities after an optional
+delay, and counts the requests it served.
+
+    python tests/fixtures/stub_qloo_server.py --port 8765 --latency-ms 150
+    QLOO_API_KEY=stub QLOO_BASE_URL=http://127.0.0.1:8765 python main.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubQlooHandler(BaseHTTPRequestHandler):
+    latency_ms = 0.0
+    hits = None  # per-server list, appended once per request
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/v1/recommendations":
+            self.send_error(404)
+            return
+        self.hits.append(url.query)
+        time.sleep(self.latency_ms / 1000)
+        topic = (parse_qs(url.query).get("q") or [""])[0]
+        body = json.dumps({"results": {"entities": [
+            {"name": f"{topic.title()} Platform Guild", "subtype": "event", "location": "Online", "popularity": 0.9},
+            {"name": "Argo CD", "subtype": "tool", "location": "GitHub", "popularity": 0.87},
+        ]}}).encode("utf-8")
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up (timeout tests)
+
+
+def serve(host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0):
+    """Start on a background thread; the server's `hits` list records each request."""
+    hits = []
+    handler = type("Handler", (StubQlooHandler,), {"latency_ms": latency_ms, "hits": hits})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.hits = hits
+    threading.Thread(target=server.serve_forever, name="stub-qloo", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    server = serve(args.host, args.port, args.latency_ms)
+    print(f"Stub Qloo listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
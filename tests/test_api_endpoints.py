@@ -35,3 +35,126 @@ def test_memory_endpoint():
     response = client.get("/memory?q=cpu")
     assert response.status_code == 200
     assert "related" in response.json()
+
+def test_recommend_is_cached_per_normalized_persona(monkeypatch):
+    from src import api
+    calls = []
+
+    def fake_explain(persona, qloo_data, mode="default"):
+        calls.append(persona)
+        return "Event: KubeCon. Tool: Argo CD. CI/CD: GitOps. Security: Zero Trust."
+
+    monkeypatch.setattr(api, "explain_with_qloo", fake_explain)
+    api.recommend_cache.clear()
+    first = client.get("/recommend", params={"q": "SRE in Tokyo"}).json()
+    second = client.get("/recommend", params={"q": "  sre in tokyo"}).json()
+    debug = client.get("/recommend", params={"q": "sre in tokyo", "debug": "true"}).json()
+    assert first == second
+    assert "qloo_data" in debug
+    assert len(calls) == 2
+
+
+def test_recommend_does_not_cache_answers_built_on_mock_fallback_data(monkeypatch):
+    from src import api, qloo_handler
+    calls = []
+
+    def fake_explain(persona, qloo_data, mode="default"):
+        calls.append(persona)
+        return "Event: KubeCon. Tool: Argo CD. CI/CD: GitOps. Security: Zero Trust."
+
+    async def qloo_down(topic, entity_type="person", mode="default"):
+        return qloo_handler.get_qloo_profile(topic, entity_type, mode)
+
+    monkeypatch.setattr(api, "explain_with_qloo", fake_explain)
+    monkeypatch.setattr(qloo_handler, "fetch_qloo_profile", qloo_down)
+    monkeypatch.setattr(qloo_handler.client, "api_key", "configured")
+    api.recommend_cache.clear()
+    client.get("/recommend", params={"q": "sre in osaka"})
+    client.get("/recommend", params={"q": "sre in osaka"})
+    assert len(calls) == 2
+
+
+def test_graphql_memory_searches_are_batched_and_paged(monkeypatch):
+    from src import llm_handler, rag_memory
+    memory = rag_memory.RagMemory()
+    for i in range(8):
+        memory.add(f"Prompt: security tip {i}\nResponse: set runAsNonRoot")
+    memory.add("Prompt: limits\nResponse: set resources")
+    batches = []
+    search_many = memory.search_many
+    monkeypatch.setattr(memory, "search_many", lambda queries: batches.append(queries) or search_many(queries))
+    monkeypatch.setattr(llm_handler, "memory", memory)
+    monkeypatch.setattr("src.schema.memory", memory)
+
+    page = "edges { node { prompt } } pageInfo { endCursor hasNextPage }"
+    query = f'''{{
+        a: searchMemory(q: "security", k: 2) {{ prompt }}
+        b: searchMemory(q: "resources", k: 1) {{ prompt }}
+        p: searchMemoryPage(q: "security", first: 5) {{ {page} }}
+    }}'''
+    data = client.post("/graphql", json={"query": query}).json()["data"]
+    assert len(batches) == 1 and len(batches[0]) == 3
+    assert len(data["a"]) == 2 and data["b"] == [{"prompt": "limits"}]
+    assert data["p"]["pageInfo"]["hasNextPage"] is True
+
+    cursor = data["p"]["pageInfo"]["endCursor"]
+    query = f'{{ searchMemoryBatch(queries: [{{q: "security", first: 5, after: "{cursor}"}}, {{q: "resources"}}]) {{ query {page} }} }}'
+    first, second = client.post("/graphql", json={"query": query}).json()["data"]["searchMemoryBatch"]
+    assert len(batches) == 2
+    seen = {edge["node"]["prompt"] for edge in data["p"]["edges"]}
+    rest = {edge["node"]["prompt"] for edge in first["edges"]}
+    assert len(rest) == 3 and not seen & rest
+    assert first["pageInfo"]["hasNextPage"] is False
+    assert second["query"] == "resources"
+
+
+
+def test_graphql_rejects_out_of_range_cursors_and_oversized_batches(monkeypatch):
+    from src import rag_memory, schema
+    memory = rag_memory.RagMemory()
+    memory.add("Prompt: security tip\nResponse: set runAsNonRoot")
+    monkeypatch.setattr(schema, "memory", memory)
+    monkeypatch.setattr(schema, "MEMORY_BATCH_MAX", 2)
+
+    for offset in (-5, 1, 10 ** 9):
+        cursor = schema.encode_cursor(offset)
+        body = client.post("/graphql", json={"query": f'{{ searchMemoryPage(q: "x", after: "{cursor}") {{ query }} }}'}).json()
+        assert "Invalid cursor" in body["errors"][0]["message"]
+    cursor = schema.encode_cursor(0)
+    body = client.post("/graphql", json={"query": f'{{ searchMemoryPage(q: "x", after: "{cursor}") {{ query }} }}'}).json()
+    assert body["data"]["searchMemoryPage"]["query"] == "x"
+
+    batch = ", ".join('{q: "x"}' for _ in range(3))
+    body = client.post("/graphql", json={"query": f"{{ searchMemoryBatch(queries: [{batch}]) {{ query }} }}"}).json()
+    assert "At most 2 queries" in body["errors"][0]["message"]
+
+def test_memory_stats_and_metrics():
+    stats = client.get("/memory/stats").json()
+    assert {"entries", "bytes", "sources", "retention", "compactions"} <= set(stats)
+    assert "genkube_memory_reclaimed_bytes_total" in client.get("/metrics").text
+
+
+def test_manifest_snapshots_keep_only_valid_explanations(monkeypatch):
+    from src import api, llm_handler
+
+    monkeypatch.setattr(api.limiter, "enabled", False)
+    calls = []
+
+    def explain(issue):
+        calls.append(issue)
+        if len(calls) == 1:
+            return f"**Issue**: {issue}\n**Why it’s a problem**: Explanation service failed\n**How to fix it**: later"
+        return "We recommend setting securityContext and resources on all containers."
+    monkeypatch.setattr(llm_handler, "explain", explain)
+
+    def analyze():
+        with open("k8s/sample_deployment.yaml", "rb") as f:
+            return client.post("/analyze?engine=native&manifest_id=fallback-test", files={"file": f}).json()
+
+    first = analyze()
+    assert first["changed_documents"] == [0] and len(calls) == len(first["issues"])
+    second = analyze()
+    # Only the issue whose explanation was a fallback is explained again.
+    assert second["changed_documents"] == [0] and calls[len(first["issues"]):] == [calls[0]]
+    third = analyze()
+    assert third["reused_documents"] == [0] and len(calls) == len(first["issues"]) + 1
@@ -0,0 +1,153 @@
+import asyncio
+import io
+import json
+import tarfile
+import zipfile
+
+import pytest
+import yaml
+
+from src import batch_analyzer
+
+SAMPLES = ["k8s/sample_deployment.yaml", "k8s/secure_deployment.yaml", "k8s/broken_yaml.yaml"]
+
+
+def _tar_of(paths):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+        for i, path in enumerate(paths):
+            tar.add(path, arcname=f"repo/{i}-{path.split('/')[-1]}")
+    buf.seek(0)
+    return buf
+
+
+def _run(items, **kwargs):
+    async def collect():
+        return [json.loads(line) async for line in batch_analyzer.analyze_batch(items, **kwargs)]
+    return asyncio.run(collect())
+
+
+def test_batch_streams_one_line_per_file_and_a_summary(fake_linter, monkeypatch):
+    monkeypatch.setattr(batch_analyzer, "BATCH_CHUNK_FILES", 2)
+    archive = _tar_of(SAMPLES * 3)
+    assert batch_analyzer.is_archive(archive)
+
+    lines = _run(batch_analyzer.iter_archive(archive))
+    results, summary = lines[:-1], lines[-1]["summary"]
+
+    assert [r["file"] for r in results] == [f"repo/{i}-{p.split('/')[-1]}" for i, p in enumerate(SAMPLES * 3)]
+    assert summary["files"] == 9
+    sample = results[0]
+    assert any("run-as-non-root" in issue for issue in sample["issues"])
+    assert results[2]["error"] == "Invalid or unparseable YAML."
+
+
+def test_batch_explains_each_distinct_issue_once(monkeypatch):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as archive:
+        for i in range(5):
+            archive.write("k8s/sample_deployment.yaml", f"app-{i}.yaml")
+    buf.seek(0)
+
+    calls = []
+
+    def fake_explain(issue):
+        calls.append(issue)
+        return "explained"
+
+    lines = _run(batch_analyzer.iter_archive(buf), engine="native", explain_fn=fake_explain)
+    per_file = len(lines[0]["issues"])
+    assert all(r["explanations"] == ["explained"] * per_file for r in lines[:-1])
+    assert len(calls) == per_file
+    assert lines[-1]["summary"]["unique_issues_explained"] == per_file
+
+
+def test_lint_incrementally_keeps_document_order(monkeypatch):
+    monkeypatch.setattr(batch_analyzer, "STREAM_CHUNK_DOCS", 1)
+    with open("k8s/sample_deployment.yaml", encoding="utf-8") as f:
+        text = f.read()
+    docs = yaml.safe_load_all("---\n".join([text.replace("sample-app", f"app-{i}") for i in range(3)]))
+
+    results = asyncio.run(
+        batch_analyzer.lint_incrementally(docs, engine="native", explain_fn=lambda issue: issue.upper())
+    )
+    assert [doc["hash"] for doc in results] == [None] * 3
+    for i, doc in enumerate(results):
+        assert doc["issues"] and all(f"/app-{i} " in issue for issue in doc["issues"])
+        assert doc["explanations"] == [issue.upper() for issue in doc["issues"]]
+
+
+def test_lint_incrementally_lints_cross_object_checks_over_the_whole_manifest(fake_linter, monkeypatch):
+    monkeypatch.setattr(batch_analyzer, "STREAM_CHUNK_DOCS", 25)
+    service = {"apiVersion": "v1", "kind": "Service", "metadata": {"name": "web"}, "spec": {"selector": {"app": "web"}}}
+    filler = [{"apiVersion": "v1", "kind": "ConfigMap", "metadata": {"name": f"cm-{i}"}} for i in range(30)]
+    deployment = {
+        "apiVersion": "apps/v1",
+        "kind": "Deployment",
+        "metadata": {"name": "web"},
+        "spec": {"template": {
+            "metadata": {"labels": {"app": "web"}},
+            "spec": {"containers": [{"name": "web", "image": "web:1.0", "securityContext": {"runAsNonRoot": True}}]},
+        }},
+    }
+    orphan = dict(service, metadata={"name": "orphan"}, spec={"selector": {"app": "gone"}})
+
+    results = asyncio.run(batch_analyzer.lint_incrementally(iter([service, *filler, deployment, orphan])))
+    issues = [issue for doc in results for issue in doc["issues"]]
+    assert len(issues) == 1 and "/orphan Service" in issues[0] and "dangling-service" in issues[0]
+
+
+def test_changed_documents_are_linted_with_the_unchanged_ones(fake_linter):
+    service = {"apiVersion": "v1", "kind": "Service", "metadata": {"name": "web"}, "spec": {"selector": {"app": "web"}}}
+    deployment = {
+        "apiVersion": "apps/v1",
+        "kind": "Deployment",
+        "metadata": {"name": "web"},
+        "spec": {"template": {
+            "metadata": {"labels": {"app": "web"}},
+            "spec": {"containers": [{"name": "web", "image": "web:1.0", "securityContext": {"runAsNonRoot": True}}]},
+        }},
+    }
+    first = asyncio.run(batch_analyzer.lint_incrementally([deployment, service], previous={}))
+    previous = {doc["hash"]: {"issues": doc["issues"], "explanations": {}} for doc in first}
+
+    changed = dict(service, metadata={"name": "web", "labels": {"tier": "front"}})
+    second = asyncio.run(batch_analyzer.lint_incrementally([deployment, changed], previous=previous))
+    assert [doc["reused"] for doc in second] == [True, False]
+    assert [doc["issues"] for doc in second] == [[], []]
+
+
+def test_lint_incrementally_propagates_parse_errors():
+    docs = yaml.safe_load_all("kind: Deployment\n---\nkind: [\n")
+    with pytest.raises(yaml.YAMLError):
+        asyncio.run(batch_analyzer.lint_incrementally(docs, engine="native"))
+
+
+def _deployments(count):
+    with open("k8s/sample_deployment.yaml", encoding="utf-8") as f:
+        text = f.read()
+    return list(yaml.safe_load_all("---\n".join(text.replace("sample-app", f"app-{i}") for i in range(count))))
+
+
+def test_lint_incrementally_relints_everything_but_reuses_explanations():
+    docs = _deployments(3)
+    calls = []
+
+    def explain(issue):
+        calls.append(issue)
+        return f"explained {issue}"
+
+    first = asyncio.run(batch_analyzer.lint_incrementally(docs, engine="native", explain_fn=explain, previous={}))
+    assert not any(doc["reused"] for doc in first)
+    assert calls == [issue for doc in first for issue in doc["issues"]]
+
+    previous = {
+        doc["hash"]: {"issues": ["stale"], "explanations": dict(zip(doc["issues"], doc["explanations"]))}
+        for doc in first[:2]
+    }
+    calls.clear()
+    second = asyncio.run(batch_analyzer.lint_incrementally(docs, engine="native", explain_fn=explain, previous=previous))
+    assert [doc["reused"] for doc in second] == [True, True, False]
+    assert [doc["issues"] for doc in second] == [doc["issues"] for doc in first]
+    assert [doc["explanations"] for doc in second] == [doc["explanations"] for doc in first]
+    assert calls == first[2]["issues"] and [doc["explained"] for doc in second] == [0, 0, len(calls)]
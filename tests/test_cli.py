@@ -0,0 +1,109 @@
+import json
+import shutil
+import subprocess
+import sys
+
+import yaml
+
+from src import cli
+
+SAMPLES = ["k8s/sample_deployment.yaml", "k8s/secure_deployment.yaml", "k8s/broken_yaml.yaml"]
+
+
+def _repo(tmp_path):
+    for i, path in enumerate(SAMPLES * 2):
+        target = tmp_path / "repo" / f"team{i % 2}" / f"{i}-{path.split('/')[-1]}"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(path, target)
+    (tmp_path / "repo" / "README.md").write_text("not a manifest")
+    (tmp_path / "repo" / ".git").mkdir()
+    shutil.copy(SAMPLES[0], tmp_path / "repo" / ".git" / "ignored.yaml")
+    return tmp_path / "repo"
+
+
+def test_collect_files_finds_manifests_only(tmp_path):
+    files = cli.collect_files([str(_repo(tmp_path)), "k8s/statefulset.yaml", "missing.yaml"])
+    assert len(files) == 7
+    assert all(f.endswith(".yaml") and ".git" not in f for f in files)
+
+
+def test_scan_keeps_file_order_across_worker_processes(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, "SCAN_CHUNK_FILES", 2)
+    files = cli.collect_files([str(_repo(tmp_path))])
+    results = cli.scan(files, engine="native", workers=2)
+    assert [r["file"] for r in results] == files
+    broken = [r for r in results if "broken_yaml" in r["file"]]
+    assert all(r["error"] == "Invalid or unparseable YAML." for r in broken)
+    sample = next(r for r in results if "sample_deployment" in r["file"])
+    assert "run-as-non-root" in {issue.check for issue in sample["issues"]}
+
+
+def test_sarif_report_and_patched_copies(tmp_path, monkeypatch):
+    repo = _repo(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    output = tmp_path / "scan.sarif"
+    code = cli.main([
+        "scan", str(repo), "--engine", "native", "--no-llm", "--format", "sarif",
+        "--output", str(output), "--patch-dir", "patched",
+    ])
+    assert code == 1
+
+    run = json.loads(output.read_text())["runs"][0]
+    assert run["properties"]["files"] == 6
+    assert run["properties"]["errors"] == 2
+    assert {rule["id"] for rule in run["tool"]["driver"]["rules"]} >= {"run-as-non-root", "latest-tag"}
+    first = run["results"][0]
+    assert first["locations"][0]["physicalLocation"]["artifactLocation"]["uri"].endswith(".yaml")
+    assert first["properties"]["explanation"]
+
+    patched = tmp_path / "patched" / "team0" / "0-sample_deployment.yaml"
+    container = yaml.safe_load(patched.read_text())["spec"]["template"]["spec"]["containers"][0]
+    assert container["securityContext"]["runAsNonRoot"] is True
+
+
+
+def test_each_directory_is_linted_whole_however_files_are_chunked(tmp_path, monkeypatch, fake_linter):
+    monkeypatch.setattr(cli, "SCAN_CHUNK_FILES", 1)
+    app = tmp_path / "app"
+    app.mkdir()
+    pod = {"securityContext": {"runAsNonRoot": True}, "containers": [{"name": "web", "image": "web:1.0"}]}
+    (app / "deployment.yaml").write_text(yaml.safe_dump({
+        "apiVersion": "apps/v1", "kind": "Deployment", "metadata": {"name": "web"},
+        "spec": {"template": {"metadata": {"labels": {"app": "web"}}, "spec": pod}},
+    }))
+    (app / "service.yaml").write_text(yaml.safe_dump({
+        "apiVersion": "v1", "kind": "Service", "metadata": {"name": "web"}, "spec": {"selector": {"app": "web"}},
+    }))
+    (tmp_path / "other").mkdir()
+    shutil.copy(app / "service.yaml", tmp_path / "other" / "service.yaml")
+
+    results = cli.scan(cli.collect_files([str(tmp_path)]), workers=1)
+    dangling = {r["file"] for r in results for issue in r["issues"] if issue.check == "dangling-service"}
+    assert dangling == {str(tmp_path / "other" / "service.yaml")}
+
+
+def test_patched_copies_of_same_named_files_do_not_collide(tmp_path):
+    for team in ("a", "b"):
+        (tmp_path / team).mkdir()
+        shutil.copy(SAMPLES[0], tmp_path / team / "app.yaml")
+    paths = [str(tmp_path / "a" / "app.yaml"), str(tmp_path / "b" / "app.yaml")]
+    cli.main(["scan", *paths, "--engine", "native", "--no-llm", "-o", str(tmp_path / "out.json"),
+              "--patch-dir", str(tmp_path / "patched")])
+    assert (tmp_path / "patched" / "a" / "app.yaml").exists()
+    assert (tmp_path / "patched" / "b" / "app.yaml").exists()
+
+def test_no_llm_scan_does_not_load_the_embedding_model(tmp_path):
+    code = (
+        "import sys, runpy\n"
+        "sys.argv = ['main.py', 'scan', 'k8s/sample_deployment.yaml', '--engine', 'native', '--no-llm', '--exit-zero',"
+        f" '-o', {str(tmp_path / 'out.json')!r}]\n"
+        "try:\n"
+        "    runpy.run_path('main.py', run_name='__main__')\n"
+        "except SystemExit as e:\n"
+        "    assert e.code == 0\n"
+        "print(sorted(m for m in ('src.api', 'src.llm_handler', 'sentence_transformers') if m in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
+    assert json.loads((tmp_path / "out.json").read_text())["summary"]["issues"] > 0
@@ -0,0 +1,141 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import batch_analyzer, cost_limiter, llm_handler
+from src.cache import LRUCache
+from src.cost_limiter import BudgetExceeded, CostLimiter
+
+SAMPLE = "k8s/sample_deployment.yaml"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cost_limiter.time, "time", lambda: now[0])
+    return now
+
+
+def test_bucket_is_shared_through_the_store_and_reports_the_exact_wait(tmp_path, clock):
+    path = str(tmp_path / "ratelimit.db")
+    worker_a = CostLimiter(path=path, per_minute=60, burst=10, enabled=True)
+    worker_b = CostLimiter(path=path, per_minute=60, burst=10, enabled=True)
+
+    worker_a.take("1.2.3.4", 6)
+    worker_b.take("1.2.3.4", 3)
+    with pytest.raises(BudgetExceeded) as exc:
+        worker_a.take("1.2.3.4", 4)
+    assert exc.value.retry_after == pytest.approx(3.0)
+    assert worker_b.balance("1.2.3.4") == pytest.approx(1.0)
+    worker_b.take("5.6.7.8", 10)
+
+    clock[0] += 3
+    worker_b.take("1.2.3.4", 4)
+    assert worker_a.balance("1.2.3.4") == pytest.approx(0.0)
+
+
+def test_costs_above_burst_need_a_full_bucket_and_leave_the_whole_debt(tmp_path, clock):
+    limiter = CostLimiter(path=str(tmp_path / "ratelimit.db"), per_minute=60, burst=10, enabled=True)
+    limiter.take("c", 50)
+    assert limiter.balance("c") == -40
+    with pytest.raises(BudgetExceeded) as exc:
+        limiter.take("c", 1)
+    assert exc.value.retry_after == pytest.approx(41.0)
+    clock[0] += 41
+    limiter.take("c", 1)
+
+
+def test_metered_calls_stop_once_the_budget_runs_out(tmp_path, clock, monkeypatch):
+    limiter = CostLimiter(path=str(tmp_path / "ratelimit.db"), per_minute=60, burst=2, enabled=True)
+    spends = []
+    spend = limiter._spend
+    monkeypatch.setattr(limiter, "_spend", lambda *args: spends.append(args) or spend(*args))
+    explain = limiter.metered("c", lambda issue: issue.upper(), free=lambda issue: issue == "cached")
+
+    assert explain("a") == "A" and explain("b") == "B"
+    for issue in ("c", "d"):
+        with pytest.raises(BudgetExceeded):
+            explain(issue)
+    assert len(spends) == 3
+    assert explain("cached") == "CACHED"
+
+
+def test_units_follow_prompt_size():
+    assert cost_limiter.units_for_text("") == 1
+    assert cost_limiter.units_for_text("x" * 4 * cost_limiter.LLM_BUDGET_TOKENS_PER_UNIT * 3 + "x") == 4
+
+
+@pytest.fixture
+def api_budget(tmp_path, monkeypatch):
+    from src import api
+
+    def install(**kwargs):
+        limiter = CostLimiter(path=str(tmp_path / "ratelimit.db"), enabled=True, **kwargs)
+        monkeypatch.setattr(api, "budget", limiter)
+        return limiter
+    monkeypatch.setattr(api.limiter, "enabled", False)
+    monkeypatch.setattr(llm_handler, "explain_cache", LRUCache(maxsize=64, name="explain"))
+    monkeypatch.setattr(llm_handler, "explain", lambda issue: "**Issue**: stub")
+    return api, install
+
+
+def _analyze(client):
+    with open(SAMPLE, "rb") as f:
+        return client.post("/analyze?engine=native", files={"file": f})
+
+
+def test_analyze_takes_one_unit_per_issue_before_explaining_and_answers_429(api_budget, monkeypatch):
+    api, install = api_budget
+    limiter = install(per_minute=6, burst=4)
+    client = TestClient(api.app)
+
+    first = _analyze(client)
+    issues = len(set(first.json()["issues"]))
+    assert issues > 4
+    assert limiter.balance("testclient") == pytest.approx(4 - issues, abs=0.1)
+
+    explained = []
+    monkeypatch.setattr(llm_handler, "explain", lambda issue: explained.append(issue) or "**Issue**: stub")
+    second = _analyze(client)
+    assert second.status_code == 429 and not explained
+    assert second.json()["error"] == "Rate limit exceeded. Try again later."
+    wait = (4 - limiter.balance("testclient")) * 10
+    assert int(second.headers["Retry-After"]) == pytest.approx(wait, abs=1)
+
+
+def test_cached_explanations_are_not_billed(api_budget, clock):
+    api, install = api_budget
+    limiter = install(per_minute=60, burst=100)
+    client = TestClient(api.app)
+
+    issues = _analyze(client).json()["issues"]
+    balance = limiter.balance("testclient")
+    assert balance < 100
+    for issue in issues:
+        llm_handler.explain_cache.set((llm_handler.prompt_registry.version, issue.strip()), "cached")
+    assert _analyze(client).status_code == 200
+    assert limiter.balance("testclient") == balance
+
+
+def test_batch_explanations_stop_when_the_budget_runs_out(api_budget):
+    api, install = api_budget
+    install(per_minute=6, burst=1)
+    client = TestClient(api.app)
+    with open(SAMPLE, "rb") as f:
+        response = client.post("/analyze-batch?engine=native&explain=true", files={"files": ("a.yaml", f)})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    explanations = lines[0]["explanations"]
+    assert explanations.count(batch_analyzer.BUDGET_EXCEEDED_EXPLANATION) == len(explanations) - 1
+    assert lines[-1]["summary"]["unique_issues_explained"] == 1
+
+
+def test_analyze_job_takes_its_budget_before_explaining(api_budget, monkeypatch):
+    api, install = api_budget
+    install(per_minute=6, burst=4).take("c", 4)
+    explained = []
+    monkeypatch.setattr(llm_handler, "explain", lambda issue: explained.append(issue) or "**Issue**: stub")
+    with open(SAMPLE, "rb") as f:
+        result = api._analyze_job(f.read(), {"engine": "native", "client": "c"})
+    assert result["error"] == "Rate limit exceeded. Try again later." and result["retry_after"] > 0
+    assert result["issues"] and not explained
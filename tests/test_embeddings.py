@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from src import embeddings
+from src.rag_memory import RagMemory
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    embedder = embeddings.HashingEmbedder(dim=64)
+    a, b, c = embedder.encode([
+        "Container is running as root user",
+        "container running as root",
+        "CPU limits are not set",
+    ])
+    assert embedder.encode(["Container is running as root user"])[0] == pytest.approx(a)
+    assert np.linalg.norm(a) == pytest.approx(1.0)
+    assert a @ b > a @ c
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        embeddings.get_backend("word2vec")
+
+
+class CountingEmbedder(embeddings.HashingEmbedder):
+    def __init__(self, dim=32):
+        super().__init__(dim)
+        self.encoded = 0
+
+    def encode(self, texts):
+        self.encoded += len(texts)
+        return super().encode(texts)
+
+
+def test_snapshot_is_reused_for_the_same_backend_and_rebuilt_otherwise(tmp_path):
+    path = str(tmp_path / "memory.pkl")
+    memory = RagMemory(backend=embeddings.HashingEmbedder(dim=32))
+    memory.add("Prompt: runAsNonRoot\nResponse: set securityContext")
+    memory.add("Prompt: limits\nResponse: set resources")
+    memory.save(path)
+
+    same = RagMemory(backend=CountingEmbedder(dim=32))
+    same.load(path)
+    assert same.backend.encoded == 0
+    assert same.index.ntotal == 2
+
+    other = RagMemory(backend=CountingEmbedder(dim=16))
+    other.load(path)
+    assert other.backend.encoded == 2
+    assert other.index.d == 16
+    assert other.search("resources", k=1) == ["Prompt: limits\nResponse: set resources"]
@@ -0,0 +1,81 @@
+import time
+
+from src.job_queue import JobQueue
+
+
+def _queue(tmp_path, **kwargs):
+    queue = JobQueue(path=str(tmp_path / "jobs.db"), workers=1, **kwargs)
+    queue.register("echo", lambda payload, params: {"echo": payload.decode(), **params})
+    return queue
+
+
+def test_job_runs_and_result_is_pollable(tmp_path):
+    queue = _queue(tmp_path)
+    job_id = queue.submit("echo", {"persona": "sre"}, b"kind: Service")
+    assert queue.get(job_id)["status"] == "queued"
+
+    assert queue.run_one()
+    job = queue.get(job_id)
+    assert job["status"] == "done"
+    assert job["result"] == {"echo": "kind: Service", "persona": "sre"}
+
+
+def test_failed_job_reports_error(tmp_path):
+    queue = _queue(tmp_path)
+    queue.register("boom", lambda payload, params: 1 / 0)
+    job_id = queue.submit("boom")
+    queue.run_one()
+    assert queue.get(job_id)["status"] == "failed"
+    assert "division" in queue.get(job_id)["error"]
+
+
+def test_jobs_survive_restart_and_results_expire(tmp_path):
+    queue = _queue(tmp_path, result_ttl=0, lease_seconds=0.05)
+    job_id = queue.submit("echo", {}, b"x")
+    assert queue.claim()["id"] == job_id  # worker dies while running it
+
+    restarted = _queue(tmp_path, result_ttl=0)
+    time.sleep(0.1)
+    assert restarted.requeue_expired() == 1
+    assert restarted.run_one()
+    time.sleep(0.01)
+    assert restarted.get(job_id) is None
+    assert restarted.purge_expired() == 1
+
+
+def test_jobs_leased_by_a_live_worker_are_not_run_twice(tmp_path):
+    busy = _queue(tmp_path, lease_seconds=0.2)
+    job_id = busy.submit("echo", {}, b"x")
+    assert busy.claim()["id"] == job_id
+
+    other = _queue(tmp_path)
+    other.start()  # another uvicorn worker starting up
+    try:
+        for _ in range(3):
+            time.sleep(0.1)
+            assert busy.renew_leases() == 1
+        assert other.requeue_expired() == 0
+        assert other.get(job_id)["status"] == "running"
+    finally:
+        other.stop()
+
+    # A result from a worker that lost its lease does not overwrite the new owner's.
+    time.sleep(0.3)
+    assert other.requeue_expired() == 1
+    assert other.run_one()
+    busy._finish(job_id, "failed", error="late")
+    assert other.get(job_id)["status"] == "done"
+
+
+def test_worker_threads_process_queue(tmp_path):
+    queue = _queue(tmp_path)
+    queue.start()
+    try:
+        job_id = queue.submit("echo", {}, b"hello")
+        for _ in range(100):
+            if queue.get(job_id)["status"] == "done":
+                break
+            time.sleep(0.05)
+        assert queue.get(job_id)["result"] == {"echo": "hello"}
+    finally:
+        queue.stop()
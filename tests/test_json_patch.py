@@ -0,0 +1,28 @@
+import copy
+
+import yaml
+
+from src import json_patch, llm_handler
+
+
+def test_diff_of_patched_deployment_round_trips():
+    with open("k8s/sample_deployment.yaml", encoding="utf-8") as f:
+        original = yaml.safe_load(f)
+    patched = llm_handler.patch_document(copy.deepcopy(original))
+
+    ops = json_patch.diff(original, patched)
+    assert {op["op"] for op in ops} == {"add"}
+    assert all(op["path"].startswith("/spec/template/spec/containers/0/") for op in ops)
+    assert json_patch.apply(original, ops) == patched
+
+
+def test_diff_escapes_pointers_and_replaces_resized_lists():
+    old = {"metadata": {"annotations": {"a/b~c": "1", "gone": "x"}}, "items": [1, 2]}
+    new = {"metadata": {"annotations": {"a/b~c": "2"}}, "items": [1, 2, 3]}
+
+    ops = json_patch.diff(old, new)
+    assert {"op": "replace", "path": "/metadata/annotations/a~1b~0c", "value": "2"} in ops
+    assert {"op": "remove", "path": "/metadata/annotations/gone"} in ops
+    assert {"op": "replace", "path": "/items", "value": [1, 2, 3]} in ops
+    assert json_patch.apply(old, ops) == new
+    assert json_patch.diff(new, new) == []
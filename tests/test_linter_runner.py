@@ -0,0 +1,116 @@
+import os
+
+import pytest
+
+from src import linter_runner
+from src.lint_cache import LintCache
+
+
+def test_lint_issues_are_typed(fake_linter):
+    with open("k8s/sample_deployment.yaml", "rb") as f:
+        issues = linter_runner.lint_issues(f.read())
+
+    checks = {issue.check for issue in issues}
+    assert {"run-as-non-root", "latest-tag"} <= checks
+    issue = next(i for i in issues if i.check == "latest-tag")
+    assert issue.object_name == "sample-app"
+    assert issue.object_kind == "Deployment"
+    assert issue.remediation
+    assert "(check: latest-tag" in str(issue)
+
+
+def test_run_kube_linter_reports_no_issues(fake_linter):
+    with open("k8s/secure_deployment.yaml", "rb") as f:
+        assert linter_runner.run_kube_linter(f.read()) == [linter_runner.NO_ISSUES_MESSAGE]
+
+
+def test_run_kube_linter_via_tmpdir(fake_linter, monkeypatch, tmp_path):
+    monkeypatch.setattr(linter_runner, "KUBE_LINTER_TMPDIR", str(tmp_path))
+    with open("k8s/sample_deployment.yaml", "rb") as f:
+        issues = linter_runner.run_kube_linter(f.read())
+    assert any("run-as-non-root" in issue for issue in issues)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_parse_report_rejects_garbage():
+    with pytest.raises(linter_runner.LintError):
+        linter_runner.parse_report("sample.yaml: not json")
+
+
+def _two_deployments(image_a="nginx", image_b="redis"):
+    return f"""
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: app-a
+spec:
+  template:
+    spec:
+      containers:
+      - name: a
+        image: {image_a}
+---
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: app-b
+spec:
+  template:
+    spec:
+      containers:
+      - name: b
+        image: {image_b}
+""".encode("utf-8")
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch, tmp_path):
+    cache = LintCache(maxsize=64, path=str(tmp_path / "lint-cache.json"))
+    monkeypatch.setattr(linter_runner, "lint_cache", cache)
+    linted = []
+    real_lint_issues = linter_runner.lint_issues
+
+    def counting_lint_issues(yaml_bytes, extra_args=None):
+        linted.append(yaml_bytes.decode("utf-8"))
+        return real_lint_issues(yaml_bytes, extra_args)
+
+    monkeypatch.setattr(linter_runner, "lint_issues", counting_lint_issues)
+    return cache, linted
+
+
+def test_lint_cache_serves_unchanged_manifests_and_relints_changed_ones_whole(fake_linter, fresh_cache):
+    cache, linted = fresh_cache
+    first = linter_runner.run_kube_linter(_two_deployments())
+    assert len(linted) == 1
+
+    assert linter_runner.run_kube_linter(_two_deployments()) == first
+    assert len(linted) == 1
+
+    # app-a is unchanged but is linted again with app-b, so cross-object checks see both.
+    changed = linter_runner.run_kube_linter(_two_deployments(image_b="redis:7"))
+    assert len(linted) == 2
+    assert "app-b" in linted[-1] and "app-a" in linted[-1]
+    # Results come back in document order: app-a's issues before app-b's.
+    assert "app-a" in changed[0]
+    assert not any("latest-tag" in issue and "app-b" in issue for issue in changed)
+    assert cache.stats()["hits"] == 2
+
+
+def test_lint_cache_persists_to_disk(fake_linter, fresh_cache):
+    cache, linted = fresh_cache
+    linter_runner.run_kube_linter(_two_deployments())
+
+    reloaded = LintCache(maxsize=64, path=cache.path)
+    assert len(reloaded.entries) == 2
+
+
+def test_lint_cache_writes_at_most_once_per_interval_and_flushes_the_rest(fake_linter, fresh_cache):
+    cache, linted = fresh_cache
+    cache.save_interval = 3600
+    linter_runner.run_kube_linter(_two_deployments())
+    linter_runner.run_kube_linter(_two_deployments(image_b="redis:7"))
+    assert len(LintCache(maxsize=64, path=cache.path).entries) == 2
+
+    cache.flush()
+    assert len(LintCache(maxsize=64, path=cache.path).entries) == 4
+    assert os.listdir(os.path.dirname(cache.path)) == ["lint-cache.json"]
@@ -40,3 +40,13 @@ def test_persona_suggestion_junior_style():
     assert isinstance(result, str)
     assert "hi there" in result.lower()
     assert "let's make this yaml even better" in result.lower()
+
+
+def test_explain_survives_missing_template(monkeypatch):
+    def missing(*args, **kwargs):
+        raise KeyError("explain.txt")
+
+    monkeypatch.setattr(llm_handler.prompt_registry, "render", missing)
+    explanation = llm_handler.explain("latest-tag")
+    assert "latest-tag" in explanation
+    assert "Explanation service failed" in explanation
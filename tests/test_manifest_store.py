@@ -0,0 +1,22 @@
+from src.manifest_store import ManifestStore, normalize_manifest_id
+
+
+def test_snapshot_is_reused_only_in_the_same_context(tmp_path):
+    store = ManifestStore(path=str(tmp_path / "manifests.db"))
+    store.save("ci/app", "analyze", "native|v1", {"abc": {"issues": [], "explanations": []}})
+
+    assert store.load("ci/app", "analyze", "native|v1") == {"abc": {"issues": [], "explanations": []}}
+    assert store.load("ci/app", "analyze", "native|v2") == {}
+    assert store.load("ci/other", "analyze", "native|v1") == {}
+
+
+def test_expired_snapshots_are_ignored(tmp_path):
+    store = ManifestStore(path=str(tmp_path / "manifests.db"), ttl=-1)
+    store.save("ci/app", "suggest", "ctx", {"content": "x"})
+    assert store.load("ci/app", "suggest", "ctx") == {}
+
+
+def test_manifest_ids_are_trimmed_and_bounded():
+    assert normalize_manifest_id("  ci/app ") == "ci/app"
+    assert normalize_manifest_id(None) == ""
+    assert normalize_manifest_id("x" * 500) == ""
@@ -0,0 +1,38 @@
+from src import metrics
+from src.cache import LRUCache
+
+
+def test_histogram_buckets_are_cumulative():
+    hist = metrics.Histogram("test_seconds", "Test.", buckets=(0.1, 1))
+    hist.observe(0.05, stage="a")
+    hist.observe(0.5, stage="a")
+    hist.observe(5, stage="a")
+    lines = hist.render()
+    assert 'test_seconds_bucket{le="0.1",stage="a"} 1' in lines
+    assert 'test_seconds_bucket{le="1",stage="a"} 2' in lines
+    assert 'test_seconds_bucket{le="+Inf",stage="a"} 3' in lines
+    assert 'test_seconds_count{stage="a"} 3' in lines
+
+
+def test_timed_records_stage_even_on_error():
+    try:
+        with metrics.timed("test_stage"):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+    assert 'genkube_stage_seconds_count{stage="test_stage"} 1' in metrics.render()
+
+
+def test_render_includes_counters_and_cache_stats():
+    cache = LRUCache(maxsize=4, name="test_cache")
+    cache.set("k", "v")
+    cache.get("k")
+    cache.get("missing")
+    metrics.register_cache(cache)
+    metrics.llm_fallbacks.inc(function="test_fn", reason="invalid")
+
+    text = metrics.render()
+    assert 'genkube_llm_fallbacks_total{function="test_fn",reason="invalid"} 1' in text
+    assert 'genkube_cache_hits_total{cache="test_cache"} 1' in text
+    assert 'genkube_cache_misses_total{cache="test_cache"} 1' in text
+    assert 'genkube_cache_hit_ratio{cache="test_cache"} 0.5000' in text
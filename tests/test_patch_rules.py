@@ -0,0 +1,73 @@
+import pytest
+import yaml
+
+from src.patch_rules import PatchEngine
+
+MANIFESTS = """
+apiVersion: batch/v1
+kind: CronJob
+metadata: {name: nightly, namespace: batch}
+spec:
+  jobTemplate:
+    spec:
+      template:
+        spec:
+          initContainers: [{name: migrate, image: tool:1.0}]
+          containers: [{name: run, image: job:1.0}]
+---
+apiVersion: v1
+kind: Pod
+metadata: {name: debug, namespace: legacy}
+spec:
+  containers: [{name: shell, image: busybox:1.36, securityContext: {privileged: false}}]
+---
+apiVersion: apps/v1
+kind: DaemonSet
+metadata: {name: agent}
+spec:
+  template:
+    spec:
+      containers: [{name: agent, image: agent:2.0}]
+---
+apiVersion: v1
+kind: Service
+metadata: {name: web}
+spec: {ports: [{port: 80}]}
+"""
+
+BATCH_RESOURCES = {"limits": {"cpu": "2", "memory": "4Gi"}, "requests": {"cpu": "1", "memory": "2Gi"}}
+
+
+def _docs():
+    return list(yaml.safe_load_all(MANIFESTS))
+
+
+def test_every_workload_kind_and_init_containers_are_patched():
+    cron, pod, daemonset, service = docs = _docs()
+    engine = PatchEngine()
+    assert [engine.patch(doc) for doc in docs] == [True, True, True, False]
+
+    pod_spec = cron["spec"]["jobTemplate"]["spec"]["template"]["spec"]
+    for container in pod_spec["initContainers"] + pod_spec["containers"]:
+        assert container["securityContext"]["runAsNonRoot"] is True
+        assert container["resources"]["limits"]["memory"] == "512Mi"
+    # Fields that are already set are left alone.
+    assert pod["spec"]["containers"][0]["securityContext"] == {"privileged": False}
+    assert "resources" in daemonset["spec"]["template"]["spec"]["containers"][0]
+    assert service == _docs()[3]
+
+
+def test_namespace_overrides_replace_or_disable_rules():
+    engine = PatchEngine(namespaces={"batch": {"resources": BATCH_RESOURCES}, "legacy": {"resources": False}})
+    cron, pod, daemonset, _ = docs = _docs()
+    for doc in docs:
+        engine.patch(doc)
+
+    assert cron["spec"]["jobTemplate"]["spec"]["template"]["spec"]["containers"][0]["resources"] == BATCH_RESOURCES
+    assert "resources" not in pod["spec"]["containers"][0]
+    assert daemonset["spec"]["template"]["spec"]["containers"][0]["resources"]["limits"]["cpu"] == "250m"
+
+
+def test_unknown_rule_names_are_rejected():
+    with pytest.raises(ValueError):
+        PatchEngine(defaults={"resorces": {}})
@@ -0,0 +1,61 @@
+import threading
+
+from src import profiler
+
+
+def _busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sample_reports_collapsed_stacks_of_busy_threads():
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop,), name="busy-worker")
+    worker.start()
+    try:
+        stacks = profiler.collapsed(profiler.sample(0.2, interval=0.005))
+    finally:
+        stop.set()
+        worker.join()
+
+    busy = [line for line in stacks.splitlines() if line.startswith("busy-worker;")]
+    assert busy and "_busy_loop (test_profiler.py:" in busy[0]
+    assert int(busy[0].rsplit(" ", 1)[1]) > 0
+
+
+def test_admin_surface_is_disabled_without_token(monkeypatch):
+    monkeypatch.setattr(profiler, "ADMIN_TOKEN", "")
+    assert not profiler.enabled()
+    assert not profiler.authorized("")
+    monkeypatch.setattr(profiler, "ADMIN_TOKEN", "s3cret")
+    assert profiler.authorized("s3cret")
+    assert not profiler.authorized("wrong")
+
+
+def test_request_profile_covers_executor_threads():
+    def work():
+        return sum(range(10000))
+
+    with profiler.profile_request() as profile:
+        wrapped = profiler.in_thread(work)
+        thread = threading.Thread(target=wrapped)
+        thread.start()
+        thread.join()
+    assert profiler.in_thread(work) is work
+    assert "work" in profile.top()
+
+
+def test_request_profile_leaves_the_calling_thread_out():
+    def mine():
+        return sum(range(10000))
+
+    def executor_work():
+        return sum(range(10000))
+
+    with profiler.profile_request() as profile:
+        mine()
+        thread = threading.Thread(target=profiler.in_thread(executor_work))
+        thread.start()
+        thread.join()
+    assert "executor_work" in profile.top()
+    assert "mine" not in profile.top()
@@ -0,0 +1,132 @@
+from src import prompt_compactor
+
+configmap_yaml = """
+# generated by a tool, please do not edit
+apiVersion: v1
+kind: ConfigMap
+metadata:
+  name: big-config
+  annotations:
+    kubectl.kubernetes.io/last-applied-configuration: "%s"
+data:
+  LOG_LEVEL: debug
+  payload: "%s"
+""" % ("x" * 5000, "y" * 5000)
+
+deployment_yaml = """
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: app-%d
+spec:
+  template:
+    spec:
+      containers:
+      - name: main
+        image: nginx
+"""
+
+
+def test_compaction_strips_comments_and_elides_large_values():
+    compacted = prompt_compactor.compact_yaml(configmap_yaml, budget_tokens=2000)
+    assert "do not edit" not in compacted
+    assert "LOG_LEVEL: debug" in compacted
+    assert "<elided 5000 chars>" in compacted
+    assert "yyyy" not in compacted
+    assert prompt_compactor.estimate_tokens(compacted) < prompt_compactor.estimate_tokens(configmap_yaml)
+
+
+def test_compaction_respects_token_budget():
+    many = "\n---\n".join(deployment_yaml % i for i in range(200))
+    compacted = prompt_compactor.compact_yaml(many, budget_tokens=300)
+    assert prompt_compactor.estimate_tokens(compacted) <= 320
+    assert "app-0" in compacted
+    assert "more document(s) omitted" in compacted
+
+
+def test_compaction_elides_configmaps_inside_a_list():
+    list_yaml = """
+apiVersion: v1
+kind: List
+items:
+- apiVersion: v1
+  kind: ConfigMap
+  metadata:
+    name: nested
+  data:
+    blob: "%s"
+""" % ("z" * 3000)
+    compacted = prompt_compactor.compact_yaml(list_yaml, budget_tokens=2000)
+    assert "<elided 3000 chars>" in compacted
+    assert "zzzz" not in compacted
+
+
+def test_compact_for_prompt_passthrough_when_endpoint_disabled(monkeypatch):
+    monkeypatch.setenv("PROMPT_COMPACTION", "suggest")
+    assert prompt_compactor.compact_for_prompt(configmap_yaml, "suggest_persona", "mistral") == configmap_yaml.strip()
+
+    monkeypatch.setenv("PROMPT_COMPACTION", "none")
+    assert prompt_compactor.compact_for_prompt(configmap_yaml, "suggest", "mistral") == configmap_yaml.strip()
+
+
+def test_compact_for_prompt_budgets_around_template_and_reserve(monkeypatch):
+    monkeypatch.setenv("PROMPT_TOKEN_BUDGET", "2000")
+    many = "\n---\n".join(deployment_yaml % i for i in range(200))
+    template = "t" * 2000  # ~500 tokens
+    compacted = prompt_compactor.compact_for_prompt(many, "suggest", "mistral", template=template)
+    expected_budget = 2000 - 500 - prompt_compactor.RESPONSE_RESERVE_TOKENS
+    assert prompt_compactor.estimate_tokens(compacted) <= expected_budget + 20
+    assert "more document(s) omitted" in compacted
+
+
+def test_compact_for_prompt_never_goes_below_token_floor(monkeypatch):
+    monkeypatch.setenv("PROMPT_TOKEN_BUDGET", "10")
+    many = "\n---\n".join(deployment_yaml % i for i in range(50))
+    compacted = prompt_compactor.compact_for_prompt(many, "suggest", "mistral")
+    assert "app-0" in compacted
+    assert 200 <= prompt_compactor.estimate_tokens(compacted) <= 256 + 20
+
+
+def test_invalid_budget_setting_falls_back_to_default(monkeypatch):
+    monkeypatch.setenv("PROMPT_TOKEN_BUDGET", "lots")
+    monkeypatch.setenv("COMPACT_VALUE_MAX_CHARS", "")
+    assert prompt_compactor.token_budget_for("mistral") == prompt_compactor.MODEL_TOKEN_BUDGETS["mistral"]
+    assert prompt_compactor.value_max_chars() == prompt_compactor.DEFAULT_VALUE_MAX_CHARS
+
+
+def _capture_llm(monkeypatch, llm_handler, reply):
+    sent = []
+
+    def fake_llm(model, messages):
+        sent.append(messages[-1]["content"])
+        return reply
+
+    monkeypatch.setattr(llm_handler, "run_llm_with_timeout", fake_llm)
+    monkeypatch.setattr(llm_handler.memory, "add", lambda *a, **kw: None)
+    monkeypatch.setattr(llm_handler.memory, "save", lambda *a, **kw: None)
+    return sent
+
+
+def test_suggest_sends_compacted_yaml(monkeypatch):
+    from src import llm_handler
+
+    monkeypatch.setenv("PROMPT_COMPACTION", "suggest,suggest_persona")
+    sent = _capture_llm(monkeypatch, llm_handler, "I recommend setting resources on containers.")
+    llm_handler.suggest(configmap_yaml)
+
+    assert len(sent) == 1
+    assert "<elided 5000 chars>" in sent[0]
+    assert "yyyy" not in sent[0]
+    assert "do not edit" not in sent[0]
+
+
+def test_suggest_with_persona_sends_compacted_yaml(monkeypatch):
+    from src import llm_handler
+
+    monkeypatch.setenv("PROMPT_COMPACTION", "suggest,suggest_persona")
+    sent = _capture_llm(monkeypatch, llm_handler, "Add labels: app and annotations: owner.")
+    llm_handler.suggest_with_persona(configmap_yaml, persona="senior")
+
+    assert len(sent) == 1
+    assert "<elided 5000 chars>" in sent[0]
+    assert "yyyy" not in sent[0]
@@ -0,0 +1,50 @@
+import os
+
+from src.prompt_registry import PromptRegistry, registry
+
+
+def test_registry_preloads_all_templates():
+    assert "explain.txt" in registry.templates
+    assert "persona_junior.txt" in registry.templates
+    assert "issue" in registry.templates["explain.txt"].slots
+    rendered = registry.render("explain.txt", issue="latest-tag")
+    assert "latest-tag" in rendered
+    assert "{{issue}}" not in rendered
+
+
+def test_registry_hot_reloads_and_changes_version(tmp_path):
+    prompt = tmp_path / "hello.txt"
+    prompt.write_text("Hello {{name}}", encoding="utf-8")
+    reg = PromptRegistry(prompts_dir=tmp_path, reload_interval=0.01)
+    version = reg.current_version()
+    assert reg.render("hello.txt", name="SRE") == "Hello SRE"
+
+    prompt.write_text("Hi {{name}}", encoding="utf-8")
+    stat = prompt.stat()
+    os.utime(prompt, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    reg._last_check = 0.0
+
+    assert reg.render("hello.txt", name="SRE") == "Hi SRE"
+    assert reg.current_version() != version
+
+
+def test_registry_keeps_last_good_templates_on_bad_edit(tmp_path):
+    prompt = tmp_path / "hello.txt"
+    prompt.write_text("Hello {{name}}", encoding="utf-8")
+    reg = PromptRegistry(prompts_dir=tmp_path, reload_interval=0.01)
+    version = reg.version
+
+    prompt.write_bytes(b"\xff\xfe not utf-8")
+    stat = prompt.stat()
+    os.utime(prompt, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    reg._last_check = 0.0
+
+    assert reg.render("hello.txt", name="SRE") == "Hello SRE"
+    assert reg.version == version
+
+
+def test_persona_templates_render_yaml_into_their_slot():
+    for name in ["persona_junior.txt", "persona_senior_simple.txt", "suggest.txt"]:
+        rendered = registry.render(name, yaml_text="kind: Service")
+        assert "kind: Service" in rendered
+        assert "{yaml_text}" not in rendered
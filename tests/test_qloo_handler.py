@@ -0,0 +1,91 @@
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from src import qloo_handler
+from src.qloo_handler import QlooClient
+
+sys.path.insert(0, str(Path(__file__).parent / "fixtures"))
+
+import stub_qloo_server  # noqa: E402
+
+
+@pytest.fixture
+def stub():
+    server = stub_qloo_server.serve()
+    yield server
+    server.shutdown()
+
+
+def _client(server, **kwargs):
+    return QlooClient(api_key="test", url=f"http://127.0.0.1:{server.server_address[1]}/v1/recommendations", **kwargs)
+
+
+def _run(client, *topics, mode="default"):
+    async def go():
+        try:
+            return await asyncio.gather(*(client.profile(t, mode=mode) for t in topics))
+        finally:
+            await client.close()
+    return asyncio.run(go())
+
+
+def test_profiles_are_cached_per_normalized_topic_and_coalesced(stub):
+    client = _client(stub)
+    results = _run(client, *["SRE  in Berlin"] * 5, "sre in berlin")
+    assert len(stub.hits) == 1
+    assert results[0]["mock"] is False
+    assert results[0]["recommendations"][1]["name"] == "Argo CD"
+
+    _run(client, "sre in berlin")
+    assert len(stub.hits) == 1
+
+
+def test_each_event_loop_gets_its_own_session_and_close_closes_them_all(stub):
+    client = _client(stub)
+    other = asyncio.new_event_loop()
+    thread = threading.Thread(target=other.run_forever, daemon=True)
+    thread.start()
+    try:
+        asyncio.run_coroutine_threadsafe(client.profile("sre"), other).result(timeout=5)
+
+        async def go():
+            await client.profile("platform")
+            sessions = list(client._sessions.values())
+            await client.close()
+            return sessions
+
+        sessions = asyncio.run(go())
+        assert len(sessions) == 2 and all(session.is_closed for session in sessions)
+        assert client._sessions == {}
+    finally:
+        other.call_soon_threadsafe(other.stop)
+        thread.join()
+        other.close()
+
+
+def test_stale_profiles_are_served_while_revalidating(stub):
+    client = _client(stub, ttl=0, stale_ttl=60)
+
+    async def go():
+        first = await client.profile("sre")
+        second = await client.profile("sre")  # stale: returned at once, refreshed in the background
+        await asyncio.sleep(0.2)
+        await client.close()
+        return first, second
+
+    first, second = asyncio.run(go())
+    assert second == first
+    assert len(stub.hits) == 2
+
+
+def test_timeout_falls_back_to_mock_data():
+    slow = stub_qloo_server.serve(latency_ms=500)
+    try:
+        (profile,) = _run(_client(slow, timeout=0.05), "junior dev in berlin")
+    finally:
+        slow.shutdown()
+    assert profile == qloo_handler.get_qloo_profile("junior dev in berlin")
@@ -0,0 +1,100 @@
+import os
+import pickle
+import threading
+
+import pytest
+
+from src import embeddings
+from src.rag_memory import RagMemory, RetentionPolicy, parse_quotas
+
+
+class CountingEmbedder(embeddings.HashingEmbedder):
+    def __init__(self, dim=32):
+        super().__init__(dim)
+        self.encoded = 0
+
+    def encode(self, texts):
+        self.encoded += len(texts)
+        return super().encode(texts)
+
+
+def _memory(**policy):
+    defaults = {"max_entries": 0, "max_bytes": 0, "max_age_seconds": 0, "source_quotas": {}}
+    return RagMemory(backend=CountingEmbedder(), retention=RetentionPolicy(**{**defaults, **policy}))
+
+
+def _fill(memory, entries):
+    for source, text, added_at in entries:
+        memory.add(text, source=source)
+        memory.meta[-1] = (memory.meta[-1][0], added_at, memory.meta[-1][2])
+
+
+def test_policy_evicts_by_age_quota_entries_and_bytes():
+    meta = [("explain", 0, 10), ("explain", 50, 10), ("explain", 60, 10), ("suggest", 70, 500), ("recommend", 80, 10)]
+    policy = RetentionPolicy(max_entries=3, max_bytes=400, max_age_seconds=60, source_quotas={"explain": 1})
+    assert policy.evictions(meta, now=100) == {0: "age", 1: "quota", 2: "bytes", 3: "bytes"}
+
+    policy = RetentionPolicy(max_entries=2, max_bytes=0, max_age_seconds=0, source_quotas={})
+    assert policy.evictions(meta, now=100) == {0: "entries", 1: "entries", 2: "entries"}
+
+
+def test_compaction_keeps_search_working_without_re_embedding():
+    memory = _memory(max_age_seconds=100, source_quotas={"recommend": 1})
+    _fill(memory, [
+        ("explain", "Prompt: old security advice", 0),
+        ("recommend", "Persona: sre\nResponse: KubeCon", 950),
+        ("recommend", "Persona: dev\nResponse: Argo CD", 960),
+        ("explain", "Prompt: resources\nResponse: set limits", 970),
+    ])
+    embedded = memory.backend.encoded
+
+    run = memory.compact(now=1000)
+    assert run["evicted"] == {"age": 1, "quota": 1}
+    assert run["bytes_reclaimed"] == len("Prompt: old security advice") + len("Persona: sre\nResponse: KubeCon")
+    assert memory.backend.encoded == embedded
+    assert memory.index.ntotal == len(memory.store) == 2
+    assert memory.search("limits", k=1) == ["Prompt: resources\nResponse: set limits"]
+
+    stats = memory.stats()
+    assert stats["sources"] == {
+        "recommend": {"entries": 1, "bytes": len("Persona: dev\nResponse: Argo CD")},
+        "explain": {"entries": 1, "bytes": len("Prompt: resources\nResponse: set limits")},
+    }
+    assert stats["compactions"]["evicted"] == {"age": 1, "quota": 1}
+    assert memory.compact(now=1000)["evicted"] == {}
+
+
+def test_entry_metadata_survives_snapshots_and_is_derived_for_old_ones(tmp_path):
+    memory = _memory()
+    memory.add("Prompt: x\nResponse: y", source="suggest")
+    memory.save(str(tmp_path / "new.pkl"))
+    loaded = _memory()
+    loaded.load(str(tmp_path / "new.pkl"))
+    assert loaded.meta == memory.meta
+
+    with open(tmp_path / "old.pkl", "wb") as f:
+        pickle.dump((None, ["Persona: sre\nResponse: z", "Prompt: a\nResponse: b"]), f)
+    old = _memory()
+    old.load(str(tmp_path / "old.pkl"))
+    assert [source for source, _, _ in old.meta] == ["recommend", "other"]
+
+
+
+def test_concurrent_saves_each_use_their_own_temp_file(tmp_path):
+    memory = _memory()
+    memory.add("Prompt: x\nResponse: y", source="explain")
+    path = str(tmp_path / "memory.pkl")
+    threads = [threading.Thread(target=memory.save, args=(path,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert os.listdir(tmp_path) == ["memory.pkl"]
+    loaded = _memory()
+    loaded.load(path)
+    assert loaded.store == memory.store
+
+def test_invalid_quota_is_rejected():
+    assert parse_quotas("explain=10, recommend=5") == {"explain": 10, "recommend": 5}
+    with pytest.raises(ValueError):
+        parse_quotas("chat=10")
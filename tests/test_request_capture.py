@@ -0,0 +1,77 @@
+import base64
+import contextvars
+import hashlib
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import api, llm_handler, metrics, request_capture
+from src.rag_memory import RagMemory
+
+SAMPLE = "k8s/sample_deployment.yaml"
+
+
+@pytest.fixture
+def capture(tmp_path, monkeypatch):
+    writer = request_capture.CaptureWriter(path=str(tmp_path / "capture.jsonl"), max_body_bytes=4096)
+    monkeypatch.setattr(request_capture, "recorder", writer)
+
+    def records():
+        writer.flush()
+        with open(writer.path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+    return writer, records
+
+
+def test_requests_are_recorded_with_body_and_stage_timings(capture, monkeypatch):
+    writer, records = capture
+    memory = RagMemory()
+    memory.add("Prompt: pod security context\nResponse: set runAsNonRoot", source="explain")
+    monkeypatch.setattr(llm_handler, "memory", memory)
+    client = TestClient(api.app)
+    with open(SAMPLE, "rb") as f:
+        response = client.post("/patch?format=json-patch", files={"file": f}, headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    client.get("/metrics")
+    client.get("/memory", params={"q": "security"})
+
+    patch, search = records()
+    assert patch["route"] == "/patch" and patch["query"] == "format=json-patch"
+    assert patch["status"] == 200 and patch["seconds"] > 0
+    body = base64.b64decode(patch["body_b64"])
+    assert hashlib.sha256(body).hexdigest() == patch["body_sha256"] and len(body) == patch["body_bytes"]
+    assert patch["headers"]["content-type"].startswith("multipart/form-data")
+    assert "x-admin-token" not in patch["headers"]
+    assert search["query"] == "q=security" and search["body_b64"] == ""
+    assert set(search["stages"]) == {"embed", "faiss_search"}
+
+
+def test_large_bodies_are_hashed_only_and_files_rotate(capture):
+    writer, records = capture
+    writer.max_body_bytes = 10
+    writer.max_file_bytes = 600
+    writer.backups = 1
+    client = TestClient(api.app)
+    for _ in range(4):
+        with open(SAMPLE, "rb") as f:
+            client.post("/patch", files={"file": f})
+
+    kept = records()
+    assert kept and all("body_b64" not in r and r["body_bytes"] > 10 for r in kept)
+    with open(writer.path + ".1", encoding="utf-8") as f:
+        assert json.loads(f.readline())["route"] == "/patch"
+
+
+def test_default_executor_carries_the_stage_recorder():
+    stages = {}
+    metrics.stage_recorder.set(stages)
+
+    def work():
+        with metrics.timed("in_thread"):
+            pass
+
+    with request_capture.ContextThreadPoolExecutor(max_workers=1) as pool:
+        pool.submit(work).result()
+    assert "in_thread" in stages
+    assert contextvars.copy_context().get(metrics.stage_recorder) is stages
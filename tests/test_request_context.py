@@ -0,0 +1,77 @@
+import asyncio
+import io
+
+import pytest
+import yaml
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from src import request_context
+from src.request_context import RequestContext, UploadTooLarge, dump_all, iter_documents, load_all, spool_upload
+
+
+def test_context_parses_once_and_round_trips():
+    with open("k8s/multi_resource_mixed.yaml", "rb") as f:
+        ctx = RequestContext(f.read(), filename="multi_resource_mixed.yaml")
+    assert ctx.is_valid
+    assert [doc["kind"] for doc in ctx.docs] == ["Deployment", "ConfigMap", "StatefulSet"]
+    assert load_all(dump_all(ctx.docs)) == ctx.docs
+
+
+def test_context_reports_decode_parse_and_empty_errors():
+    assert RequestContext(b"\xff\xfe\x00bad").decode_error is not None
+    with open("k8s/broken_yaml.yaml", "rb") as f:
+        broken = RequestContext(f.read())
+    assert broken.parse_error is not None and not broken.is_valid
+    assert RequestContext(b"   \n").is_empty
+
+
+def _limited_app(max_bytes):
+    app = FastAPI()
+    received = []
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        received.append(file.filename)
+        with await spool_upload(file, max_bytes=max_bytes) as spool:
+            return {"bytes": len(spool.read())}
+
+    app.add_middleware(request_context.UploadLimitMiddleware, max_bytes=max_bytes)
+    return TestClient(app), received
+
+
+def test_oversized_uploads_are_rejected_before_the_handler_runs(monkeypatch):
+    monkeypatch.setattr(request_context, "UPLOAD_FRAMING_BYTES", 200)
+    client, received = _limited_app(max_bytes=100)
+
+    assert client.post("/upload", files={"file": ("a.yaml", b"a: 1\n")}).json() == {"bytes": 5}
+    # Content-Length over the limit: answered before any of the body is read.
+    response = client.post("/upload", files={"file": ("big.yaml", b"x" * 1000)})
+    assert response.status_code == 413 and "100 byte limit" in response.json()["error"]
+    # No Content-Length (chunked): cut off once the received body passes the limit.
+    chunks = iter([b"--b\r\n", b"x" * 250, b"x" * 250, b"x" * 250])
+    response = client.post("/upload", content=chunks, headers={"content-type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 413
+    assert received == ["a.yaml"]
+
+
+def test_spool_upload_checks_the_file_part_without_copying_it():
+    small = UploadFile(io.BytesIO(b"a: 1\n"), filename="a.yaml")
+    small.file.read()
+    spool = asyncio.run(spool_upload(small, max_bytes=25))
+    assert spool is small.file and spool.read() == b"a: 1\n"
+
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(spool_upload(UploadFile(io.BytesIO(b"x" * 1000), size=1000), max_bytes=25))
+
+
+def test_iter_documents_is_lazy_and_enforces_document_limit():
+    stream = io.BytesIO(b"a: 1\n---\nb: 2\n---\nc: [\n")
+    docs = iter_documents(stream, max_documents=5)
+    assert next(docs) == {"a": 1}
+    assert next(docs) == {"b": 2}
+    with pytest.raises(yaml.YAMLError):
+        next(docs)
+
+    with pytest.raises(UploadTooLarge):
+        list(iter_documents("a: 1\n---\nb: 2\n---\nc: 3\n", max_documents=2))
@@ -0,0 +1,56 @@
+import yaml
+
+from src import rule_engine
+
+
+def _load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return list(yaml.safe_load_all(f))
+
+
+def test_native_rules_flag_insecure_deployment():
+    [issues] = rule_engine.evaluate(_load("k8s/sample_deployment.yaml"))
+    checks = {issue.check for issue in issues}
+    assert checks == set(rule_engine.NATIVE_CHECKS)
+    assert all(issue.object_name == "sample-app" for issue in issues)
+
+
+def test_native_rules_accept_hardened_container():
+    [issues] = rule_engine.evaluate(_load("k8s/secure_deployment.yaml"))
+    checks = {issue.check for issue in issues}
+    assert "run-as-non-root" not in checks
+    assert "no-read-only-root-fs" not in checks
+    assert "unset-cpu-requirements" not in checks
+    assert "latest-tag" not in checks
+
+
+def test_native_rules_skip_non_workloads():
+    assert rule_engine.evaluate(_load("k8s/service_and_configmap.yaml")) == [[], []]
+
+
+def test_hybrid_engine_does_not_duplicate_native_checks(fake_linter):
+    docs = _load("k8s/sample_deployment.yaml")
+    issues = rule_engine.run_engine(docs, engine="hybrid")
+    assert sum("(check: run-as-non-root" in issue for issue in issues) == 1
+    assert sum("(check: latest-tag" in issue for issue in issues) == 1
+
+
+def test_native_rules_check_init_and_ephemeral_containers():
+    doc = {
+        "kind": "Pod",
+        "metadata": {"name": "web"},
+        "spec": {
+            "securityContext": {"runAsNonRoot": True},
+            "containers": [],
+            "initContainers": [{"name": "migrate", "image": "migrate:latest"}],
+            "ephemeralContainers": [{"name": "debug", "image": "busybox:1.36"}],
+        },
+    }
+    [issues] = rule_engine.evaluate([doc])
+    by_container = {}
+    for issue in issues:
+        by_container.setdefault(issue.message.split('"')[1], set()).add(issue.check)
+    assert by_container["migrate"] == {
+        "no-read-only-root-fs", "unset-cpu-requirements", "unset-memory-requirements", "latest-tag",
+    }
+    assert by_container["debug"] == {"no-read-only-root-fs"}
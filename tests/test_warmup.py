@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import llm_handler, warmup
+from src.prompt_registry import registry as prompt_registry
+from src.rag_memory import RagMemory
+
+ROOT_ISSUE = '<standard input>: (object: <no namespace>/app Deployment) container "app" is not set to runAsNonRoot (check: run-as-non-root, remediation: Set runAsNonRoot.)'
+CPU_ISSUE = '<standard input>: (object: <no namespace>/app Deployment) container "app" has cpu request 0 (check: unset-cpu-requirements, remediation: Set CPU requests.)'
+EXPLANATION = "**Issue**: root\n**How to fix it**: We recommend setting runAsNonRoot."
+
+
+@pytest.fixture
+def memory(monkeypatch):
+    memory = RagMemory()
+    monkeypatch.setattr(llm_handler, "memory", memory)
+    monkeypatch.setattr(llm_handler, "explain_cache", type(llm_handler.explain_cache)(maxsize=16, name="explain"))
+    return memory
+
+
+def test_common_issues_ranks_checks_by_frequency(memory):
+    old_prompt = "an older explain prompt\n" + ROOT_ISSUE.replace('"app"', '"old"')
+    store = [
+        f"Prompt: {old_prompt}\nResponse: x",
+        f"Prompt: {CPU_ISSUE}\nResponse: y",
+        f"Prompt: {ROOT_ISSUE}\nResponse: z",
+        "Persona: sre\nResponse: (check: ignored, remediation: not an explain entry)",
+    ]
+    assert warmup.common_issues(store, 1) == [ROOT_ISSUE]
+    assert warmup.common_issues(store, 5) == [ROOT_ISSUE, CPU_ISSUE]
+
+
+def test_prefill_reuses_matching_history_and_regenerates_the_rest(memory, monkeypatch):
+    memory.add(f"Prompt: {prompt_registry.render('explain.txt', issue=ROOT_ISSUE)}\nResponse: {EXPLANATION}", source="explain")
+    memory.add(f"Prompt: an older explain prompt\n{CPU_ISSUE}\nResponse: stale", source="explain")
+    regenerated = []
+    monkeypatch.setattr(llm_handler, "explain", regenerated.append)
+
+    assert warmup.prefill_explanations(5) == "1 reused, 1 generated"
+    assert llm_handler.explain_cache.get((prompt_registry.version, ROOT_ISSUE)) == EXPLANATION
+    assert regenerated == [CPU_ISSUE]
+    assert warmup.prefill_explanations(5, use_llm=False) == "0 reused, 0 generated"
+
+
+def test_ready_reports_503_until_warm_up_finishes(memory, monkeypatch):
+    from src import api
+
+    replies = iter(["OK", "LLM error: connection refused"])
+    monkeypatch.setattr(llm_handler, "run_llm_with_timeout", lambda model, messages: next(replies))
+    state = warmup.WarmUp(enabled=True, llm=True, explain_top_n=3)
+    monkeypatch.setattr(api, "warmup", state)
+    client = TestClient(api.app)
+
+    assert client.get("/ready").status_code == 503
+    asyncio.run(state.run_async(timeout=30))
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["state"] == "ready"
+    assert set(response.json()["steps"]) == {"embeddings", "llm", "explain_cache"}
+
+    failing = warmup.WarmUp(enabled=True, llm=True, explain_top_n=0)
+    failing.run()
+    assert failing.ready and failing.steps["llm"]["ok"] is False
+
+
+def test_slow_warm_up_reports_ready_after_the_timeout(memory, monkeypatch):
+    monkeypatch.setattr(warmup, "warm_embeddings", lambda: __import__("time").sleep(0.5))
+    state = warmup.WarmUp(enabled=True, llm=False, explain_top_n=0)
+    asyncio.run(state.run_async(timeout=0.05))
+    assert state.state == "timed_out" and state.ready